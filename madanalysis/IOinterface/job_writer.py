@@ -25,11 +25,13 @@
 from __future__ import absolute_import
 from madanalysis.selection.instance_name      import InstanceName
 from madanalysis.IOinterface.folder_writer    import FolderWriter
+from madanalysis.misc.recast_manifest         import RecastManifest
 from shell_command                            import ShellCommand
 from madanalysis.enumeration.ma5_running_type import MA5RunningType
 import logging
 import shutil
 import os
+import subprocess
 import six
 
 class JobWriter(object):
@@ -41,6 +43,9 @@ class JobWriter(object):
         self.output     = self.main.output
         self.fastsim    = self.main.fastsim
         self.merging    = self.main.merging
+        self.build_signature = None
+        self.cached_build    = False
+        self.resumed         = False
 
     @staticmethod
     def CheckJobStructureMute(session_info,path,recastflag):
@@ -196,6 +201,12 @@ class JobWriter(object):
     def Open(self):
         if not self.resubmit:
             InstanceName.Clear()
+            # Resuming an interrupted recast run: the folder is kept
+            if self.main.recasting.status=="on" and self.main.recasting.resume and \
+               os.path.isfile(self.path+"/Output/SAF/"+RecastManifest.FILENAME):
+                logging.getLogger('MA5').info("   Resuming the recast run stored in '"+self.path+"'...")
+                self.resumed = True
+                return True
             return FolderWriter.CreateDirectory(self.path,question=True)
         else:
             recast = (self.main.recasting.status=="on")
@@ -690,6 +701,21 @@ class JobWriter(object):
         file.close()
         return True
 
+    def WriteCutParameters(self,main):
+        # Thresholds read by the analysis at initialization
+        if not main.runtime_thresholds:
+            return True
+        import madanalysis.job.job_cut_parameters as JobCutParameters
+        filename = self.path+"/Input/"+JobCutParameters.CUT_PARAMETER_FILE
+        try:
+            file = open(filename,"w")
+        except:
+            logging.getLogger('MA5').error('impossible to write the file '+filename)
+            return False
+        JobCutParameters.WriteCutParameterFile(file,main)
+        file.close()
+        return True
+
     def WriteSampleAnalyzerMakefile(self,option=""):
 
         from madanalysis.build.makefile_writer import MakefileWriter
@@ -803,7 +829,16 @@ class JobWriter(object):
 
         # log file name
         logfile = folder+'/Log/compilation.log'
-        
+
+        # build cache: recovering an executable compiled from the same sources
+        from madanalysis.build.build_cache import BuildCache
+        cache = BuildCache(self.main.archi_info)
+        self.build_signature = cache.signature(folder)
+        self.cached_build = cache.fetch(self.build_signature,folder)
+        if self.cached_build:
+            logging.getLogger('MA5').debug('executable recovered from the build cache: no compilation needed')
+            return True
+
         # shell command
         commands = ['make','compile']
 
@@ -869,7 +904,12 @@ class JobWriter(object):
 
         # log file name
         logfile = folder+'/Log/linking.log'
-        
+
+        # executable recovered from the build cache
+        if self.cached_build:
+            self.WriteBuildSignature()
+            return True
+
         # shell command
         commands = ['make','link']
 
@@ -880,10 +920,38 @@ class JobWriter(object):
         if not result:
             logging.getLogger('MA5').error('impossible to link the project. For more details, see the log file:')
             logging.getLogger('MA5').error(logfile)
+        else:
+            from madanalysis.build.build_cache import BuildCache
+            BuildCache(self.main.archi_info).store(self.build_signature,folder)
+            self.WriteBuildSignature()
 
         return result
 
 
+    def WriteBuildSignature(self):
+        # Saving the signature of the sources the executable is built from
+        if self.build_signature is None:
+            return
+        try:
+            with open(self.path+'/Build/Log/JobSignature.dat','w') as mysig:
+                mysig.write(self.build_signature+'\n')
+        except OSError as err:
+            logging.getLogger('MA5').debug('cannot write the build signature: '+str(err))
+
+
+    def BuildUpToDate(self):
+        # Is the executable built from the current sources, Makefiles and
+        # SampleAnalyzer libraries?
+        folder  = self.path+'/Build'
+        sigfile = folder+'/Log/JobSignature.dat'
+        if not os.path.isfile(folder+'/MadAnalysis5job') or not os.path.isfile(sigfile):
+            return False
+        from madanalysis.build.build_cache import BuildCache
+        signature = BuildCache(self.main.archi_info).signature(folder)
+        with open(sigfile,'r') as mysig:
+            return signature is not None and mysig.read().strip()==signature
+
+
     def WriteHistory(self,history,firstdir):
         file = open(self.path+"/history.ma5","w")
         file.write('set main.currentdir = '+firstdir+'\n') 
@@ -913,18 +981,36 @@ class JobWriter(object):
         file.close()    
 
 
-    def RunJob(self,dataset):
+    def WriteShardLists(self,dataset,nshards):
+        # Splitting the file list of a dataset into (at most) nshards lists
+        # of consecutive files. Returns the names of the lists.
+        name   = InstanceName.Get(dataset.name)
+        nfiles = len(dataset)
+        nshards = min(nshards,nfiles)
+        if nshards<2:
+            return [name]
+        shards = []
+        for i in range(nshards):
+            shard = name+'_shard'+str(i)
+            file = open(self.path+"/Input/"+shard+".list","w")
+            for j in range(i*nfiles//nshards,(i+1)*nfiles//nshards):
+                file.write(dataset[j])
+                file.write("\n")
+            file.close()
+            shards.append(shard)
+        return shards
+
+
+    def GetRunCommands(self,dataset,name=None):
 
         # Getting the dataset name    
-        name=InstanceName.Get(dataset.name)
+        if name is None:
+            name=InstanceName.Get(dataset.name)
 
         # Creating a folder specific to the dataset
         if not os.path.isdir(self.path+"/Output/SAF/"+name):
             os.mkdir(self.path+"/Output/SAF/"+name)
 
-        # folder where the program is launched
-        folder = self.path+'/Build/'
-
         # shell command
         commands = ['./MadAnalysis5job']
 
@@ -940,6 +1026,17 @@ class JobWriter(object):
         # Inputs
         commands.append('../Input/'+name+'.list')
 
+        return commands
+
+
+    def RunJob(self,dataset):
+
+        # folder where the program is launched
+        folder = self.path+'/Build/'
+
+        # shell command
+        commands = self.GetRunCommands(dataset)
+
         # Running SampleAnalyzer
         if self.main.redirectSAlogger:
             result = ShellCommand.ExecuteWithMA5Logging(commands,folder)
@@ -949,6 +1046,91 @@ class JobWriter(object):
         return result
 
 
+    def RunJobs(self,datasets,ncores):
+
+        # folder where the programs are launched
+        folder = self.path+'/Build/'
+        safdir = self.path+'/Output/SAF/'
+
+        # Free cores are used to split the datasets into shards, i.e. runs
+        # over subsets of their files. Not possible when events are written
+        # (event files and detector outputs cannot be merged).
+        nshards = 1
+        if self.main.output=="" and \
+           self.main.fastsim.package not in ['delphes','delphesMA5tune']:
+            nshards = max(ncores//len(datasets),1)
+        shards = {}
+        for dataset in datasets:
+            shards[dataset.name] = self.WriteShardLists(dataset,nshards)
+
+        # One SampleAnalyzer process per dataset or shard, at most ncores at
+        # a time. The output of each process is written in its own log file.
+        from madanalysis.misc.process_pool import ForkedProcessPool
+        pool = ForkedProcessPool(ncores)
+        logfiles = {}
+        try:
+            for dataset in datasets:
+                for i, name in enumerate(shards[dataset.name]):
+                    commands = self.GetRunCommands(dataset,name)
+                    logfile  = folder+'Log/run'+name+'.log'
+                    label    = dataset.name
+                    if len(shards[dataset.name])>1:
+                        label += ' (part '+str(i+1)+'/'+str(len(shards[dataset.name]))+')'
+                    logfiles[name] = (label,logfile)
+
+                    def job(commands=commands,logfile=logfile):
+                        with open(logfile,'w') as output:
+                            return ShellCommand.Execute(commands,folder,\
+                                                        stdout=output,stderr=subprocess.STDOUT)
+
+                    while pool.is_full():
+                        for finished, status in pool.wait_any():
+                            self.ReportJob(status,*logfiles[finished])
+                    logging.getLogger('MA5').info("   Running 'SampleAnalyzer' over dataset '"+\
+                                                  label+"' (log file: "+logfile+")...")
+                    pool.submit(name,job)
+
+            while len(pool)>0:
+                for finished, status in pool.wait_any():
+                    self.ReportJob(status,*logfiles[finished])
+        except KeyboardInterrupt:
+            pool.terminate()
+            raise
+        status = pool.join()
+
+        # Merging the outputs of the shards into the layout of a single run
+        from madanalysis.IOinterface.saf_merger import merge_job_outputs
+        failed = []
+        for dataset in datasets:
+            names = shards[dataset.name]
+            if not all(status.get(x,False) for x in names):
+                failed.append(dataset.name)
+                continue
+            if len(names)==1:
+                continue
+            logging.getLogger('MA5').info("   Merging the outputs of the "+str(len(names))+\
+                                          " parts of dataset '"+dataset.name+"'...")
+            target = safdir+InstanceName.Get(dataset.name)
+            if not merge_job_outputs(target,[safdir+x for x in names]):
+                failed.append(dataset.name)
+                continue
+            for name in names:
+                shutil.rmtree(safdir+name)
+                os.remove(self.path+'/Input/'+name+'.list')
+
+        # Datasets whose run failed
+        return failed
+
+
+    @staticmethod
+    def ReportJob(status,name,logfile):
+        if status:
+            logging.getLogger('MA5').info("   Run over '"+name+"' completed.")
+        else:
+            logging.getLogger('MA5').error("   Run over '"+name+"' failed. For more details, see the log file:")
+            logging.getLogger('MA5').error("   "+logfile)
+
+
     def WriteTagger(self):
         # header file
         bla
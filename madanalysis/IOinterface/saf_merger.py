@@ -0,0 +1,554 @@
+################################################################################
+#
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+
+"""
+Structured merging of the SAF files written by SampleAnalyzer.
+"""
+
+import argparse
+import logging
+import math
+import os
+import re
+import shutil
+import tempfile
+from itertools import zip_longest
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger("MA5")
+
+# Columns of the <SampleGlobalInfo> and <SampleDetailedInfo> blocks
+SAMPLE_COLUMNS = [
+    "# xsection ",
+    "xsection_error ",
+    "nevents ",
+    "sum_weight+ ",
+    "sum_weight- ",
+]
+
+# Blocks of the histogram and cutflow files whose numbers are summed
+NUMERIC_BLOCKS = ["statistics", "data", "initialcounter", "counter"]
+
+# Output folders of the analyses, writers and detectors (<name>_<index>)
+JOB_FOLDER = re.compile(r"^(.+)_(\d+)$")
+
+
+def write_lines(filename: str, lines: Iterable[str]) -> None:
+    """
+    Write a file atomically: readers see either the old or the new version.
+
+    Args:
+        filename (``str``): destination
+        lines (``Iterable[str]``): lines of the file
+    """
+    folder = os.path.dirname(os.path.abspath(filename))
+    handle, tmpname = tempfile.mkstemp(dir=folder, prefix=".tmp_")
+    try:
+        with os.fdopen(handle, "w") as stream:
+            stream.writelines(lines)
+        os.replace(tmpname, filename)
+    except Exception:
+        if os.path.exists(tmpname):
+            os.remove(tmpname)
+        raise
+
+
+class SampleSAF:
+    """
+    Content of a sample SAF file (``<dataset>.saf``): the names of the event
+    files, one ``[xsection, xsection_error, nevents, sum_weight+, sum_weight-]``
+    entry per file, and the lines before and after the sample blocks, which
+    are kept verbatim.
+
+    Args:
+        filename (``str``): SAF file to read
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.header = []
+        self.footer = []
+        self.files = []
+        self.details = []
+        self.read()
+
+    def read(self) -> None:
+        """Parse the file in a single pass"""
+        block = None
+        seen = False
+        with open(self.filename, "r") as stream:
+            for line in stream:
+                tag = line.strip().lower()
+                if tag in [
+                    "<sampleglobalinfo>",
+                    "<fileinfo>",
+                    "<sampledetailedinfo>",
+                ]:
+                    block, seen = tag[1:-1], True
+                    continue
+                if tag in [
+                    "</sampleglobalinfo>",
+                    "</fileinfo>",
+                    "</sampledetailedinfo>",
+                ]:
+                    block = None
+                    continue
+                content = line.split("#")[0].strip()
+                if block is None:
+                    if not seen:
+                        self.header.append(line)
+                    elif tag != "" or len(self.footer) != 0:
+                        self.footer.append(line)
+                elif block == "fileinfo" and content != "":
+                    self.files.append(content.strip('"'))
+                elif block == "sampledetailedinfo" and len(content.split()) == 5:
+                    self.details.append([float(x) for x in content.split()])
+
+    def global_info(self) -> list:
+        """
+        Summary of the sample, combining the entries of all the files as
+        SampleAnalyzer does (cross sections averaged with the numbers of events
+        as weights).
+
+        Returns:
+            ``list``:
+            ``[xsection, xsection_error, nevents, sum_weight+, sum_weight-]``
+        """
+        xsection, error2, nevents, sumw_pos, sumw_neg = 0.0, 0.0, 0, 0.0, 0.0
+        for xsec, xerr, nevt, pos, neg in self.details:
+            nevents += int(nevt)
+            xsection += xsec * nevt
+            error2 += (xerr * nevt) ** 2
+            sumw_pos += pos
+            sumw_neg += neg
+        if nevents != 0:
+            xsection /= nevents
+            error = math.sqrt(error2) / nevents
+        else:
+            xsection, error = 0.0, 0.0
+        return [xsection, error, nevents, sumw_pos, sumw_neg]
+
+    def append(self, other: "SampleSAF", files: Optional[list] = None) -> None:
+        """
+        Add the entries of another sample file.
+
+        Args:
+            other (``SampleSAF``): sample file to append
+            files (``list``, default ``None``): names of its event files, if
+                they must differ from the ones recorded in the file
+        """
+        if files is None or len(files) != len(other.details):
+            files = other.files
+        self.files += files
+        self.details += other.details
+
+    def truncate(self, nentries: int) -> None:
+        """
+        Keep only the first entries, e.g. to undo the addition of other files.
+
+        Args:
+            nentries (``int``): number of entries to keep
+        """
+        self.files = self.files[:nentries]
+        self.details = self.details[:nentries]
+
+    @staticmethod
+    def format_entry(entry: list) -> str:
+        """Line of a <SampleGlobalInfo> or <SampleDetailedInfo> block"""
+        return "".join(
+            (str(int(x)) if i == 2 else "%e" % x).ljust(15) for i, x in enumerate(entry)
+        )
+
+    def lines(self):
+        """Lines of the file, generated on the fly"""
+        title = "".join(x.ljust(15) for x in SAMPLE_COLUMNS) + "\n"
+        yield from self.header
+        yield "<SampleGlobalInfo>\n"
+        yield title
+        yield self.format_entry(self.global_info()) + "\n"
+        yield "</SampleGlobalInfo>\n\n"
+        yield "<FileInfo>\n"
+        nfiles = len(self.files)
+        for i, name in enumerate(self.files):
+            line = ('"' + name + '"').ljust(40)
+            if i < 2 or i >= nfiles - 2:
+                line += " # file " + str(i + 1) + " / " + str(nfiles)
+            yield line + "\n"
+        yield "</FileInfo>\n\n"
+        yield "<SampleDetailedInfo>\n"
+        yield title
+        for i, entry in enumerate(self.details):
+            line = self.format_entry(entry)
+            if i < 2 or i >= len(self.details) - 2:
+                line += " # file " + str(i + 1) + " / " + str(len(self.details))
+            yield line + "\n"
+        yield "</SampleDetailedInfo>\n\n"
+        yield from self.footer
+
+    def write(self, filename: Optional[str] = None) -> None:
+        """
+        Write the file atomically: readers see either the old or the new
+        version.
+
+        Args:
+            filename (``str``, default ``None``): destination (the original
+                file if not given)
+        """
+        write_lines(filename or self.filename, self.lines())
+
+
+def merge_sample_files(target: str, source: str, files: Optional[list] = None) -> bool:
+    """
+    Append the file entries of a sample SAF file to another one, recomputing
+    its global information.
+
+    Args:
+        target (``str``): sample SAF file to update
+        source (``str``): sample SAF file to append
+        files (``list``, default ``None``): names of the event files of the
+            source (the ones recorded in the source if not given)
+
+    Returns:
+        ``bool``:
+        ``True`` if the merge succeeded
+    """
+    try:
+        merged = SampleSAF(target)
+        merged.append(SampleSAF(source), files)
+        merged.write()
+    except (OSError, ValueError) as err:
+        logger.error("Cannot merge " + source + " into " + target + ": " + str(err))
+        return False
+    return True
+
+
+class CountsSAF:
+    """
+    Content of a histogram (``histos.saf``) or cutflow SAF file. The numbers
+    of the ``<Statistics>``, ``<Data>``, ``<InitialCounter>`` and ``<Counter>``
+    blocks are summed when another file with the same structure is added; the
+    bins of the ``<HistoFrequency>`` histograms are matched by label. All other
+    lines are kept verbatim.
+
+    Args:
+        filename (``str``): SAF file to read
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        with open(filename, "r") as stream:
+            self.items = list(self.parse(stream))
+
+    @staticmethod
+    def parse(stream: Iterable[str]) -> Iterator[tuple]:
+        """
+        Split a file into verbatim lines and summable entries.
+
+        Args:
+            stream (``Iterable[str]``): lines of the file
+
+        Returns:
+            ``Iterator[tuple]``:
+            ``("text", line)``, ``("numbers", [indent, values, comment])`` or
+            ``("frequency", {label: [positive, negative]})`` items
+        """
+        histo, block, frequency = None, None, None
+        for line in stream:
+            words = line.split()
+            if len(words) == 1 and words[0].startswith("<") and words[0].endswith(">"):
+                name = words[0].strip("</>").lower()
+                closing = words[0].startswith("</")
+                if closing and frequency is not None:
+                    yield "frequency", frequency
+                    frequency = None
+                if name in NUMERIC_BLOCKS:
+                    block = None if closing else name
+                    if name == "data" and histo == "histofrequency" and not closing:
+                        frequency = {}
+                elif name in ["histo", "histologx", "histofrequency"]:
+                    histo = None if closing else name
+                yield "text", line
+                continue
+            content, _, comment = line.partition("#")
+            values = content.split()
+            if block is None or len(values) == 0:
+                yield "text", line
+                continue
+            # The bins of the frequency histograms are keyed by their label,
+            # which is not necessarily a number
+            first = 1 if frequency is not None else 0
+            try:
+                numbers = [
+                    float(x) if any(c in x for c in ".eEn") else int(x)
+                    for x in values[first:]
+                ]
+            except ValueError:
+                yield "text", line
+                continue
+            if frequency is not None:
+                frequency[values[0]] = numbers
+            else:
+                indent = line[: len(line) - len(line.lstrip())]
+                yield "numbers", [indent, numbers, comment.strip()]
+
+    def add(self, filename: str) -> None:
+        """
+        Add the content of another file, read line by line.
+
+        Args:
+            filename (``str``): SAF file with the same structure
+        """
+        with open(filename, "r") as stream:
+            items = zip_longest(self.items, self.parse(stream))
+            for i, (item, other) in enumerate(items):
+                if item is None or other is None or item[0] != other[0]:
+                    raise ValueError(filename + " and " + self.filename + " differ")
+                kind, payload = item
+                if kind == "text" and payload.strip() != other[1].strip():
+                    raise ValueError(
+                        filename
+                        + " and "
+                        + self.filename
+                        + " differ: "
+                        + payload.strip()
+                    )
+                elif kind == "numbers":
+                    if len(payload[1]) != len(other[1][1]):
+                        raise ValueError(filename + " and " + self.filename + " differ")
+                    payload[1] = [x + y for x, y in zip(payload[1], other[1][1])]
+                elif kind == "frequency":
+                    for label, values in other[1].items():
+                        previous = payload.setdefault(label, [0.0, 0.0])
+                        payload[label] = [x + y for x, y in zip(previous, values)]
+
+    @staticmethod
+    def format_value(value) -> str:
+        """Number written as SampleAnalyzer does"""
+        return (str(value) if isinstance(value, int) else "%e" % value).ljust(15)
+
+    def lines(self) -> Iterator[str]:
+        """Lines of the file, generated on the fly"""
+        for kind, payload in self.items:
+            if kind == "text":
+                yield payload
+            elif kind == "numbers":
+                indent, values, comment = payload
+                line = indent + "".join(self.format_value(x) for x in values)
+                yield line + (" # " + comment if comment != "" else "") + "\n"
+            else:
+
+                def order(label):
+                    try:
+                        return 0, int(label), label
+                    except ValueError:
+                        return 1, 0, label
+
+                labels = sorted(payload.keys(), key=order)
+                for i, label in enumerate(labels):
+                    line = "      " + label.ljust(15)
+                    line += "".join(self.format_value(x) for x in payload[label])
+                    if i < 2 or i >= len(labels) - 2:
+                        line += " # bin " + str(i + 1) + " / " + str(len(labels))
+                    yield line + "\n"
+
+    def write(self, filename: Optional[str] = None) -> None:
+        """
+        Write the file atomically.
+
+        Args:
+            filename (``str``, default ``None``): destination (the original
+                file if not given)
+        """
+        write_lines(filename or self.filename, self.lines())
+
+
+def job_folders(folder: str) -> dict:
+    """
+    Latest output folders of the analyses of a SampleAnalyzer run.
+
+    Args:
+        folder (``str``): output folder of a dataset (``Output/SAF/<dataset>``)
+
+    Returns:
+        ``dict``:
+        name of the latest ``<name>_<index>`` folder of each analysis
+    """
+    latest = {}
+    for entry in os.listdir(folder):
+        match = JOB_FOLDER.match(entry)
+        if match is None or not os.path.isdir(os.path.join(folder, entry)):
+            continue
+        name, index = match.group(1), int(match.group(2))
+        if name not in latest or index > latest[name][0]:
+            latest[name] = (index, entry)
+    return {name: entry for name, (_, entry) in latest.items()}
+
+
+def merge_job_outputs(target: str, sources: list) -> bool:
+    """
+    Merge the outputs of several SampleAnalyzer runs over parts of a dataset
+    into the output folder of the dataset, with the layout of a single run:
+    the sample SAF files are concatenated, and the histograms and cutflows
+    of each analysis are summed into a new ``<analysis>_<index>`` folder.
+
+    Args:
+        target (``str``): output folder of the dataset (``Output/SAF/<dataset>``)
+        sources (``list``): output folders of the partial runs
+
+    Returns:
+        ``bool``:
+        ``True`` if the merge succeeded
+    """
+    name = os.path.basename(os.path.normpath(target))
+    try:
+        os.makedirs(target, exist_ok=True)
+        sample = None
+        for source in sources:
+            part = os.path.basename(os.path.normpath(source))
+            saf = SampleSAF(os.path.join(source, part + ".saf"))
+            if sample is None:
+                sample = saf
+            else:
+                sample.append(saf)
+        sample.write(os.path.join(target, name + ".saf"))
+
+        folders = [job_folders(source) for source in sources]
+        for analysis, folder in folders[0].items():
+            index = 0
+            while os.path.exists(os.path.join(target, analysis + "_" + str(index))):
+                index += 1
+            newfolder = os.path.join(target, analysis + "_" + str(index))
+            shutil.copytree(os.path.join(sources[0], folder), newfolder)
+            for root, _, filenames in os.walk(newfolder):
+                if os.path.basename(root) not in ["Histograms", "Cutflows"]:
+                    continue
+                for filename in filenames:
+                    if not filename.endswith(".saf"):
+                        continue
+                    relative = os.path.relpath(os.path.join(root, filename), newfolder)
+                    counts = CountsSAF(os.path.join(root, filename))
+                    for source, others in zip(sources[1:], folders[1:]):
+                        if analysis not in others:
+                            raise ValueError("no " + analysis + " output in " + source)
+                        counts.add(os.path.join(source, others[analysis], relative))
+                    counts.write()
+    except (OSError, ValueError) as err:
+        logger.error("Cannot merge the outputs of " + name + ": " + str(err))
+        return False
+    return True
+
+
+def dataset_folders(folder: str) -> dict:
+    """
+    Output folders of the datasets of a job.
+
+    Args:
+        folder (``str``): job folder, its ``Output/SAF`` folder or the output
+            folder of a single dataset
+
+    Returns:
+        ``dict``:
+        output folder of each dataset
+    """
+    folder = os.path.normpath(folder)
+    name = os.path.basename(folder)
+    if os.path.isfile(os.path.join(folder, name + ".saf")):
+        return {name: folder}
+    if os.path.isdir(os.path.join(folder, "Output", "SAF")):
+        folder = os.path.join(folder, "Output", "SAF")
+    datasets = {}
+    for entry in sorted(os.listdir(folder)):
+        if os.path.isfile(os.path.join(folder, entry, entry + ".saf")):
+            datasets[entry] = os.path.join(folder, entry)
+    return datasets
+
+
+def merge_saf_outputs(target: str, sources: list) -> bool:
+    """
+    Merge the outputs of several runs of the same analysis, for instance
+    batch jobs over different parts of the samples. Dataset output folders
+    are merged into ``target``; for job or SAF folders, the outputs of the
+    datasets with the same name are merged into ``target/<dataset>``. The
+    input files are read one after the other, so that the memory usage does
+    not depend on the number of inputs.
+
+    Args:
+        target (``str``): output folder
+        sources (``list``): job folders, SAF folders or dataset output folders
+
+    Returns:
+        ``bool``:
+        ``True`` if all the merges succeeded
+    """
+    target = os.path.abspath(target)
+    if any(os.path.abspath(x) == target for x in sources):
+        logger.error("The output folder cannot be one of the inputs")
+        return False
+    try:
+        inputs = [dataset_folders(source) for source in sources]
+    except OSError as err:
+        logger.error("Cannot read the inputs: " + str(err))
+        return False
+
+    if all(
+        len(x) == 1 and os.path.normpath(y) in list(x.values())
+        for x, y in zip(inputs, sources)
+    ):
+        return merge_job_outputs(target, [list(x.values())[0] for x in inputs])
+
+    names = []
+    for datasets in inputs:
+        names += [x for x in datasets if x not in names]
+    if len(names) == 0:
+        logger.error("No SampleAnalyzer output found in the inputs")
+        return False
+    status = True
+    for name in names:
+        folders = [x[name] for x in inputs if name in x]
+        logger.info(f"{name}: merging {len(folders)} outputs")
+        status = merge_job_outputs(os.path.join(target, name), folders) and status
+    return status
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Command-line interface merging SAF outputs"""
+    parser = argparse.ArgumentParser(
+        description="Merge the SAF outputs of several runs of the same analysis: "
+        "histograms and cutflows are summed and the sample information is "
+        "combined."
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="job folders, Output/SAF folders or output folders of a dataset",
+    )
+    parser.add_argument("-o", "--output", required=True, help="output folder")
+    args = parser.parse_args(argv)
+    logging.basicConfig(format="%(message)s", level=logging.INFO)
+
+    for item in args.inputs:
+        if not os.path.isdir(item):
+            logger.error("Input not found: " + item)
+            return 1
+    return 0 if merge_saf_outputs(args.output, args.inputs) else 1
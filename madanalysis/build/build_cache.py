@@ -0,0 +1,167 @@
+################################################################################
+#
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+import glob
+import logging
+import os
+from typing import Optional
+
+from madanalysis.misc.cache_service import (
+    atomic_copy,
+    evict_lru,
+    file_lock,
+    hash_files,
+)
+
+# Files of a build folder entering the signature of the executable
+SOURCE_EXTENSIONS = (".cpp", ".cc", ".c", ".h", ".hpp", ".tpp")
+
+# Default maximum size of the cache, in GB
+BUDGET = 2.0
+
+
+class BuildCache:
+    """
+    Persistent content-addressed cache of the ``MadAnalysis5job`` executables.
+
+    Executables are stored in ``tools/Cache/Build/<signature>/`` where the
+    signature is a hash of all the sources and Makefiles of the build folder,
+    of the architecture description ``tools/architecture.ma5`` and of the
+    time stamps of the SampleAnalyzer libraries the executable is linked
+    against. A job folder whose sources have already been compiled, possibly
+    in another (deleted) folder, can then recover the executable instead of
+    recompiling it. The total size of the cache is bounded: when the budget
+    is exceeded, the least recently used executables are removed.
+
+    Args:
+        archi_info (``ArchitectureInfo``): architecture of the session
+        product (``str``, default ``"MadAnalysis5job"``): name of the executable
+        budget (``float``, default ``BUDGET``): maximum size of the cache in GB
+    """
+
+    def __init__(
+        self, archi_info, product: str = "MadAnalysis5job", budget: float = BUDGET
+    ):
+        self.archi_info = archi_info
+        self.product = product
+        self.path = os.path.normpath(archi_info.ma5dir + "/tools/Cache/Build")
+        self.budget = int(budget * 1024**3)
+        self.logger = logging.getLogger("MA5")
+
+    def signature(self, builddir: str) -> Optional[str]:
+        """
+        Compute the signature of a build folder.
+
+        Args:
+            builddir (``str``): path to the ``Build`` folder of the job
+
+        Returns:
+            ``Optional[str]``:
+            signature of the folder, ``None`` if it cannot be computed
+        """
+        files = []
+        for root, dirs, filenames in os.walk(builddir):
+            dirs[:] = sorted(x for x in dirs if x != "Log")
+            for name in filenames:
+                if name.endswith(SOURCE_EXTENSIONS) or name.startswith("Makefile"):
+                    files.append(os.path.join(root, name))
+
+        extra = ["product:" + self.product]
+        archi_file = os.path.normpath(
+            self.archi_info.ma5dir + "/tools/architecture.ma5"
+        )
+        libraries = glob.glob(self.archi_info.ma5dir + "/tools/SampleAnalyzer/Lib/*")
+        try:
+            for lib in sorted(libraries):
+                stat = os.stat(lib)
+                extra.append(
+                    os.path.basename(lib)
+                    + ":"
+                    + str(stat.st_mtime)
+                    + ":"
+                    + str(stat.st_size)
+                )
+            if os.path.isfile(archi_file):
+                extra.append(
+                    "architecture:"
+                    + hash_files([archi_file], root=os.path.dirname(archi_file))
+                )
+            return hash_files(files, root=builddir, extra=extra)
+        except OSError as err:
+            self.logger.debug("Cannot compute the build signature: " + str(err))
+            return None
+
+    def fetch(self, signature: Optional[str], builddir: str) -> bool:
+        """
+        Copy a cached executable into a build folder.
+
+        Args:
+            signature (``Optional[str]``): signature of the build folder
+            builddir (``str``): path to the ``Build`` folder of the job
+
+        Returns:
+            ``bool``:
+            ``True`` if the executable has been recovered from the cache
+        """
+        if signature is None:
+            return False
+        cached = os.path.join(self.path, signature, self.product)
+        if not os.path.isfile(cached):
+            return False
+        try:
+            atomic_copy(cached, os.path.join(builddir, self.product))
+        except OSError as err:
+            self.logger.debug("Cannot retrieve the cached executable: " + str(err))
+            return False
+        os.utime(os.path.join(self.path, signature), None)
+        self.logger.debug("Executable " + cached + " recovered from the build cache")
+        return True
+
+    def store(self, signature: Optional[str], builddir: str) -> bool:
+        """
+        Add the executable of a build folder to the cache, and evict the least
+        recently used executables if the cache exceeds its budget.
+
+        Args:
+            signature (``Optional[str]``): signature computed before the compilation
+            builddir (``str``): path to the ``Build`` folder of the job
+
+        Returns:
+            ``bool``:
+            ``True`` if the executable has been stored
+        """
+        executable = os.path.join(builddir, self.product)
+        if signature is None or not os.path.isfile(executable):
+            return False
+        try:
+            with file_lock(os.path.join(self.path, ".lock")):
+                atomic_copy(
+                    executable, os.path.join(self.path, signature, self.product)
+                )
+                evict_lru(self.path, self.product, self.budget, keep=signature)
+        except OSError as err:
+            self.logger.debug(
+                "Cannot store the executable in the build cache: " + str(err)
+            )
+            return False
+        return True
@@ -30,6 +30,7 @@ import os
 import shutil
 
 from madanalysis.enumeration.ma5_running_type import MA5RunningType
+from madanalysis.misc.signal_grid import load_grid_results, write_grid_outputs
 
 # pylint: disable=logging-fstring-interpolation, logging-not-lazy
 
@@ -47,7 +48,15 @@ class RecastConfiguration:
         "simplify_likelihoods": ["True", "False"],
         "analysis_only_mode": ["True", "False"],
 #        "stat_only_mode": "",
-        "TACO_output": ""
+        "TACO_output": "",
+        "ncores": [],
+        "lazy_cls": ["off", "on"],
+        "resume": ["True", "False"],
+        "recoevents_cache": [],
+        "delphes_in_memory": ["True", "False"],
+        "sfs_single_pass": ["True", "False"],
+        "adaptive_grid": ["True", "False"],
+        "early_stopping": [],
     }
 
     def __init__(self):
@@ -69,6 +78,14 @@ class RecastConfiguration:
         self.stat_only_mode = False
         self.analysis_only_mode = False
         self.stat_only_dir = None
+        self.ncores = 1
+        self.lazy_cls = 0
+        self.resume = False
+        self.recoevents_cache = 0.0
+        self.delphes_in_memory = False
+        self.sfs_single_pass = False
+        self.adaptive_grid = False
+        self.early_stopping = 0.0
         self.DelphesDic = {}
         self.description = {}
         self.ma5dir = os.path.abspath(
@@ -131,6 +148,14 @@ class RecastConfiguration:
             self.user_DisplayParameter("global_likelihoods")
 #            self.user_DisplayParameter("stat_only_mode")
             self.user_DisplayParameter("analysis_only_mode")
+            self.user_DisplayParameter("ncores")
+            self.user_DisplayParameter("lazy_cls")
+            self.user_DisplayParameter("resume")
+            self.user_DisplayParameter("recoevents_cache")
+            self.user_DisplayParameter("delphes_in_memory")
+            self.user_DisplayParameter("sfs_single_pass")
+            self.user_DisplayParameter("adaptive_grid")
+            self.user_DisplayParameter("early_stopping")
 
     def user_DisplayParameter(self, parameter):
         if parameter == "status":
@@ -228,6 +253,47 @@ class RecastConfiguration:
         elif parameter == "analysis_only_mode":
             if self.analysis_only_mode:
                 self.logger.info("   * MadAnalysis 5 will only compute the various signal region efficiencies (no statistical treatment).")
+        elif parameter == "ncores":
+            if self.ncores > 1:
+                self.logger.info(
+                    f"   * Datasets and limits are computed in parallel using {self.ncores} processes"
+                )
+        elif parameter == "lazy_cls":
+            if self.lazy_cls > 0:
+                self.logger.info(
+                    f"   * CLs only computed for the {self.lazy_cls} best expected region(s) of each analysis"
+                )
+        elif parameter == "resume":
+            if self.resume:
+                self.logger.info(
+                    "   * Interrupted runs are resumed from the manifest of the output folder"
+                )
+        elif parameter == "recoevents_cache":
+            if self.recoevents_cache > 0:
+                self.logger.info(
+                    f"   * Reconstructed events cached (up to {self.recoevents_cache} GB)"
+                )
+        elif parameter == "delphes_in_memory":
+            if self.delphes_in_memory:
+                self.logger.info(
+                    "   * Delphes is run in memory by the PAD (no intermediate ROOT file)"
+                )
+        elif parameter == "sfs_single_pass":
+            if self.sfs_single_pass:
+                self.logger.info(
+                    "   * All SFS cards are processed in a single pass over the events"
+                )
+        elif parameter == "adaptive_grid":
+            if self.adaptive_grid:
+                self.logger.info(
+                    "   * Signal grids are scanned adaptively along the exclusion boundary"
+                )
+        elif parameter == "early_stopping":
+            if self.early_stopping > 0:
+                self.logger.info(
+                    "   * Event processing stopped once the most sensitive region efficiencies"
+                    + f" are known within {self.early_stopping:.1%}"
+                )
 
         return
 
@@ -494,6 +560,97 @@ class RecastConfiguration:
                 self.logger.error("analysis_only_mode can only be set to 'True' or 'False'.")
                 return
 
+        # Number of datasets recast simultaneously
+        elif parameter == "ncores":
+            try:
+                ncores = int(value)
+            except ValueError:
+                self.logger.error("The number of cores must be a positive integer.")
+                return
+            if ncores < 1:
+                self.logger.error("The number of cores must be a positive integer.")
+                return
+            self.ncores = ncores
+
+        # Exclusion CLs only computed for the k best expected regions
+        elif parameter == "lazy_cls":
+            if value.lower() in ["on", "off"]:
+                self.lazy_cls = int(value.lower() == "on")
+                return
+            try:
+                lazy_cls = int(value)
+            except ValueError:
+                lazy_cls = -1
+            if lazy_cls < 0:
+                self.logger.error(
+                    "lazy_cls can only be set to 'on', 'off' or a positive integer."
+                )
+                return
+            self.lazy_cls = lazy_cls
+
+        # Resuming an interrupted run
+        elif parameter == "resume":
+            if value.lower() in ["true", "false"]:
+                self.resume = value.lower() == "true"
+            else:
+                self.logger.error("resume can only be set to 'True' or 'False'.")
+                return
+
+        # Size (in GB) of the machine-wide cache of reconstructed events
+        elif parameter == "recoevents_cache":
+            try:
+                size = float(value)
+            except ValueError:
+                size = -1.0
+            if size < 0.0:
+                self.logger.error(
+                    "The size of the RecoEvents cache must be a positive number (in GB)."
+                )
+                return
+            self.recoevents_cache = size
+
+        # Delphes run by the PAD executable
+        elif parameter == "delphes_in_memory":
+            if value.lower() in ["true", "false"]:
+                self.delphes_in_memory = value.lower() == "true"
+            else:
+                self.logger.error(
+                    "delphes_in_memory can only be set to 'True' or 'False'."
+                )
+                return
+
+        # Several SFS cards processed in a single job
+        elif parameter == "sfs_single_pass":
+            if value.lower() in ["true", "false"]:
+                self.sfs_single_pass = value.lower() == "true"
+            else:
+                self.logger.error(
+                    "sfs_single_pass can only be set to 'True' or 'False'."
+                )
+                return
+
+        # Adaptive sampling of a signal grid
+        elif parameter == "adaptive_grid":
+            if value.lower() in ["true", "false"]:
+                self.adaptive_grid = value.lower() == "true"
+            else:
+                self.logger.error("adaptive_grid can only be set to 'True' or 'False'.")
+                return
+
+        # Early stopping of the event loop
+        elif parameter == "early_stopping":
+            try:
+                target = float(value)
+            except ValueError:
+                target = -1.0
+            if target < 0.0 or target >= 1.0:
+                self.logger.error(
+                    "The early-stopping target must be a relative uncertainty "
+                    + "between 0 (disabled) and 1."
+                )
+                return
+            self.early_stopping = target
+
         # other rejection if no algo specified
         else:
             self.logger.error(f"The recast module has no parameter called '{parameter}'")
@@ -513,7 +670,15 @@ class RecastConfiguration:
                     "error_extrapolation",
                     "global_likelihoods",
 #                    "stat_only_mode",
-                    "analysis_only_mode"
+                    "analysis_only_mode",
+                    "ncores",
+                    "lazy_cls",
+                    "resume",
+                    "recoevents_cache",
+                    "delphes_in_memory",
+                    "sfs_single_pass",
+                    "adaptive_grid",
+                    "early_stopping",
                 ]  # , "simplify_likelihoods"
         else:
             table = []
@@ -792,6 +957,9 @@ class RecastConfiguration:
         )
         self.logger.debug('Check file "' + filename + '"...')
         if not os.path.isfile(filename):
+            # Grid points skipped by the adaptive scan only have interpolated results
+            if load_grid_results(dirname, dataset.name).get("interpolated", False):
+                return True
             self.logger.error(
                 "The file '"
                 + dirname
@@ -802,20 +970,38 @@ class RecastConfiguration:
             return False
         return True
 
+    @staticmethod
+    def grid_mode(datasets):
+        """Whether the datasets form a signal grid (grid coordinates defined)"""
+        return any(len(item.grid) != 0 for item in datasets)
+
     def collect_outputs(self, dirname, datasets):
         dirname = self.stat_only_dir if self.stat_only_mode else dirname
+        # Signal grid: one table per analysis with all the grid points, in
+        # addition to the summary of all datasets
+        if self.grid_mode(datasets):
+            write_grid_outputs(dirname, datasets)
         filename = os.path.normpath(
             os.path.join(dirname, "Output/SAF/CLs_output_summary.dat")
         )
         self.logger.debug('Check summary file "' + filename + '"...')
         out = open(filename, "w")
         counter = 1
+        # The datasets are merged in the order in which they have been declared,
+        # independently of the order in which they have been processed
         for item in datasets:
-            outset = open(
-                os.path.normpath(
-                    os.path.join(dirname, "Output", "SAF", item.name, "CLs_output.dat")
-                )
+            setfile = os.path.normpath(
+                os.path.join(dirname, "Output", "SAF", item.name, "CLs_output.dat")
             )
+            if not os.path.isfile(setfile):
+                # Grid points skipped by the adaptive scan are only in the grid tables
+                if load_grid_results(dirname, item.name).get("interpolated", False):
+                    continue
+                self.logger.warning(
+                    "No CLs output for the dataset " + item.name + ": skipping it."
+                )
+                continue
+            outset = open(setfile)
             for line in outset:
                 if counter == 1 and "# analysis name" in line:
                     out.write("# dataset name".ljust(30) + line[2:])
@@ -65,6 +65,8 @@ class Main:
         "outputfile": ['"output.lhe.gz"', '"output.lhco.gz"'],
         "recast": ["on", "off"],
         "random_seed": ["47"],
+        "ncores": [],
+        "runtime_thresholds": ["on", "off"],
     }
 
     forced = False
@@ -93,6 +95,8 @@ class Main:
         self.logger = logging.getLogger("MA5")
         self.redirectSAlogger = False
         self.random_seed = None
+        self.ncores = 1
+        self.runtime_thresholds = False
 
     def ResetParameters(self):
         self.merging = MergingConfiguration()
@@ -255,6 +259,8 @@ class Main:
         self.user_DisplayParameter("normalize")
         self.user_DisplayParameter("lumi")
         self.user_DisplayParameter("outputfile")
+        self.user_DisplayParameter("ncores")
+        self.user_DisplayParameter("runtime_thresholds")
         self.fom.Display()
         self.logger.info(" *********************************")
         allowed, forbidden = self.GetSampleFormat()
@@ -314,6 +320,13 @@ class Main:
             self.logger.info(" integrated luminosity = " + str(self.lumi) + " fb^{-1}")
         elif parameter == "recast":
             self.logger.info(' Recasting mode = "' + self.recasting.status + '"')
+        elif parameter == "ncores":
+            self.logger.info(
+                " number of datasets analysed simultaneously = " + str(self.ncores)
+            )
+        elif parameter == "runtime_thresholds":
+            word = "on" if self.runtime_thresholds else "off"
+            self.logger.info(" cut thresholds read at runtime = " + word)
         else:
             self.logger.error("'main' has no parameter called '" + parameter + "'")
 
@@ -343,6 +356,28 @@ class Main:
             self.random_seed = tmp
             self.logger.debug(f"Random seed has been set to {self.random_seed}")
 
+        # number of SampleAnalyzer processes
+        elif parameter == "ncores":
+            try:
+                tmp = int(value)
+            except ValueError:
+                self.logger.error("'ncores' is a positive integer value")
+                return False
+            if tmp < 1:
+                self.logger.error("'ncores' is a positive integer value")
+                return False
+            self.ncores = tmp
+
+        # cut thresholds read from a parameter file
+        elif parameter == "runtime_thresholds":
+            if value == "on":
+                self.runtime_thresholds = True
+            elif value == "off":
+                self.runtime_thresholds = False
+            else:
+                self.logger.error("'runtime_thresholds' possible values are : 'on', 'off'")
+                return False
+
         # stacked
         elif parameter == "stacking_method":
             if value == "stack":
@@ -49,6 +49,7 @@ class Dataset:
                       "pdf_down_variation"   : [], \
                       "pdf_variation"        : [], \
                       "title"       : [], \
+                      "grid"        : [], \
                       "weighted_events": ["true","false"]}
 
     def __init__(self,name):
@@ -69,6 +70,7 @@ class Dataset:
         self.backshade         = 0
         self.filenames         = []
         self.title             = name
+        self.grid              = []
         self.weighted_events   = True
         self.measured_global   = SampleInfo() 
         self.measured_detail   = []
@@ -322,6 +324,18 @@ class Dataset:
                 logging.getLogger('MA5').error("the value of the attribute '"+variable+\
                               "' must be set to a string.")
                 
+        # grid coordinates
+        elif variable == "grid":
+            if value[0] in ["'",'"'] and value[-1] in ["'",'"']:
+                value=value[1:-1]
+            try:
+                tmp = [float(x) for x in value.split(',') if x.strip()!='']
+            except:
+                logging.getLogger('MA5').error("the value of the attribute '"+variable+\
+                              "' must be a comma-separated list of numbers, e.g. \"500,100\".")
+                return
+            self.grid=tmp
+
         # other    
         else:
             logging.getLogger('MA5').error("the class dataset has no attribute denoted by '"+variable+"'.")
@@ -336,6 +350,8 @@ class Dataset:
         self.user_DisplayParameter("PDF_unc")
         self.user_DisplayParameter("weight")
         self.user_DisplayParameter("weighted_events")
+        if len(self.grid)!=0:
+            self.user_DisplayParameter("grid")
         self.user_DisplayParameter("linecolor")
         self.user_DisplayParameter("linestyle")
         self.user_DisplayParameter("linewidth")
@@ -385,6 +401,8 @@ class Dataset:
                 logging.getLogger('MA5').info("   Taking account of event weight: false")
         elif parameter=="title":
             logging.getLogger('MA5').info("   Title = '"+self.title+"'")
+        elif parameter=="grid":
+            logging.getLogger('MA5').info("   Grid coordinates = "+", ".join([str(x) for x in self.grid]))
         elif parameter=="linecolor":
             msg=ColorType.convert2string(self.linecolor)
             if self.lineshade!=0 and self.linecolor!=ColorType.AUTO:
@@ -350,7 +350,7 @@ class CmdSubmit(CmdBase):
             self.logger.error("job submission aborted.")
             return False
 
-        if not self.resubmit:
+        if not self.resubmit and not jobber.resumed:
             if self.main.recasting.status != 'on':
                 self.logger.info("   Copying 'SampleAnalyzer' source files...")
             if not jobber.CopyLHEAnalysis():
@@ -380,6 +380,9 @@ class CmdSubmit(CmdBase):
             if not jobber.WriteSelectionSource(self.main):
                 self.logger.error("job submission aborted.")
                 return False
+            if not jobber.WriteCutParameters(self.main):
+                self.logger.error("job submission aborted.")
+                return False
 
         self.logger.info("   Writing the list of datasets...")
         for item in self.main.datasets:
@@ -391,7 +394,10 @@ class CmdSubmit(CmdBase):
             if not self.main.recasting.analysis_only_mode:
                 self.main.recasting.collect_outputs(dirname,self.main.datasets)
                 self.logger.info('    -> the results can be found in:') 
-                self.logger.info('       '+ dirname + '/Output/SAF/CLs_output_summary.dat')
+                if self.main.recasting.grid_mode(self.main.datasets):
+                    self.logger.info('       '+ dirname + '/Output/SAF/Grid')
+                else:
+                    self.logger.info('       '+ dirname + '/Output/SAF/CLs_output_summary.dat')
                 for item in self.main.datasets:
                     self.logger.info('       '+ dirname + '/Output/SAF/'+ item.name + '/CLs_output.dat')
             else:
@@ -422,22 +428,40 @@ class CmdSubmit(CmdBase):
                 self.logger.error("job submission aborted.")
                 return False
 
-        if self.resubmit and not self.main.recasting.status=='on':
+        # Resubmission: no need to rebuild an executable which is up to date
+        uptodate = self.resubmit and not self.main.recasting.status=='on' and \
+                   jobber.BuildUpToDate()
+        if uptodate:
+            self.logger.info("   'SampleAnalyzer' is up to date: no compilation needed.")
+
+        if self.resubmit and not self.main.recasting.status=='on' and not uptodate:
             self.logger.info("   Cleaning 'SampleAnalyzer'...")
             if not jobber.MrproperJob():
                 self.logger.error("job submission aborted.")
                 return False
 
         if not self.main.recasting.status=='on':
-            self.logger.info("   Compiling 'SampleAnalyzer'...")
-            if not jobber.CompileJob():
-                self.logger.error("job submission aborted.")
-                return False
+            if not uptodate:
+                self.logger.info("   Compiling 'SampleAnalyzer'...")
+                if not jobber.CompileJob():
+                    self.logger.error("job submission aborted.")
+                    return False
 
-            self.logger.info("   Linking 'SampleAnalyzer'...")
-            if not jobber.LinkJob():
-                self.logger.error("job submission aborted.")
-                return False
+                self.logger.info("   Linking 'SampleAnalyzer'...")
+                if not jobber.LinkJob():
+                    self.logger.error("job submission aborted.")
+                    return False
+
+            if self.main.ncores>1:
+                self.logger.info("   Running 'SampleAnalyzer' over "+str(len(self.main.datasets))+\
+                                 " datasets with "+str(self.main.ncores)+" simultaneous processes...")
+                self.logger.info("    *******************************************************")
+                failed = jobber.RunJobs(self.main.datasets,self.main.ncores)
+                self.logger.info("    *******************************************************")
+                if len(failed)!=0:
+                    self.logger.error("run over the following datasets aborted: "+\
+                                      ", ".join("'"+x+"'" for x in failed))
+                return True
 
             for item in self.main.datasets:
                 self.logger.info("   Running 'SampleAnalyzer' over dataset '"
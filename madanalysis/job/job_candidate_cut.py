@@ -32,6 +32,7 @@ from madanalysis.enumeration.operator_type    import OperatorType
 from madanalysis.enumeration.argument_type    import ArgumentType
 from madanalysis.interpreter.cmd_cut          import CmdCut
 from madanalysis.enumeration.combination_type import CombinationType
+from madanalysis.job.job_cut_parameters      import GetThreshold
 import logging
 import copy
 from six.moves import range
@@ -269,7 +270,7 @@ def WriteFactorizedCutWith0Arg(file,main,iabs,container,tagName,tagIndex,conditi
     file.write(container+'[muf]->' +\
                condition.observable.code(main.mode) +\
                OperatorType.convert2cpp(condition.operator) +\
-               str(condition.threshold) +\
+               GetThreshold(main,iabs,tagIndex,condition) +\
                ') '+tagName+'['+str(tagIndex)+']=true;\n')
 
 
@@ -333,7 +334,7 @@ def WriteJobExecuteNbody(file,iabs,combi1,main,container,tagName,tagIndex,condit
         file.write(containers1[0]+'[a]->' +\
                    TheObs+'('+container+'[muf])' +\
                    OperatorType.convert2cpp(condition.operator) +\
-                   str(condition.threshold) +\
+                   GetThreshold(main,iabs,tagIndex,condition) +\
                    ') {'+tagName+'['+str(tagIndex)+']=true; break;}\n')
 
         for ind in range(len(combi1)):
@@ -374,12 +375,12 @@ def WriteJobExecuteNbody(file,iabs,combi1,main,container,tagName,tagIndex,condit
             else:
               TheObs=obs.code_reco[:-2]
             file.write(TheObs+'('+container+'[muf])'+ OperatorType.convert2cpp(condition.operator) + \
-                   str(condition.threshold) +   \
+                   GetThreshold(main,iabs,tagIndex,condition) +   \
                    ') {'+tagName+'['+str(tagIndex)+']=true; break;}\n')
         else:
             file.write(obs.code(main.mode)+\
                    '('+container+'[muf])'+ OperatorType.convert2cpp(condition.operator) + \
-                   str(condition.threshold) +   \
+                   GetThreshold(main,iabs,tagIndex,condition) +   \
                    ') {'+tagName+'['+str(tagIndex)+']=true; break;}\n')
 
     for ind in range(len(combi1)):
@@ -0,0 +1,120 @@
+################################################################################
+#  
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#  
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#  
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#  
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#  
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#  
+################################################################################
+
+
+from __future__ import absolute_import
+
+# Parameter file read by the analysis at initialization (in the Input folder)
+CUT_PARAMETER_FILE = 'cut_parameters.dat'
+
+
+def ThresholdName(iabs,index):
+    return 'threshold_'+str(iabs)+'_'+str(index)
+
+
+def CutName(icut):
+    return 'cutname_'+str(icut)
+
+
+def GetThreshold(main,iabs,index,condition):
+    # C++ code of the threshold of a condition
+    if main.runtime_thresholds:
+        return ThresholdName(iabs,index)
+    return str(condition.threshold)
+
+
+def GetCutName(main,cut,icut):
+    # C++ code of the name of an event cut
+    if main.runtime_thresholds:
+        return CutName(icut)
+    return '"'+str(icut)+'_'+cut.conditions.GetStringDisplay()+'"'
+
+
+def GetCutParameters(main):
+    # Thresholds of all conditions and names of the event cuts
+    # (the names display the thresholds)
+    from madanalysis.job.job_event_cut import GetConditions
+    parameters = []
+    icut = 0
+    for iabs in range(len(main.selection.table)):
+        item = main.selection[iabs]
+        if item.__class__.__name__!="Cut":
+            continue
+        conditions = []
+        GetConditions(item.conditions,conditions)
+        for ind in range(len(conditions)):
+            parameters.append([ThresholdName(iabs,ind),str(conditions[ind].threshold)])
+        if len(item.part)==0:
+            icut+=1
+            parameters.append([CutName(icut),str(icut)+'_'+item.conditions.GetStringDisplay()])
+    return parameters
+
+
+def WriteCutParameterFile(file,main):
+    file.write('# Cut parameters of the MadAnalysis 5 job: <name> <value>\n')
+    for name, value in GetCutParameters(main):
+        file.write(name+' '+value+'\n')
+
+
+def WriteCutParameterDeclarations(file,main):
+    if not main.runtime_thresholds:
+        return
+    file.write('  // Cut parameters read at initialization\n')
+    for name, value in GetCutParameters(main):
+        if name.startswith('cutname_'):
+            file.write('  std::string '+name+';\n')
+        else:
+            file.write('  MAdouble64 '+name+';\n')
+
+
+def WriteCutParameterReading(file,main):
+    if not main.runtime_thresholds:
+        return
+    filename = '../Input/'+CUT_PARAMETER_FILE
+    file.write('  // ===== Cut parameters ===== //\n')
+    file.write('  std::map<std::string,std::string> cutparameters;\n')
+    file.write('  std::ifstream cutinput("'+filename+'");\n')
+    file.write('  if (!cutinput.good())\n')
+    file.write('  {\n')
+    file.write('    ERROR << "the file \''+filename+'\' cannot be opened" << endmsg;\n')
+    file.write('    return false;\n')
+    file.write('  }\n')
+    file.write('  std::string cutline;\n')
+    file.write('  while (std::getline(cutinput,cutline))\n')
+    file.write('  {\n')
+    file.write('    std::size_t pos = cutline.find(\' \');\n')
+    file.write('    if (cutline.empty() || cutline[0]==\'#\' || pos==std::string::npos) continue;\n')
+    file.write('    cutparameters[cutline.substr(0,pos)] = cutline.substr(pos+1);\n')
+    file.write('  }\n')
+    for name, value in GetCutParameters(main):
+        file.write('  if (cutparameters.find("'+name+'")==cutparameters.end())\n')
+        file.write('  {\n')
+        file.write('    ERROR << "the parameter \''+name+'\' is not found in the file \''+\
+                   filename+'\'" << endmsg;\n')
+        file.write('    return false;\n')
+        file.write('  }\n')
+        if name.startswith('cutname_'):
+            file.write('  '+name+' = cutparameters["'+name+'"];\n')
+        else:
+            file.write('  '+name+' = std::atof(cutparameters["'+name+'"].c_str());\n')
+    file.write('\n')
@@ -32,6 +32,7 @@ from madanalysis.enumeration.operator_type    import OperatorType
 from madanalysis.enumeration.argument_type    import ArgumentType
 from madanalysis.interpreter.cmd_cut          import CmdCut
 from madanalysis.enumeration.combination_type import CombinationType
+from madanalysis.job.job_cut_parameters      import GetThreshold, GetCutName
 import logging
 from six.moves import range
 
@@ -89,11 +90,11 @@ def WriteEventCut(file,main,iabs,icut):
     # Event Cut ?
     if len(main.selection[iabs].part)==0:
         if main.selection[iabs].cut_type==CutType.SELECT:
-            file.write('    if(!Manager()->ApplyCut('+tagName+'_global, \"' +\
-              str(icut)+'_'+main.selection[iabs].conditions.GetStringDisplay()+ '\")) return true;\n')
+            file.write('    if(!Manager()->ApplyCut('+tagName+'_global, ' +\
+              GetCutName(main,main.selection[iabs],icut)+ ')) return true;\n')
         else:
-            file.write('    if(!Manager()->ApplyCut(!'+tagName+'_global, \"' +\
-              str(icut)+'_'+main.selection[iabs].conditions.GetStringDisplay()+ '\")) return true;\n')
+            file.write('    if(!Manager()->ApplyCut(!'+tagName+'_global, ' +\
+              GetCutName(main,main.selection[iabs],icut)+ ')) return true;\n')
 
     # Closing bracket for the current histo
     file.write('  }\n')
@@ -118,7 +119,7 @@ def WriteCutWith0Arg(file,main,iabs,icut,tagName,tagIndex,condition):
     file.write('      '+tagName+'['+str(tagIndex)+'] = (')
     file.write(condition.observable.code(main.mode)+' ')
     file.write(OperatorType.convert2cpp(condition.operator)+' ')
-    file.write(str(condition.threshold))
+    file.write(GetThreshold(main,iabs,tagIndex,condition))
     file.write(' );\n')
 
 
@@ -212,7 +213,7 @@ def WriteJobExecute2Nbody(file,iabs,icut,combi1,combi2,main,tagName,tagIndex,con
             file.write('      }\n')
         open('      if ( Ncounter ')
         file.write(OperatorType.convert2cpp(condition.operator) + \
-                   str(condition.threshold) +   \
+                   GetThreshold(main,iabs,tagIndex,condition) +   \
                    ') '+tagName+'['+tagIndex+']=true;\n')
 
     # Normal case
@@ -253,7 +254,7 @@ def WriteJobSum2N(file,iabs,icut,combi1,combi2,main,tagName,tagIndex,condition,i
         file.write(containers1[0]+'['+iterator1+'[0]]->' +\
                    TheObs+'('+containers2[0]+'['+iterator2+'[0]])' +\
                    OperatorType.convert2cpp(condition.operator) +\
-                   str(condition.threshold) +\
+                   GetThreshold(main,iabs,tagIndex,condition) +\
                    ') {'+tagName+'['+str(tagIndex)+']=true; break;}\n')
         return
 
@@ -299,7 +300,7 @@ def WriteJobSum2N(file,iabs,icut,combi1,combi2,main,tagName,tagIndex,condition,i
           TheObs=obs.code_reco[:-2]
         file.write('      if (q1.'+TheObs+'(q2)'+\
                    ''+ OperatorType.convert2cpp(condition.operator) + \
-                   str(condition.threshold) +   \
+                   GetThreshold(main,iabs,tagIndex,condition) +   \
                    ') {'+tagName+'['+str(tagIndex)+']=true; break;}\n')
 
 
@@ -342,7 +343,7 @@ def WriteJobExecuteNbody(file,iabs,icut,combination,main,tagName,tagIndex,condit
             file.write('      }\n')
         file.write('      if ( Ncounter ')
         file.write(OperatorType.convert2cpp(condition.operator) + \
-                   str(condition.threshold) +   \
+                   GetThreshold(main,iabs,tagIndex,condition) +   \
                    ') '+tagName+'['+str(tagIndex)+']=true;\n')
 
     # Adding values
@@ -437,7 +438,7 @@ def WriteJobSum(file,iabs,icut,combination,main,tagName,tagIndex,condition,itera
         file.write(containers[0]+'['+iterator+'[0]]->' +\
                    obs.code(main.mode) +\
                    OperatorType.convert2cpp(condition.operator) +\
-                   str(condition.threshold) +\
+                   GetThreshold(main,iabs,tagIndex,condition) +\
                    ') {'+tagName+'['+str(tagIndex)+']=true; break;}\n')
         return
 
@@ -460,7 +461,7 @@ def WriteJobSum(file,iabs,icut,combination,main,tagName,tagIndex,condition,itera
             obs.code(main.mode))
         file.write(oper_string.join(variables))
         file.write(')'+ OperatorType.convert2cpp(condition.operator) + \
-                   str(condition.threshold) +   \
+                   GetThreshold(main,iabs,tagIndex,condition) +   \
                    ') {'+tagName+'['+str(tagIndex)+']=true; break;}\n')
 
     # Vector sum/diff
@@ -477,7 +478,7 @@ def WriteJobSum(file,iabs,icut,combination,main,tagName,tagIndex,condition,itera
         file.write('        if (q.')
         file.write(obs.code(main.mode)+\
                    ''+ OperatorType.convert2cpp(condition.operator) + \
-                   str(condition.threshold) +   \
+                   GetThreshold(main,iabs,tagIndex,condition) +   \
                    ') {'+tagName+'['+str(tagIndex)+']=true; break;}\n')
     # ratio
     elif obs.combination==CombinationType.RATIO and \
@@ -493,5 +494,5 @@ def WriteJobSum(file,iabs,icut,combination,main,tagName,tagIndex,condition,itera
                    obs.code(main.mode)+\
                    ')')
         file.write(')'+ OperatorType.convert2cpp(condition.operator) + \
-                   str(condition.threshold) +   \
+                   GetThreshold(main,iabs,tagIndex,condition) +   \
                    ') {'+tagName+'['+str(tagIndex)+']=true; break;}\n')
@@ -452,7 +452,8 @@ def WriteSelection(file,main,part_list):
             if len(main.selection[iabs].part)==0:
                 logging.getLogger('MA5').debug("- selection step = cut on event")
                 file.write('  // Event selection number '+str(icut)+'\n')
-                file.write('  // '+main.selection[iabs].GetStringDisplay()+'\n')
+                if not main.runtime_thresholds:
+                    file.write('  // '+main.selection[iabs].GetStringDisplay()+'\n')
                 JobEventCut.WriteEventCut(file,main,iabs,icut)
                 icut+=1
 
@@ -460,7 +461,8 @@ def WriteSelection(file,main,part_list):
             else:
                 logging.getLogger('MA5').debug("- selection step = cut on candidate")
                 file.write('  // Object selection number '+str(iobject)+'\n')
-                file.write('  // '+main.selection[iabs].GetStringDisplay()+'\n')
+                if not main.runtime_thresholds:
+                    file.write('  // '+main.selection[iabs].GetStringDisplay()+'\n')
                 JobCandidateCut.WriteCandidateCut(file,main,iabs,part_list)
                 iobject+=1
 
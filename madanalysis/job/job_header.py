@@ -25,6 +25,7 @@
 from __future__ import absolute_import
 from madanalysis.selection.instance_name      import InstanceName
 from madanalysis.enumeration.ma5_running_type import MA5RunningType
+from madanalysis.job.job_cut_parameters      import WriteCutParameterDeclarations
 from six.moves import range
 
 def WriteHeader(file,main):
@@ -35,6 +36,9 @@ def WriteHeader(file,main):
 
     # Including headers files
     file.write('#include "SampleAnalyzer/Process/Analyzer/AnalyzerBase.h"\n')
+    if main.runtime_thresholds:
+        file.write('#include <fstream>\n')
+        file.write('#include <cstdlib>\n')
     if main.archi_info.has_root:
         file.write('#include "SampleAnalyzer/Interfaces/root/RootMainHeaders.h"\n')
     file.write('\n')
@@ -69,6 +73,9 @@ def WriteCore(file,main,part_list):
                       regions = part_list[ind][3],\
                       level   = main.mode)
 
+    # Cut parameters
+    WriteCutParameterDeclarations(file,main)
+
 
 def WriteParticle(file,part,rank,status,regions,level):
     # Skipping if already defined
@@ -24,6 +24,7 @@
 
 from __future__ import absolute_import
 from madanalysis.enumeration.ma5_running_type import MA5RunningType
+from madanalysis.job.job_cut_parameters      import GetCutName, WriteCutParameterReading
 import logging
 
 def WriteHadronicList(file,main):
@@ -67,6 +68,9 @@ def WriteJobInitialize(file,main):
                        str(main.isolation.isolation.ET_PT) + ');\n')
         file.write('\n')
 
+    # Cut parameters
+    WriteCutParameterReading(file,main)
+
     # Region initiatization
     file.write('  // ===== Signal region ===== //\n')
     if main.regions.GetNames() == []:
@@ -87,13 +91,13 @@ def WriteJobInitialize(file,main):
                     if len(item.regions)!=1:
                         file.write('  std::string RNc'+str(counter)+'[]={'+\
                             (', '.join('"'+reg+'"' for reg in item.regions))+'};\n')
-                        file.write('  Manager()->AddCut(\"' + str(counter) + '_' + item.conditions.GetStringDisplay() +\
-                            '\", RNc'+ str(counter)+');\n');
+                        file.write('  Manager()->AddCut(' + GetCutName(main,item,counter) +\
+                            ', RNc'+ str(counter)+');\n');
                     else:
-                        file.write('  Manager()->AddCut(\"' + str(counter) + '_' + item.conditions.GetStringDisplay() + '\", '+\
+                        file.write('  Manager()->AddCut(' + GetCutName(main,item,counter) + ', '+\
                            '\"'+item.regions[0]+'\");\n');
                 else:
-                    file.write('  Manager()->AddCut(\"' + str(counter) + '_' + item.conditions.GetStringDisplay() + '\");\n');
+                    file.write('  Manager()->AddCut(' + GetCutName(main,item,counter) + ');\n');
     file.write('\n')
 
     # Histo initiatization
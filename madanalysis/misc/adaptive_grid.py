@@ -0,0 +1,291 @@
+################################################################################
+#
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+
+"""
+Adaptive scan of a signal grid: the grid is first recast on a coarse
+sub-grid, which is then refined only where the exclusion boundary may lie.
+"""
+
+import logging
+from typing import Optional
+
+from madanalysis.dataset.dataset_collection import DatasetCollection
+from madanalysis.misc.signal_grid import (
+    exclusion_cls,
+    load_grid_results,
+    store_grid_results,
+)
+
+logger = logging.getLogger("MA5")
+
+# A point is recast if its interpolated CLs lies within this distance of the
+# exclusion level...
+CLS_WINDOW = 0.1
+# ... or if the interpolation uncertainty exceeds this value
+MAX_UNCERTAINTY = 0.25
+
+
+class AdaptiveGridScan:
+    """
+    Adaptive recasting of the signal datasets equipped with grid coordinates.
+
+    The datasets are located on the lattice formed by the distinct values of
+    each coordinate. A coarse sub-lattice is recast first. The step of the
+    lattice is then halved iteratively: the CLs of the new points are
+    linearly interpolated along the grid lines from the points already
+    available, and a point is recast only if its interpolated CLs is close to
+    the exclusion level, if its neighbours lie on both sides of the level or
+    if the interpolation uncertainty is large. The points that have never been
+    recast are finally assigned their interpolated CLs.
+
+    Args:
+        recaster (``RunRecast``): recasting machinery
+        level (``float``, default ``0.95``): CLs of the exclusion boundary
+    """
+
+    def __init__(self, recaster, level: float = 0.95):
+        self.recaster = recaster
+        self.main = recaster.main
+        self.level = level
+        self.axes = []  # distinct values of each coordinate
+        self.points = {}  # lattice indices -> dataset
+        self.others = []  # datasets without grid coordinates
+        self.cls = {}  # lattice indices -> {(lumi, analysis): CLs}
+
+    @property
+    def dirname(self) -> str:
+        """Folder containing the results of the CLs calculation"""
+        if self.main.recasting.stat_only_mode:
+            return self.main.recasting.stat_only_dir
+        return self.recaster.dirname
+
+    def setup(self) -> bool:
+        """
+        Locate the datasets on the grid lattice.
+
+        Returns:
+            ``bool``:
+            ``False`` if the grid coordinates are inconsistent
+        """
+        datasets = [x for x in self.main.datasets if len(x.grid) != 0]
+        self.others = [x for x in self.main.datasets if len(x.grid) == 0]
+        dim = len(datasets[0].grid)
+        if any(len(x.grid) != dim for x in datasets):
+            logger.error("All the grid coordinates must have the same dimension.")
+            return False
+        self.axes = [sorted(set(x.grid[i] for x in datasets)) for i in range(dim)]
+        for dataset in datasets:
+            idx = tuple(axis.index(x) for axis, x in zip(self.axes, dataset.grid))
+            if idx in self.points:
+                logger.error(
+                    "The datasets "
+                    + self.points[idx].name
+                    + " and "
+                    + dataset.name
+                    + " have the same grid coordinates."
+                )
+                return False
+            self.points[idx] = dataset
+        return True
+
+    def on_lattice(self, idx: tuple, step: int) -> bool:
+        """Whether grid indices belong to the sub-lattice of a given step"""
+        return all(
+            i % step == 0 or i == len(axis) - 1 for i, axis in zip(idx, self.axes)
+        )
+
+    def initial_step(self) -> int:
+        """Step of the coarse lattice, keeping at least three points per axis"""
+        npoints = max(len(axis) for axis in self.axes)
+        step = 1
+        while 4 * step <= npoints - 1:
+            step *= 2
+        return step
+
+    def recast(self, indices: list, others: Optional[list] = None) -> bool:
+        """
+        Run the recasting machinery on a subset of the grid points.
+
+        Args:
+            indices (``list``): lattice indices of the points to recast
+            others (``list``, default ``None``): additional datasets to recast
+
+        Returns:
+            ``bool``:
+            ``True`` if the recasting succeeded
+        """
+        datasets = [self.points[idx] for idx in indices] + (others or [])
+        if len(datasets) == 0:
+            return True
+        subset = DatasetCollection()
+        subset.table = [x for x in self.main.datasets.table if x[1] in datasets]
+        alldatasets = self.main.datasets
+        self.main.datasets = subset
+        try:
+            status = self.recaster.execute_runs()
+        finally:
+            self.main.datasets = alldatasets
+        if not status:
+            return False
+        for idx in indices:
+            content = load_grid_results(self.dirname, self.points[idx].name)
+            self.cls[idx] = {
+                (lumi, analysis): exclusion_cls(results)
+                for lumi, analyses in content.get("results", {}).items()
+                for analysis, results in analyses.items()
+            }
+        return True
+
+    def neighbours(self, idx: tuple, axis: int, key: tuple, known: dict) -> list:
+        """
+        Closest points on both sides of a point along a grid line, for which
+        the CLs is known.
+
+        Returns:
+            ``list``:
+            ``(coordinate, CLs, uncertainty)`` of the lower and upper neighbours
+            (``None`` if not available)
+        """
+        found = []
+        for direction in [-1, 1]:
+            point, i = None, idx[axis] + direction
+            while 0 <= i < len(self.axes[axis]):
+                other = idx[:axis] + (i,) + idx[axis + 1 :]
+                if other in known and known[other].get(key) is not None:
+                    value, uncertainty = known[other][key]
+                    point = (self.axes[axis][i], value, uncertainty)
+                    break
+                i += direction
+            found.append(point)
+        return found
+
+    def interpolate(self, step: int) -> dict:
+        """
+        Interpolated CLs of the points of a sub-lattice that have not been
+        recast. The points lying on the grid lines of the coarser lattice are
+        treated first, so that their estimates can be used for the others.
+
+        Args:
+            step (``int``): step of the sub-lattice
+
+        Returns:
+            ``dict``:
+            ``{(lumi, analysis): (CLs, uncertainty, across)}`` per lattice
+            indices, where ``across`` tells whether the neighbours lie on both
+            sides of the exclusion level (``CLs`` is ``None`` if the point
+            cannot be interpolated)
+        """
+        known = {
+            idx: {key: (value, 0.0) for key, value in cls.items() if value is not None}
+            for idx, cls in self.cls.items()
+        }
+        keys = sorted(set(key for cls in self.cls.values() for key in cls))
+        candidates = sorted(
+            [
+                idx
+                for idx in self.points
+                if idx not in self.cls and self.on_lattice(idx, step)
+            ],
+            key=lambda idx: sum(
+                i % (2 * step) != 0 and i != len(axis) - 1
+                for i, axis in zip(idx, self.axes)
+            ),
+        )
+        estimates = {}
+        for idx in candidates:
+            estimates[idx] = {}
+            for key in keys:
+                values, uncertainties, across = [], [], False
+                for axis in range(len(self.axes)):
+                    lower, upper = self.neighbours(idx, axis, key, known)
+                    if lower is None or upper is None:
+                        continue
+                    (x1, c1, u1), (x2, c2, u2) = lower, upper
+                    x = self.axes[axis][idx[axis]]
+                    values.append(c1 + (c2 - c1) * (x - x1) / (x2 - x1))
+                    uncertainties.append(max(0.5 * abs(c2 - c1), u1, u2))
+                    across = across or (c1 - self.level) * (c2 - self.level) <= 0.0
+                if len(values) == 0:
+                    estimates[idx][key] = (None, None, True)
+                    continue
+                value = sum(values) / len(values)
+                uncertainty = max(uncertainties + [max(values) - min(values)])
+                estimates[idx][key] = (value, uncertainty, across)
+                known.setdefault(idx, {})[key] = (value, uncertainty)
+        return estimates
+
+    def needs_recast(self, estimate: dict) -> bool:
+        """Whether a point must be recast, given its interpolated CLs"""
+        if len(estimate) == 0:
+            return True
+        for value, uncertainty, across in estimate.values():
+            if value is None or across:
+                return True
+            if abs(value - self.level) < CLS_WINDOW or uncertainty > MAX_UNCERTAINTY:
+                return True
+        return False
+
+    def run(self) -> bool:
+        """
+        Perform the adaptive scan.
+
+        Returns:
+            ``bool``:
+            ``True`` if all the recasting steps succeeded
+        """
+        if not self.setup():
+            return False
+        step = self.initial_step()
+        batch = [idx for idx in self.points if self.on_lattice(idx, step)]
+        logger.info(
+            f"   Adaptive grid scan: recasting {len(batch)} of the "
+            + f"{len(self.points)} grid points on the coarse grid..."
+        )
+        if not self.recast(sorted(batch), self.others):
+            return False
+        while step > 1:
+            step //= 2
+            estimates = self.interpolate(step)
+            batch = [idx for idx, x in estimates.items() if self.needs_recast(x)]
+            logger.info(
+                f"   Adaptive grid scan: {len(batch)} new points to recast "
+                + f"({len(estimates) - len(batch)} interpolated)..."
+            )
+            if not self.recast(sorted(batch)):
+                return False
+
+        for idx, estimate in self.interpolate(1).items():
+            results = {}
+            for (lumi, analysis), (value, uncertainty, _) in estimate.items():
+                results.setdefault(lumi, {})[analysis] = {
+                    "interpolated": {"CLs": value, "uncertainty": uncertainty}
+                }
+            store_grid_results(
+                self.dirname, self.points[idx], results, interpolated=True
+            )
+        logger.info(
+            f"   Adaptive grid scan: {len(self.cls)} of the {len(self.points)} "
+            + "grid points have been recast"
+        )
+        return True
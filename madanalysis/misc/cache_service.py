@@ -0,0 +1,184 @@
+################################################################################
+#
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+"""Helpers shared by the on-disk caches of MadAnalysis 5."""
+
+import contextlib
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger("MA5")
+
+
+def hash_update_file(sha, filename: str) -> None:
+    """
+    Feed the content of a file to a hash object.
+
+    Args:
+        sha (``hashlib._Hash``): hash object
+        filename (``str``): file to read
+    """
+    with open(filename, "rb") as stream:
+        for chunk in iter(lambda: stream.read(1 << 20), b""):
+            sha.update(chunk)
+
+
+def hash_files(
+    filenames: Iterable[str], root: Optional[str] = None, extra: Iterable[str] = ()
+) -> str:
+    """
+    Content hash of a set of files.
+
+    Args:
+        filenames (``Iterable[str]``): files to hash
+        root (``str``, default ``None``): if given, the file names are hashed
+            relative to this folder, so that the hash does not depend on the
+            location of the files
+        extra (``Iterable[str]``): additional strings entering the hash
+
+    Returns:
+        ``str``:
+        hexadecimal SHA-256 digest
+    """
+    sha = hashlib.sha256()
+    for item in extra:
+        sha.update(("extra:" + str(item) + "\n").encode())
+    for filename in sorted(filenames):
+        name = os.path.relpath(filename, root) if root is not None else filename
+        sha.update(("file:" + name + "\n").encode())
+        hash_update_file(sha, filename)
+    return sha.hexdigest()
+
+
+def atomic_write(filename: str, content, mode: str = "w") -> None:
+    """
+    Write a file atomically: readers see either the old or the new version.
+
+    Args:
+        filename (``str``): target file
+        content (``str`` or ``bytes``): content to write
+        mode (``str``, default ``"w"``): ``"w"`` or ``"wb"``
+    """
+    folder = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(folder, exist_ok=True)
+    handle, tmpname = tempfile.mkstemp(dir=folder, prefix=".tmp_")
+    try:
+        with os.fdopen(handle, mode) as stream:
+            stream.write(content)
+        os.replace(tmpname, filename)
+    except Exception:
+        if os.path.exists(tmpname):
+            os.remove(tmpname)
+        raise
+
+
+def atomic_copy(source: str, target: str, link: bool = False) -> None:
+    """
+    Copy a file atomically, preserving its permissions.
+
+    Args:
+        source (``str``): file to copy
+        target (``str``): destination
+        link (``bool``, default ``False``): create a hard link instead of a copy
+            when both files are on the same file system
+    """
+    folder = os.path.dirname(os.path.abspath(target))
+    os.makedirs(folder, exist_ok=True)
+    handle, tmpname = tempfile.mkstemp(dir=folder, prefix=".tmp_")
+    os.close(handle)
+    try:
+        if link:
+            os.remove(tmpname)
+            try:
+                os.link(source, tmpname)
+            except OSError:
+                shutil.copy2(source, tmpname)
+        else:
+            shutil.copy2(source, tmpname)
+        os.replace(tmpname, target)
+    except Exception:
+        if os.path.exists(tmpname):
+            os.remove(tmpname)
+        raise
+
+
+@contextlib.contextmanager
+def file_lock(filename: str) -> Iterator[None]:
+    """
+    Exclusive inter-process lock based on ``fcntl.flock``.
+
+    Args:
+        filename (``str``): lock file (created if necessary)
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+    with open(filename, "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def evict_lru(
+    path: str, filename: str, budget: int, keep: Optional[str] = None
+) -> None:
+    """
+    Remove the least recently used entries of a cache until its size is within
+    its budget. Each entry is a folder of the cache containing a given file,
+    the modification time of the folder being the time of its last use. The
+    entries whose file is also linked elsewhere (e.g. in the working folder of
+    a running job) are kept, as removing them would not free any space.
+
+    Args:
+        path (``str``): cache folder
+        filename (``str``): name of the file of each entry
+        budget (``int``): maximum size of the cache in bytes
+        keep (``Optional[str]``): entry that must not be removed
+    """
+    entries = []
+    for key in os.listdir(path):
+        content = os.path.join(path, key, filename)
+        if os.path.isfile(content):
+            stat = os.stat(content)
+            entries.append(
+                (
+                    os.path.getmtime(os.path.join(path, key)),
+                    stat.st_size,
+                    stat.st_nlink > 1,
+                    key,
+                )
+            )
+    total = sum(x[1] for x in entries)
+    for _, size, shared, key in sorted(entries):
+        if total <= budget:
+            break
+        if key == keep or shared:
+            continue
+        logger.debug("Removing the cache entry " + os.path.join(path, key))
+        shutil.rmtree(os.path.join(path, key), ignore_errors=True)
+        total -= size
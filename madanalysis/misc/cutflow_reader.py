@@ -0,0 +1,134 @@
+################################################################################
+#
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+
+"""
+Single-pass reader of the cutflows of the recast analyses, with an in-memory
+cache and a compact sidecar file per cutflow folder.
+"""
+
+import json
+import logging
+import os
+from typing import Optional
+
+from madanalysis.misc.cache_service import atomic_write
+
+logger = logging.getLogger("MA5")
+
+
+def parse_cutflow(filename: str) -> Optional[dict]:
+    """
+    Extract the initial and final counters of a region from its cutflow file.
+
+    Args:
+        filename (``str``): SAF cutflow file of the region
+
+    Returns:
+        ``Optional[dict]``:
+        sums of weights (``N0``, ``Nf``) and of squared weights (``N0w2``,
+        ``Nfw2``) before the first and after the last cut, ``None`` if the
+        file does not contain them
+    """
+    counters = {}
+    block = None
+    with open(filename, "r") as stream:
+        for line in stream:
+            if "sum of weights" in line and block is not None:
+                words = line.split()
+                value = float(words[0]) + float(words[1])
+                counters[block + ("w2" if "^2" in line else "")] = value
+            elif "<InitialCounter>" in line:
+                block = "N0"
+            elif "<Counter>" in line:
+                block = "Nf"
+            elif "</InitialCounter>" in line or "</Counter>" in line:
+                block = None
+    if "N0" not in counters or "Nf" not in counters:
+        return None
+    return counters
+
+
+class CutflowReader:
+    """
+    Cutflow counters of all the regions of an analysis, read in a single pass.
+
+    The counters of a cutflow folder are kept in memory and stored in the
+    sidecar file ``.cutflows.json`` of the folder, together with the names,
+    modification times and sizes of the cutflow files. They are read again
+    only if the folder content changes, so that repeated CLs calculations
+    (extrapolated luminosities, statistics-only runs) do not parse the SAF
+    files again.
+    """
+
+    SIDECAR = ".cutflows.json"
+
+    def __init__(self):
+        self.memory = {}
+
+    @staticmethod
+    def stamp(path: str) -> list:
+        """Names, modification times and sizes of the cutflow files of a folder"""
+        stamp = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.endswith(".saf") and entry.is_file():
+                    stat = entry.stat()
+                    stamp.append([entry.name, stat.st_mtime_ns, stat.st_size])
+        return sorted(stamp)
+
+    def load(self, path: str) -> dict:
+        """
+        Args:
+            path (``str``): cutflow folder of an analysis
+
+        Returns:
+            ``dict``:
+            counters per region file name (without the ``.saf`` extension),
+            ``None`` for the files without valid counters
+        """
+        try:
+            stamp = self.stamp(path)
+        except OSError:
+            return {}
+        cached = self.memory.get(path)
+        if cached is not None and cached["stamp"] == stamp:
+            return cached["regions"]
+
+        sidecar = os.path.join(path, self.SIDECAR)
+        try:
+            with open(sidecar, "r") as stream:
+                cached = json.load(stream)
+        except (OSError, ValueError):
+            cached = None
+        if cached is None or cached.get("stamp") != stamp:
+            regions = {}
+            for name, _, _ in stamp:
+                regions[name[:-4]] = parse_cutflow(os.path.join(path, name))
+            cached = {"stamp": stamp, "regions": regions}
+            try:
+                atomic_write(sidecar, json.dumps(cached))
+            except OSError as err:
+                logger.debug("Cannot write " + sidecar + ": " + str(err))
+        self.memory[path] = cached
+        return cached["regions"]
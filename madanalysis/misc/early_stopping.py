@@ -0,0 +1,271 @@
+################################################################################
+#
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+
+"""
+Statistical early stopping of the event loop of the recasting jobs.
+"""
+
+import logging
+import math
+import os
+import threading
+from typing import Optional
+
+logger = logging.getLogger("MA5")
+
+# Files exchanged with the running job, in its Output folder
+PROGRESS_FILE = "early_stopping_progress.dat"
+STOP_FILE = "early_stopping.stop"
+
+# Number of events between two reports of the region counters
+REPORT_FREQUENCY = 5000
+
+# Minimal number of events to process before stopping
+MIN_EVENTS = 20000
+
+# Time (in seconds) between two readings of the region counters
+POLLING_INTERVAL = 5.0
+
+
+def add_early_stopping(filename: str, analyses: list) -> None:
+    """
+    Instrument the main program of a job so that it periodically reports the
+    region counters of the analyses, and stops its event loop when a stop is
+    requested. The analyzers are then finalized as for a complete run. The
+    remaining input files are skipped, so that the stop must only be requested
+    for jobs reading a single event file.
+
+    Args:
+        filename (``str``): path to the main program (``main.cpp``)
+        analyses (``list``): names of the analyses whose regions are reported
+    """
+    with open(filename, "r") as stream:
+        lines = stream.readlines()
+    newlines, included = [], False
+    for line in lines:
+        if line.startswith("#include") and not included:
+            newlines.append(
+                '#include "SampleAnalyzer/Process/Analyzer/EarlyStopping.h"\n'
+            )
+            included = True
+        if (
+            "// Post initialization (creates the new output directory structure)"
+            in line
+        ):
+            newlines.append("  // Early stopping of the event loop\n")
+            newlines.append(
+                '  EarlyStopping earlystop("../Output/'
+                + PROGRESS_FILE
+                + '","../Output/'
+                + STOP_FILE
+                + '",'
+                + str(REPORT_FREQUENCY)
+                + ");\n"
+            )
+            for analysis in analyses:
+                newlines.append("  earlystop.Add(analyzer_" + analysis + ");\n")
+            newlines.append("\n")
+        elif "// Opening input file" in line:
+            newlines.append("    if (earlystop.Stopped()) break;\n")
+        newlines.append(line)
+        if "manager.UpdateProgressBar();" in line:
+            newlines.append("      if (earlystop.Update()) break;\n")
+    with open(filename, "w") as stream:
+        stream.writelines(newlines)
+
+
+def efficiency_uncertainty(sumw0, sumw20, sumw, sumw2) -> Optional[float]:
+    """
+    Relative statistical uncertainty on a (weighted) selection efficiency.
+
+    Args:
+        sumw0, sumw20 (``float``): sum of weights and squared weights before
+            the selection
+        sumw, sumw2 (``float``): sum of weights and squared weights after the
+            selection
+
+    Returns:
+        ``Optional[float]``:
+        relative uncertainty (``None`` if the efficiency vanishes)
+    """
+    if sumw0 <= 0.0 or sumw <= 0.0:
+        return None
+    eff = sumw / sumw0
+    variance = ((1.0 - 2.0 * eff) * sumw2 + eff**2 * sumw20) / sumw0**2
+    return math.sqrt(max(variance, 0.0)) / eff
+
+
+def read_progress(filename: str) -> tuple:
+    """
+    Read the region counters reported by a running job.
+
+    Args:
+        filename (``str``): progress file
+
+    Returns:
+        ``tuple``:
+        number of events processed and ``{analysis: {region: counters}}``,
+        where the counters are the sums of weights and squared weights before
+        and after the selection
+    """
+    nevents, counters = 0, {}
+    try:
+        with open(filename, "r") as stream:
+            for line in stream:
+                if line.startswith("# nevents"):
+                    nevents = int(line.split()[-1])
+                    continue
+                words = line.rstrip("\n").split("\t")
+                if len(words) != 6:
+                    continue
+                counters.setdefault(words[0], {})[words[1]] = [
+                    float(x) for x in words[2:]
+                ]
+    except (OSError, ValueError):
+        return 0, {}
+    return nevents, counters
+
+
+def converged(counters: dict, target: float, limits: Optional[dict] = None) -> bool:
+    """
+    Whether the efficiency of the most sensitive region of each analysis is
+    known with a relative statistical uncertainty below a target. The
+    sensitivity of a region is its efficiency divided by its expected upper
+    limit on the number of signal events. The regions whose limit is unknown
+    may be the most sensitive ones, so that they must all have converged.
+
+    Args:
+        counters (``dict``): output of ``read_progress``
+        target (``float``): target relative uncertainty
+        limits (``dict``, default ``None``): expected upper limits on the
+            number of signal events, per analysis and region
+
+    Returns:
+        ``bool``:
+        ``True`` if the event loop can be stopped
+    """
+    if len(counters) == 0:
+        return False
+    limits = limits or {}
+    for analysis, regions in counters.items():
+        selected = {
+            name: counts
+            for name, counts in regions.items()
+            if counts[0] > 0.0 and counts[2] > 0.0
+        }
+        if len(selected) == 0:
+            return False
+        known = {
+            name: limits[analysis][name]
+            for name in selected
+            if limits.get(analysis, {}).get(name, 0.0) > 0.0
+        }
+        to_check = [name for name in selected if name not in known]
+        if len(known) > 0:
+            to_check.append(
+                max(
+                    known,
+                    key=lambda name: selected[name][2]
+                    / selected[name][0]
+                    / known[name],
+                )
+            )
+        for name in to_check:
+            uncertainty = efficiency_uncertainty(*selected[name])
+            if uncertainty is None or uncertainty > target:
+                return False
+    return True
+
+
+class EarlyStopMonitor:
+    """
+    Context manager watching a running job instrumented by
+    ``add_early_stopping``. The region counters reported by the job are read
+    periodically in a background thread; once the relative statistical
+    uncertainty on the efficiency of the most sensitive region of every
+    analysis is below the target, the stop file is created and the job ends its event
+    loop and writes its outputs.
+
+    Args:
+        folder (``str``): ``Output`` folder of the job
+        target (``float``): target relative uncertainty (``0`` disables
+            the monitor)
+        limits (``dict``, default ``None``): expected upper limits on the
+            number of signal events, per analysis and region (see
+            ``converged``)
+    """
+
+    def __init__(self, folder: str, target: float, limits: Optional[dict] = None):
+        self.progress = os.path.join(folder, PROGRESS_FILE)
+        self.stopfile = os.path.join(folder, STOP_FILE)
+        self.target = target
+        self.limits = limits
+        self.stopped = False
+        self._done = threading.Event()
+        self._thread = None
+
+    def clean(self) -> None:
+        """Remove the files exchanged with the job"""
+        for filename in [self.progress, self.stopfile]:
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+    def check(self) -> bool:
+        """
+        Read the counters and request a stop if the target is reached.
+
+        Returns:
+            ``bool``:
+            ``True`` if a stop has been requested
+        """
+        nevents, counters = read_progress(self.progress)
+        if nevents < MIN_EVENTS or not converged(counters, self.target, self.limits):
+            return False
+        with open(self.stopfile, "w") as stream:
+            stream.write(str(nevents) + "\n")
+        logger.info(
+            f"   Target precision reached after {nevents} events: "
+            + "stopping the event loop"
+        )
+        self.stopped = True
+        return True
+
+    def _watch(self) -> None:
+        while not self._done.wait(POLLING_INTERVAL):
+            if self.check():
+                return
+
+    def __enter__(self):
+        if self.target > 0.0:
+            self.clean()
+            self._thread = threading.Thread(target=self._watch, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        if self._thread is not None:
+            self._done.set()
+            self._thread.join()
+            self.clean()
+        return False
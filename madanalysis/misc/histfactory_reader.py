@@ -26,16 +26,54 @@ import json
 import logging
 import math
 import os
-import sys
 from collections import OrderedDict
 from pathlib import Path
 from typing import Tuple
 
+import numpy as np
+
+from madanalysis.misc.cache_service import hash_files
+from madanalysis.misc.simplified_likelihood_cache import SimplifiedLikelihoodCache
+
 try:
     from spey_pyhf.helper_functions import WorkspaceInterpreter
 except ImportError:
     WorkspaceInterpreter = None
 
+# Parsed HistFactory workspaces, indexed by file name (see load_workspace)
+_WORKSPACES = {}
+
+
+def load_workspace(filename):
+    """
+    Read a HistFactory workspace. The parsed workspace, together with the NumPy
+    arrays derived from it (see ``HistFactory.scalable_arrays``), is kept in
+    memory and reused as long as the content of the file is unchanged, so that
+    it is not parsed again for each signal and luminosity. It must therefore
+    not be modified in place. The content is only hashed again when the
+    modification time or the size of the file changes.
+
+    Args:
+        filename (``str``): path to the workspace
+
+    Returns:
+        ``dict``:
+        cache entry, the workspace being stored under the ``"workspace"`` key
+    """
+    filename = os.path.abspath(filename)
+    stat = os.stat(filename)
+    file_key = (stat.st_mtime_ns, stat.st_size)
+    entry = _WORKSPACES.get(filename)
+    if entry is not None and entry["stat"] == file_key:
+        return entry
+    digest = hash_files([filename])
+    if entry is None or entry["digest"] != digest:
+        with open(filename, "r") as json_file:
+            entry = {"digest": digest, "workspace": json.load(json_file), "arrays": {}}
+        _WORKSPACES[filename] = entry
+    entry["stat"] = file_key
+    return entry
+
 
 class HistFactory:
     def __init__(self, pyhf_config):
@@ -44,6 +82,8 @@ class HistFactory:
         self.path = Path(pyhf_config.get("path", "missing_path"))
         self.name = pyhf_config.get("name", "missing_name")
         self.logger = logging.getLogger("MA5")
+        self._arrays, self._arrays_source = None, None
+        self._workspace = None  # entry of load_workspace
         if isinstance(self, HF_Background):
             self.hf = {}
             self.global_config = self.pyhf_config
@@ -58,147 +98,164 @@ class HistFactory:
         observables will be extrapolated and summed, summation is superseeded
         to the observed values since there is no observation in HL.
 
-        Modifiers are extrapolated with respect to their nature."""
+        Modifiers are extrapolated with respect to their nature. The numerical
+        content to be rescaled is stored as NumPy arrays (see ``scalable_arrays``)
+        and the extrapolated workspace is a copy-on-write version of the original
+        one: only the containers leading to modified entries are copied."""
         lumi = float(lumi)
         if lumi == self.lumi or self.hf in [{}, []]:
             return self.hf
-        HF = copy.deepcopy(self.hf)
         lumi_scale = round(lumi / self.lumi, 6)
-
+        factors = {
+            "data": lumi_scale,
+            "signal": lumi_scale,
+            "linear": lumi_scale,
+            "sqrt": math.sqrt(lumi_scale),
+        }
+
+        copies = {}
+        total_expected = {}
         if isinstance(self, HF_Background):
-            # Background extrapolation
-            total_expected = {}
             for SR, item in self.pyhf_config.items():
                 if SR != "lumi":
-                    total_expected[SR] = [0.0] * len(item["data"])
+                    total_expected[SR] = np.zeros(len(item["data"]))
+
+        for location, kind, array, channel in self.scalable_arrays():
+            scaled = array * factors[kind]
+            if kind == "data":
+                total_expected[channel] += scaled
+            if kind == "signal":
+                value = [round(x, 6) for x in scaled.tolist()]
+            else:
+                value = scaled.tolist()
+            copy_on_write(self.hf, copies, location, value)
+
+        # replace the observed bkg with total expected bkg
+        for key, item in total_expected.items():
+            for iobs, observation in enumerate(self.hf.get("observations", [])):
+                if key == observation["name"] and len(item) > 0:
+                    copy_on_write(
+                        self.hf, copies, ("observations", iobs, "data"), item.tolist()
+                    )
 
-            for iSR in range(len(HF["channels"])):
-                self.logger.debug(
-                    "  * Extrapolating channel " + str(HF["channels"][iSR]["name"])
+        return copies.get((), self.hf)
+
+    def scalable_arrays(self):
+        """
+        NumPy representation of the yields and modifiers of the workspace that
+        depend on the luminosity. It is computed once and reused until the
+        workspace is modified.
+
+        Returns:
+            ``list[tuple]``:
+            one ``(location, kind, array, channel)`` entry per channel, sample
+            and modifier, ``location`` being the sequence of keys leading to the
+            list in ``self.hf``, and ``kind`` being ``"data"`` (background yields),
+            ``"signal"`` (signal yields), ``"linear"`` (modifiers scaling
+            linearly with the luminosity) or ``"sqrt"`` (statistical modifiers)
+        """
+        if self._arrays is not None and self._arrays_source is self.hf:
+            return self._arrays
+        shared_key = None
+        if self._workspace is not None and self._workspace["workspace"] is self.hf:
+            # arrays shared by all the objects built from the same workspace
+            shared_key = tuple(
+                sorted(
+                    key
+                    for key, item in self.pyhf_config.items()
+                    if key != "lumi" and len(item["data"]) == 0
                 )
-                if len(total_expected[HF["channels"][iSR]["name"]]) == 0:
+            )
+            if shared_key in self._workspace["arrays"]:
+                self._arrays = self._workspace["arrays"][shared_key]
+                self._arrays_source = self.hf
+                return self._arrays
+        arrays = []
+        if isinstance(self, HF_Background):
+            for ich, channel in enumerate(self.hf.get("channels", [])):
+                if len(self.pyhf_config[channel["name"]]["data"]) == 0:
                     continue
-
-                # modify the expected data of the sample
-                for sample in range(len(HF["channels"][iSR]["samples"])):
-                    self.logger.debug(
-                        "    * Extrapolating "
-                        + str(HF["channels"][iSR]["samples"][sample]["name"])
-                        + " sample"
+                for isample, sample in enumerate(channel["samples"]):
+                    location = ("channels", ich, "samples", isample)
+                    arrays.append(
+                        (
+                            location + ("data",),
+                            "data",
+                            np.asarray(sample["data"], dtype=float),
+                            channel["name"],
+                        )
                     )
-                    for i in range(len(HF["channels"][iSR]["samples"][sample]["data"])):
-                        HF["channels"][iSR]["samples"][sample]["data"][i] *= lumi_scale
-                        total_expected[HF["channels"][iSR]["name"]][i] += HF["channels"][
-                            iSR
-                        ]["samples"][sample]["data"][i]
-
-                    for imod in range(
-                        len(HF["channels"][iSR]["samples"][sample]["modifiers"])
-                    ):
-                        mod_type = HF["channels"][iSR]["samples"][sample]["modifiers"][
-                            imod
-                        ]["type"]
-                        if mod_type in ["normsys", "normfactor", "shapefactor", "lumi"]:
-                            continue
-
-                        # extrapolate shape variables
-                        elif mod_type == "shapesys":
-                            for i in range(
-                                len(
-                                    HF["channels"][iSR]["samples"][sample]["modifiers"][
-                                        imod
-                                    ]["data"]
-                                )
-                            ):
-                                HF["channels"][iSR]["samples"][sample]["modifiers"][imod][
-                                    "data"
-                                ][i] *= lumi_scale
-
-                        # extrapolate histo variables
-                        elif mod_type == "histosys":
-                            for i in range(
-                                len(
-                                    HF["channels"][iSR]["samples"][sample]["modifiers"][
-                                        imod
-                                    ]["data"]["hi_data"]
-                                )
-                            ):
-                                HF["channels"][iSR]["samples"][sample]["modifiers"][imod][
-                                    "data"
-                                ]["hi_data"][i] *= lumi_scale
-                            for i in range(
-                                len(
-                                    HF["channels"][iSR]["samples"][sample]["modifiers"][
-                                        imod
-                                    ]["data"]["lo_data"]
-                                )
-                            ):
-                                HF["channels"][iSR]["samples"][sample]["modifiers"][imod][
-                                    "data"
-                                ]["lo_data"][i] *= lumi_scale
-
-                        # extrapolate stat variables
-                        elif mod_type == "staterror":
-                            for i in range(
-                                len(
-                                    HF["channels"][iSR]["samples"][sample]["modifiers"][
-                                        imod
-                                    ]["data"]
-                                )
-                            ):
-                                HF["channels"][iSR]["samples"][sample]["modifiers"][imod][
-                                    "data"
-                                ][i] *= math.sqrt(lumi_scale)
-
-            # replace the observed bkg with total expected bkg
-            for key, item in total_expected.items():
-                for iobs in range(len(HF["observations"])):
-                    if key == HF["observations"][iobs]["name"]:
-                        if item != []:
-                            HF["observations"][iobs]["data"] = item
-
-        elif isinstance(self, HF_Signal):  # type(self) == HF_Signal:
-            # Signal extrapolation
-            for i in range(len(HF)):
-                if HF[i]["op"] == "remove":
+                    arrays += self.modifier_arrays(location, sample["modifiers"])
+        elif isinstance(self, HF_Signal):
+            for ipatch, patch in enumerate(self.hf):
+                if patch["op"] == "remove":
                     continue
-                HF[i]["value"]["data"] = [
-                    round(x * lumi_scale, 6) for x in HF[i]["value"]["data"]
-                ]
-                # Extrapolate modifiers
-                for imod in range(len(HF[i]["value"]["modifiers"])):
-                    mod_type = HF[i]["value"]["modifiers"][imod]["type"]
-                    if mod_type in ["normsys", "normfactor", "shapefactor", "lumi"]:
-                        continue
-
-                    # extrapolate shape variables
-                    elif mod_type == "shapesys":
-                        for i in range(len(HF[i]["value"]["modifiers"][imod]["data"])):
-                            HF[i]["value"]["modifiers"][imod]["data"][i] *= lumi_scale
-
-                    # extrapolate histo variables
-                    elif mod_type == "histosys":
-                        for i in range(
-                            len(HF[i]["value"]["modifiers"][imod]["data"]["hi_data"])
-                        ):
-                            HF[i]["value"]["modifiers"][imod]["data"]["hi_data"][
-                                i
-                            ] *= lumi_scale
-                        for i in range(
-                            len(HF[i]["value"]["modifiers"][imod]["data"]["lo_data"])
-                        ):
-                            HF[i]["value"]["modifiers"][imod]["data"]["lo_data"][
-                                i
-                            ] *= lumi_scale
-
-                    # extrapolate statistical variables
-                    elif mod_type == "staterror":
-                        for i in range(len(HF[i]["value"]["modifiers"][imod]["data"])):
-                            HF[i]["value"]["modifiers"][imod]["data"][i] *= math.sqrt(
-                                lumi_scale
-                            )
+                location = (ipatch, "value")
+                arrays.append(
+                    (
+                        location + ("data",),
+                        "signal",
+                        np.asarray(patch["value"]["data"], dtype=float),
+                        None,
+                    )
+                )
+                arrays += self.modifier_arrays(location, patch["value"]["modifiers"])
+        self._arrays, self._arrays_source = arrays, self.hf
+        if shared_key is not None:
+            self._workspace["arrays"][shared_key] = arrays
+        return arrays
+
+    @staticmethod
+    def modifier_arrays(location, modifiers):
+        """Luminosity-dependent modifiers of a sample (see ``scalable_arrays``)"""
+        arrays = []
+        for imod, modifier in enumerate(modifiers):
+            mod_location = location + ("modifiers", imod, "data")
+            # normsys, normfactor, shapefactor and lumi modifiers are not rescaled
+            if modifier["type"] == "shapesys":
+                arrays.append(
+                    (mod_location, "linear", np.asarray(modifier["data"], float), None)
+                )
+            elif modifier["type"] == "histosys":
+                for key in ["hi_data", "lo_data"]:
+                    arrays.append(
+                        (
+                            mod_location + (key,),
+                            "linear",
+                            np.asarray(modifier["data"][key], float),
+                            None,
+                        )
+                    )
+            elif modifier["type"] == "staterror":
+                arrays.append(
+                    (mod_location, "sqrt", np.asarray(modifier["data"], float), None)
+                )
+        return arrays
 
-        return HF
+
+def copy_on_write(tree, copies, location, value):
+    """
+    Set an entry of a nested dict/list structure without modifying the original
+    structure. Only the containers along the path to the entry are copied
+    (shallowly), the other ones being shared with the original structure.
+
+    Args:
+        tree (``dict`` or ``list``): original structure
+        copies (``dict``): copies already made, indexed by their location
+            (``copies[()]`` is the modified version of ``tree``)
+        location (``tuple``): sequence of keys leading to the entry
+        value: new value of the entry
+    """
+    if () not in copies:
+        copies[()] = copy.copy(tree)
+    node = copies[()]
+    for depth in range(1, len(location)):
+        prefix = location[:depth]
+        if prefix not in copies:
+            copies[prefix] = copy.copy(node[location[depth - 1]])
+            node[location[depth - 1]] = copies[prefix]
+        node = copies[prefix]
+    node[location[-1]] = value
 
 
 class HF_Background(HistFactory):
@@ -213,8 +270,8 @@ class HF_Background(HistFactory):
         bkg_file = self.path.joinpath(self.name)
         self.logger.debug("Reading : %s", bkg_file)
         if bkg_file.is_file():
-            with bkg_file.open("r") as json_file:
-                self.hf = json.load(json_file)
+            self._workspace = load_workspace(str(bkg_file))
+            self.hf = self._workspace["workspace"]
         else:
             self.logger.warning("Can not find file : %s", bkg_file)
 
@@ -293,8 +350,9 @@ class HF_Signal(HistFactory):
                 "The 'spey_pyhf' package is required for the HistFactory class."
             )
 
-        with self.path.joinpath(self.name).open("r") as json_file:
-            tmp_bkg = WorkspaceInterpreter(json.load(json_file))
+        tmp_bkg = WorkspaceInterpreter(
+            load_workspace(str(self.path.joinpath(self.name)))["workspace"]
+        )
 
         bin_map = tmp_bkg.bin_map
         self.poi_name = tmp_bkg.poi_name[0][1]
@@ -455,6 +513,7 @@ class HF_Signal(HistFactory):
         return HF
 
     def clear_modifiers(self):
+        self._arrays = None
         for i in range(len(self.hf)):
             self.hf[i]["value"]["modifiers"] = [
                 {"data": None, "name": "lumi", "type": "lumi"},
@@ -467,8 +526,7 @@ def get_HFID(file, SRname):
     Extract the location of the profiles within the JSON file.
     """
     if os.path.isfile(file):
-        with open(file, "r") as json_file:
-            HF = json.load(json_file)
+        HF = load_workspace(file)["workspace"]
     else:
         return "Can not find background file: " + file
     for ch in HF["channels"]:
@@ -507,84 +565,24 @@ def construct_histfactory_dictionary(info_root, run_recast_session) -> Tuple[dic
                     ):
                         main_path = pyhf_config[likelihood_profile]["path"]
                         full = str(subchild.text)
-                        simplified = full.split(".json")[0] + "_simplified.json"
-                        if os.path.isfile(os.path.join(main_path, simplified)):
-                            pyhf_config[likelihood_profile]["name"] = simplified
-                        else:
-                            simplify_path = os.path.join(
-                                run_recast_session.main.archi_info.ma5dir,
-                                "tools/simplify/simplify-master/src",
+                        cache = SimplifiedLikelihoodCache(
+                            run_recast_session.main.archi_info.ma5dir
+                        )
+                        try:
+                            pyhf_config[likelihood_profile]["name"] = cache.get(
+                                os.path.join(main_path, full)
                             )
-                            try:
-                                if (
-                                    os.path.isdir(simplify_path)
-                                    and simplify_path not in sys.path
-                                ):
-                                    sys.path.insert(0, simplify_path)
-                                import simplify
-
-                                run_recast_session.logger.debug(
-                                    "simplify has been imported from "
-                                    + " ".join(simplify.__path__)
-                                )
-                                run_recast_session.logger.debug("simplifying " + full)
-                                with open(os.path.join(main_path, full), "r") as f:
-                                    spec = json.load(f)
-                                # Get model and data
-                                poi_name = "lumi"
-                                try:
-                                    original_poi = spec["measurements"][0]["config"][
-                                        "poi"
-                                    ]
-                                    spec["measurements"][0]["config"]["poi"] = poi_name
-                                except IndexError:
-                                    raise simplify.exceptions.InvalidMeasurement(
-                                        "The measurement index 0 is out of bounds."
-                                    )
-                                model, data = simplify.model_tools.model_and_data(spec)
-
-                                fixed_params = model.config.suggested_fixed()
-                                init_pars = model.config.suggested_init()
-                                # Fit the model to data
-                                fit_result = simplify.fitter.fit(
-                                    model,
-                                    data,
-                                    init_pars=init_pars,
-                                    fixed_pars=fixed_params,
-                                )
-                                # Get yields
-                                ylds = simplify.yields.get_yields(spec, fit_result, [])
-                                newspec = simplify.simplified.get_simplified_spec(
-                                    spec,
-                                    ylds,
-                                    allowed_modifiers=[],
-                                    prune_channels=[],
-                                    include_signal=False,
-                                )
-                                newspec["measurements"][0]["config"]["poi"] = original_poi
-                                with open(
-                                    os.path.join(main_path, simplified), "w+"
-                                ) as out_file:
-                                    json.dump(newspec, out_file, indent=4, sort_keys=True)
-                                pyhf_config[likelihood_profile]["name"] = simplified
-                            except ImportError:
-                                run_recast_session.logger.warning(
-                                    "To use simplified likelihoods, please install simplify"
-                                )
-                                pyhf_config[likelihood_profile]["name"] = str(
-                                    subchild.text
-                                )
-                            except (
-                                Exception,
-                                simplify.exceptions.InvalidMeasurement,
-                            ) as err:
-                                run_recast_session.logger.warning(
-                                    "Can not simplify " + full
-                                )
-                                run_recast_session.logger.debug(str(err))
-                                pyhf_config[likelihood_profile]["name"] = str(
-                                    subchild.text
-                                )
+                        except ImportError:
+                            run_recast_session.logger.warning(
+                                "To use simplified likelihoods, please install simplify"
+                            )
+                            pyhf_config[likelihood_profile]["name"] = full
+                        except Exception as err:
+                            run_recast_session.logger.warning(
+                                "Can not simplify " + full
+                            )
+                            run_recast_session.logger.debug(str(err))
+                            pyhf_config[likelihood_profile]["name"] = full
                     else:
                         pyhf_config[likelihood_profile]["name"] = str(subchild.text)
                     run_recast_session.logger.debug(
@@ -0,0 +1,221 @@
+################################################################################
+#
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+import logging
+import multiprocessing
+import os
+import traceback
+from multiprocessing.connection import wait
+from typing import Callable, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger("MA5")
+
+
+def _run_child(func: Callable[[], bool]) -> None:
+    """Entry point of a forked worker: the exit code carries the job status."""
+    try:
+        status = bool(func())
+    except Exception as err:  # pylint: disable=broad-except
+        logger.error("Unexpected error in a worker process: %s", str(err))
+        logger.debug(traceback.format_exc())
+        status = False
+    logging.shutdown()
+    os._exit(0 if status else 1)  # pylint: disable=protected-access
+
+
+class ForkedProcessPool:
+    """
+    Bounded pool of forked worker processes.
+
+    Each job is a callable without argument returning ``True`` on success. The
+    job is executed in a child process obtained by forking the current session,
+    so that it inherits the full MadAnalysis 5 state (configuration, datasets,
+    etc.) without any pickling. Any modification of this state by the job is
+    local to the child process; results must therefore be exchanged through
+    the file system.
+
+    Args:
+        ncores (``int``): maximum number of simultaneously running processes
+    """
+
+    def __init__(self, ncores: int):
+        self.ncores = max(int(ncores), 1)
+        self.context = multiprocessing.get_context("fork")
+        self.running = {}
+        self.status = {}
+
+    def __len__(self):
+        return len(self.running)
+
+    def is_full(self) -> bool:
+        """Are all worker slots occupied?"""
+        return len(self.running) >= self.ncores
+
+    def submit(self, name: str, func: Callable[[], bool]) -> None:
+        """
+        Launch a job, waiting first for a free slot if necessary.
+
+        Args:
+            name (``str``): unique job name
+            func (``Callable[[], bool]``): job to execute
+        """
+        while self.is_full():
+            self.wait_any()
+        process = self.context.Process(target=_run_child, args=(func,), name=name)
+        process.start()
+        self.running[name] = process
+        logger.debug("Process %s started (pid %s)", name, process.pid)
+
+    def wait_any(self) -> List[Tuple[str, bool]]:
+        """
+        Wait until at least one running job finishes.
+
+        Returns:
+            ``List[Tuple[str, bool]]``:
+            names and status of the jobs that finished
+        """
+        if not self.running:
+            return []
+        sentinels = {proc.sentinel: name for name, proc in self.running.items()}
+        finished = []
+        for sentinel in wait(list(sentinels.keys())):
+            name = sentinels[sentinel]
+            process = self.running.pop(name)
+            process.join()
+            self.status[name] = process.exitcode == 0
+            logger.debug(
+                "Process %s finished with exit code %s", name, process.exitcode
+            )
+            finished.append((name, self.status[name]))
+        return finished
+
+    def join(self) -> Dict[str, bool]:
+        """
+        Wait for all the jobs to finish.
+
+        Returns:
+            ``Dict[str, bool]``:
+            status of all the jobs submitted to the pool
+        """
+        while self.running:
+            self.wait_any()
+        return self.status
+
+    def terminate(self) -> None:
+        """Kill all running jobs."""
+        for name, process in self.running.items():
+            process.terminate()
+            process.join()
+            self.status[name] = False
+        self.running = {}
+
+
+class TaskGraph:
+    """
+    Dependency graph of jobs executed as soon as their inputs are ready.
+
+    Jobs are callables without argument returning ``True`` on success. They
+    are registered in an order compatible with their dependencies, which is
+    also the order in which ready jobs are launched. When the graph is run
+    with more than one core, the jobs are executed in a ``ForkedProcessPool``
+    and a job is launched as soon as all its dependencies have completed
+    successfully, so that independent stages overlap. With a single core,
+    the jobs are executed in the current process, in registration order.
+    Jobs depending on a failed job are not executed and are flagged as
+    failed.
+    """
+
+    def __init__(self):
+        self.tasks = {}
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tasks
+
+    def add(
+        self, name: str, func: Callable[[], bool], depends_on: Iterable[str] = ()
+    ) -> None:
+        """
+        Register a job.
+
+        Args:
+            name (``str``): unique job name
+            func (``Callable[[], bool]``): job to execute
+            depends_on (``Iterable[str]``): names of the jobs that must be
+                completed before this one starts; they must already be registered
+        """
+        if name in self.tasks:
+            raise ValueError(f"Job {name} is already registered")
+        depends_on = [x for x in depends_on if x is not None]
+        for dep in depends_on:
+            if dep not in self.tasks:
+                raise ValueError(f"Unknown dependency {dep} for job {name}")
+        self.tasks[name] = (func, depends_on)
+
+    def run(self, ncores: int = 1) -> Dict[str, bool]:
+        """
+        Execute all the jobs of the graph.
+
+        Args:
+            ncores (``int``, default ``1``): maximum number of simultaneous jobs
+
+        Returns:
+            ``Dict[str, bool]``:
+            status of each job (jobs that have not been executed are ``False``)
+        """
+        status = {}
+        if ncores <= 1:
+            for name, (func, depends_on) in self.tasks.items():
+                if all(status[dep] for dep in depends_on):
+                    status[name] = bool(func())
+                else:
+                    logger.debug("Job %s skipped: a dependency has failed", name)
+                    status[name] = False
+            return status
+
+        pool = ForkedProcessPool(ncores)
+        pending = list(self.tasks.keys())
+        try:
+            while pending or len(pool) > 0:
+                for name in list(pending):
+                    if pool.is_full():
+                        break
+                    func, depends_on = self.tasks[name]
+                    if any(status.get(dep) is False for dep in depends_on):
+                        logger.debug("Job %s skipped: a dependency has failed", name)
+                        status[name] = False
+                        pending.remove(name)
+                    elif all(status.get(dep, False) for dep in depends_on):
+                        pool.submit(name, func)
+                        pending.remove(name)
+                if len(pool) == 0:
+                    # Nothing running: the remaining jobs only depend on failed ones
+                    continue
+                for name, ok in pool.wait_any():
+                    status[name] = ok
+        except BaseException:
+            pool.terminate()
+            raise
+        return status
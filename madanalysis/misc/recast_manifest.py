@@ -0,0 +1,178 @@
+################################################################################
+#
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+
+"""
+Completion manifest of a recast run, allowing an interrupted run to be resumed.
+"""
+
+import json
+import logging
+import os
+from typing import Iterable, Optional
+
+from madanalysis.misc.cache_service import atomic_write, file_lock
+
+logger = logging.getLogger("MA5")
+
+DONE = "done"
+RUNNING = "running"
+FAILED = "failed"
+
+
+class RecastManifest:
+    """
+    Record of the recasting tasks performed in an output folder.
+
+    The manifest ``Output/SAF/recast_manifest.json`` contains one record per
+    (stage, dataset, detector card, analysis), where the stage is ``fastsim``,
+    ``pad`` or ``cls``. Each record carries the status of the task and a
+    fingerprint of its inputs, so that a restarted run only redoes the tasks
+    that are missing, failed or stale. The manifest is shared by the worker
+    processes of a run: each update is performed under a lock and written
+    atomically.
+
+    Args:
+        dirname (``str``): output folder of the recast run
+    """
+
+    FILENAME = "recast_manifest.json"
+
+    def __init__(self, dirname: str):
+        self.filename = os.path.join(dirname, "Output/SAF", self.FILENAME)
+
+    @staticmethod
+    def key(stage: str, dataset: str, card: str, analysis: str = "") -> str:
+        """Identifier of a record"""
+        return "|".join([stage, dataset, card, analysis])
+
+    def load(self) -> dict:
+        """
+        Returns:
+            ``dict``:
+            records of the manifest (empty if the manifest does not exist)
+        """
+        if not os.path.isfile(self.filename):
+            return {}
+        try:
+            with open(self.filename, "r") as stream:
+                return json.load(stream).get("records", {})
+        except (OSError, ValueError) as err:
+            logger.warning("Cannot read the recast manifest: " + str(err))
+            return {}
+
+    def record(
+        self, stage: str, dataset: str, card: str, analysis: str = ""
+    ) -> Optional[dict]:
+        """Record of a task (``None`` if not available)"""
+        return self.load().get(self.key(stage, dataset, card, analysis))
+
+    def is_done(
+        self,
+        stage: str,
+        dataset: str,
+        card: str,
+        analyses: Iterable[str],
+        inputs: dict,
+    ) -> bool:
+        """
+        Check whether a task has been completed with the same inputs.
+
+        Args:
+            stage (``str``): ``fastsim``, ``pad`` or ``cls``
+            dataset (``str``): name of the dataset
+            card (``str``): detector card
+            analyses (``Iterable[str]``): analyses processed by the task
+            inputs (``dict``): fingerprint of the inputs per analysis
+
+        Returns:
+            ``bool``:
+            ``True`` if all the records are completed and up to date
+        """
+        records = self.load()
+        for analysis in analyses:
+            record = records.get(self.key(stage, dataset, card, analysis))
+            if record is None or record.get("status") != DONE:
+                return False
+            if record.get("inputs") != inputs.get(analysis):
+                return False
+        return True
+
+    def update(
+        self,
+        stage: str,
+        dataset: str,
+        card: str,
+        analyses: Iterable[str],
+        inputs: dict,
+        status: str,
+        **extra,
+    ) -> None:
+        """
+        Set the status of a task.
+
+        Args:
+            stage (``str``): ``fastsim``, ``pad`` or ``cls``
+            dataset (``str``): name of the dataset
+            card (``str``): detector card
+            analyses (``Iterable[str]``): analyses processed by the task
+            inputs (``dict``): fingerprint of the inputs per analysis
+            status (``str``): ``running``, ``done`` or ``failed``
+            extra: additional information stored in the records
+        """
+        try:
+            with file_lock(self.filename + ".lock"):
+                records = self.load()
+                for analysis in analyses:
+                    record = {"status": status, "inputs": inputs.get(analysis)}
+                    record.update(extra)
+                    records[self.key(stage, dataset, card, analysis)] = record
+                atomic_write(
+                    self.filename,
+                    json.dumps({"records": records}, indent=1, sort_keys=True),
+                )
+        except OSError as err:
+            logger.warning("Cannot update the recast manifest: " + str(err))
+
+    def discard(self, stage: str, dataset: str, predicate) -> None:
+        """
+        Remove the records of a stage and a dataset satisfying a condition.
+
+        Args:
+            stage (``str``): ``fastsim``, ``pad`` or ``cls``
+            dataset (``str``): name of the dataset
+            predicate (``Callable[[dict], bool]``): condition on the records
+        """
+        try:
+            with file_lock(self.filename + ".lock"):
+                records = self.load()
+                prefix = self.key(stage, dataset, "")[:-1]
+                for key in [x for x in records if x.startswith(prefix)]:
+                    if predicate(records[key]):
+                        del records[key]
+                atomic_write(
+                    self.filename,
+                    json.dumps({"records": records}, indent=1, sort_keys=True),
+                )
+        except OSError as err:
+            logger.warning("Cannot update the recast manifest: " + str(err))
@@ -0,0 +1,179 @@
+################################################################################
+#
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+
+"""
+Machine-wide cache of the events reconstructed by Delphes for the recasting.
+"""
+
+import logging
+import os
+from typing import Iterable, Optional
+
+from madanalysis.misc.cache_service import (
+    atomic_copy,
+    evict_lru,
+    file_lock,
+    hash_files,
+)
+
+logger = logging.getLogger("MA5")
+
+
+class RecoEventsCache:
+    """
+    Persistent cache of the ``RecoEvents`` files produced by the detector
+    simulation of the recasting.
+
+    The reconstructed events are stored in
+    ``tools/Cache/RecoEvents/<key>/RecoEvents.root``, where the key is a hash of
+    the content of the input event files, of the detector card (with its
+    pile-up files) and of the Delphes library. A sample recast again with the
+    same card, in any output folder, then skips the detector simulation. The
+    total size of the cache is bounded: when the budget is exceeded, the least
+    recently used entries are removed.
+
+    Args:
+        ma5dir (``str``): MadAnalysis 5 installation folder
+        budget (``float``): maximum size of the cache in GB (0 disables it)
+    """
+
+    FILENAME = "RecoEvents.root"
+
+    def __init__(self, ma5dir: str, budget: float):
+        self.path = os.path.join(ma5dir, "tools/Cache/RecoEvents")
+        self.budget = int(budget * 1024**3)
+
+    @property
+    def enabled(self) -> bool:
+        """The cache is used"""
+        return self.budget > 0
+
+    def key(
+        self,
+        inputs: Iterable[str],
+        card: str,
+        pileups: Iterable[str],
+        library: str,
+        detector: str,
+    ) -> Optional[str]:
+        """
+        Compute the key of a simulation.
+
+        Args:
+            inputs (``Iterable[str]``): input event files
+            card (``str``): detector card
+            pileups (``Iterable[str]``): pile-up files declared in the card
+            library (``str``): Delphes library used for the simulation
+            detector (``str``): ``delphes`` or ``delphesMA5tune``
+
+        Returns:
+            ``Optional[str]``:
+            key of the simulation, ``None`` if it cannot be computed
+        """
+        extra = ["detector:" + detector]
+        try:
+            # Pile-up samples and libraries are identified by their time stamp
+            for filename in list(pileups) + [library]:
+                if os.path.isfile(filename):
+                    stat = os.stat(filename)
+                    extra.append(
+                        f"{os.path.basename(filename)}:{stat.st_mtime_ns}:{stat.st_size}"
+                    )
+            # The input files are identified by their content only
+            for filename in [card] + list(inputs):
+                extra.append(hash_files([filename], root=os.path.dirname(filename)))
+            return hash_files([], extra=extra)
+        except OSError as err:
+            logger.debug("Cannot compute the key of the reconstructed events: %s", err)
+            return None
+
+    def fetch(self, key: Optional[str], target: str, link: bool = False) -> bool:
+        """
+        Retrieve reconstructed events from the cache.
+
+        Args:
+            key (``Optional[str]``): key of the simulation
+            target (``str``): path to the RecoEvents file to create
+            link (``bool``, default ``False``): hard-link the cached file
+                instead of copying it, for a target removed after use
+
+        Returns:
+            ``bool``:
+            ``True`` if the events have been recovered from the cache
+        """
+        if not self.enabled or key is None:
+            return False
+        cached = os.path.join(self.path, key, self.FILENAME)
+        if not os.path.isfile(cached):
+            return False
+        try:
+            atomic_copy(cached, target, link=link)
+            # The time stamp of the entry is used for the LRU eviction
+            os.utime(os.path.join(self.path, key), None)
+        except OSError as err:
+            logger.debug("Cannot retrieve the cached reconstructed events: %s", err)
+            return False
+        logger.debug("Reconstructed events " + cached + " recovered from the cache")
+        return True
+
+    def store(self, key: Optional[str], source: str, link: bool = False) -> bool:
+        """
+        Add reconstructed events to the cache, and evict the least recently used
+        entries if the cache exceeds its budget.
+
+        Args:
+            key (``Optional[str]``): key of the simulation
+            source (``str``): path to the RecoEvents file
+            link (``bool``, default ``False``): hard-link the file instead of
+                copying it, for a source removed after use
+
+        Returns:
+            ``bool``:
+            ``True`` if the events have been stored
+        """
+        if not self.enabled or key is None or not os.path.isfile(source):
+            return False
+        if os.path.getsize(source) > self.budget:
+            logger.debug("Reconstructed events larger than the cache budget")
+            return False
+        try:
+            with file_lock(os.path.join(self.path, ".lock")):
+                atomic_copy(
+                    source, os.path.join(self.path, key, self.FILENAME), link=link
+                )
+                self.evict(keep=key)
+        except OSError as err:
+            logger.debug("Cannot store the reconstructed events: %s", err)
+            return False
+        return True
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """
+        Remove the least recently used entries until the size of the cache is
+        within its budget.
+
+        Args:
+            keep (``Optional[str]``): entry that must not be removed
+        """
+        evict_lru(self.path, self.FILENAME, self.budget, keep)
@@ -25,19 +25,22 @@
 from __future__ import absolute_import
 
 import copy
+import io
 import json
 import logging
 import math
 import os
+import re
+import shlex
 import shutil
 import sys
-import time
 
 import numpy as np
 from shell_command import ShellCommand
 from six.moves import input, range
 from string_tools import StringTools
 
+from madanalysis.build.build_cache import BuildCache
 from madanalysis.configuration.delphes_configuration import DelphesConfiguration
 from madanalysis.configuration.delphesMA5tune_configuration import (
     DelphesMA5tuneConfiguration,
@@ -45,21 +48,60 @@ from madanalysis.configuration.delphesMA5tune_configuration import (
 from madanalysis.install.detector_manager import DetectorManager
 from madanalysis.IOinterface.folder_writer import FolderWriter
 from madanalysis.IOinterface.job_writer import JobWriter
+from madanalysis.IOinterface.saf_merger import SampleSAF, merge_sample_files
 from madanalysis.IOinterface.library_writer import LibraryWriter
 from madanalysis.misc.histfactory_reader import (
     HF_Background,
     HF_Signal,
     construct_histfactory_dictionary,
 )
+from madanalysis.misc.adaptive_grid import AdaptiveGridScan
+from madanalysis.misc.cache_service import hash_files
+from madanalysis.misc.cutflow_reader import CutflowReader
+from madanalysis.misc.early_stopping import EarlyStopMonitor, add_early_stopping
+from madanalysis.misc.process_pool import TaskGraph
+from madanalysis.misc.recast_manifest import DONE, FAILED, RUNNING, RecastManifest
+from madanalysis.misc.reco_events_cache import RecoEventsCache
+from madanalysis.misc.signal_grid import best_results, store_grid_results
 from madanalysis.misc.theoretical_error_setup import error_dict_setup
 
 # pylint: disable=logging-fstring-interpolation,import-outside-toplevel
 
+# Sources generated for a Simplified Fast Simulation card, and their include guards
+SFS_SOURCES = [
+    "new_smearer_reco.h",
+    "new_smearer_reco.cpp",
+    "sigmas.h",
+    "reco.h",
+    "scaling.h",
+    "new_tagger.h",
+    "new_tagger.cpp",
+    "efficiencies.h",
+]
+SFS_GUARDS = [
+    "NEW_SMEARER_H",
+    "NEW_TAGGER_H",
+    "SIG_H_INCLUDED",
+    "RECO_H_INCLUDED",
+    "SC_H_INCLUDED",
+    "EFF_H_INCLUDED",
+]
+
+# Content of the parsed info files, shared by all recasting sessions and
+# inherited by the forked worker processes. The keys include the path, the
+# modification time and the size of the files, so that modified files are
+# read again.
+_INFO_FILE_CACHE = {}
+
 
 class RunRecast:
     def __init__(self, main, dirname):
         self.dirname = dirname
         self.main = main
+        self.rundir = dirname + "_RecastRun"  # working folder of the PAD
+        self.sfs_rundir = dirname + "_SFSRun"  # working folder of the SFS
+        self.fastsim_rundir = dirname + "_FastSimRun"  # extra fastsim folders
+        self.pad_setup = None  # job creating the PAD working folder
         self.delphes_runcard = []
         self.analysis_runcard = []
         self.forced = self.main.forced
@@ -69,6 +111,10 @@ class RunRecast:
         self.first12 = True
         self.pyhf_config = {}  # initialize and configure histfactory
         self.cov_config = {}
+        self.upper_limit_caches = {}  # upper limit cache per analysis
+        self.stat_ncores = 1  # processes of each statistical calculation
+        self.bibliography = None  # bibliography written (with pyhf references)
+        self.cutflow_reader = CutflowReader()  # cutflow counters per folder
         self.logger = logging.getLogger("MA5")
         self.TACO_output = self.main.recasting.TACO_output
 
@@ -95,8 +141,15 @@ class RunRecast:
 
     ## Running the machinery
     def execute(self):
+        if self.main.recasting.adaptive_grid and self.main.recasting.grid_mode(
+            self.main.datasets
+        ):
+            return AdaptiveGridScan(self).run()
+        return self.execute_runs()
+
+    def execute_runs(self):
         self.main.forced = True
-        for delphescard in list(set(sorted(self.delphes_runcard))):
+        for delphescard in self.detector_runs():
             ## Extracting run infos and checks
             version = delphescard[:4]
             card = delphescard[5:]
@@ -104,27 +157,92 @@ class RunRecast:
                 self.main.forced = self.forced
                 return False
 
-            ## Running the fastsim
-            if not self.fastsim_single(version, card):
+            ## Scheduling the fastsim, the analyses and the CLs calculations
+            graph = TaskGraph()
+            if not self.fastsim_single(version, card, graph):
                 self.main.forced = self.forced
                 return False
             self.main.fastsim.package = self.detector
+            if not self.analysis_single(version, card, graph):
+                self.main.forced = self.forced
+                return False
 
-            ## Running the analyses
-            if not self.analysis_single(version, card):
+            ## Running
+            if not self.run_graph(graph):
                 self.main.forced = self.forced
                 return False
 
             ## Cleaning
-            if not FolderWriter.RemoveDirectory(
-                os.path.normpath(self.dirname + "_RecastRun")
-            ):
+            if not FolderWriter.RemoveDirectory(os.path.normpath(self.rundir)):
                 return False
 
         # exit
         self.main.forced = self.forced
         return True
 
+    def detector_runs(self):
+        """
+        List of the detector runs to perform (version_card). In the single-pass
+        SFS mode, compatible SFS cards are merged into a single run whose card
+        names are joined by '+'. The runs are sorted, so that a resumed run
+        processes the cards in the same order as the interrupted one.
+
+        Returns
+        -------
+        LIST of STR
+            detector runs
+        """
+        runs = sorted(set(self.delphes_runcard))
+        sfs_runs = sorted(x for x in runs if x.startswith("vSFS_"))
+        if not self.main.recasting.sfs_single_pass or len(sfs_runs) < 2:
+            return runs
+        cards = [x[5:] for x in sfs_runs]
+        if not self.sfs_cards_compatible(cards):
+            self.logger.warning(
+                "The SFS cards cannot be processed in a single pass: "
+                + "they are run one after the other"
+            )
+            return runs
+        return [x for x in runs if x not in sfs_runs] + ["vSFS_" + "+".join(cards)]
+
+    def run_graph(self, graph):
+        """
+        Execute the jobs associated with a detector card. With more than one core,
+        each dataset goes through the detector simulation, the PAD and the CLs
+        calculation as soon as its inputs are ready, so that the different stages
+        of different datasets overlap.
+
+        Parameters
+        ----------
+        graph : TaskGraph
+            jobs to execute
+
+        Returns
+        -------
+        bool
+            all jobs have been executed correctly (True) or not (False)
+        """
+        ncores = self.main.recasting.ncores
+        # The cores are shared by the CLs calculations running simultaneously
+        ncls = len([name for name in graph.tasks if name.startswith("cls:")])
+        self.stat_ncores = max(1, ncores // max(1, min(ncores, ncls)))
+        if ncores > 1 and len(graph) > 1:
+            self.logger.info(
+                f"   Processing {len(self.main.datasets)} datasets with "
+                + f"{ncores} parallel processes..."
+            )
+        status = graph.run(ncores)
+        # Upper limits computed by the worker processes
+        for cache in self.upper_limit_caches.values():
+            cache.reload()
+        failed = [name for name, ok in status.items() if not ok]
+        if failed:
+            self.logger.error("The following recasting steps have failed:")
+            for name in failed:
+                self.logger.error("   - " + name)
+            return False
+        return True
+
     ## Prompt to edit the recasting card
     def edit_recasting_card(self):
         if self.forced or self.main.script:
@@ -193,7 +311,7 @@ class RunRecast:
     ################################################
     ### DELPHES RUN
     ################################################
-    def fastsim_single(self, version, delphescard):
+    def fastsim_single(self, version, delphescard, graph):
         self.logger.debug(
             "Launch a bunch of fastsim with the delphes card: %s", delphescard
         )
@@ -212,37 +330,114 @@ class RunRecast:
 
         # Checking whether events have already been generated and if not, event generation
         self.logger.debug("Loop over the datasets...")
-        evtfile = None
+        self.pad_setup = None
+        if self.detector == "fastjet":
+            return True
+        analyses = self.card_analyses(version, delphescard)
+        pending = [
+            item
+            for item in self.main.datasets
+            if not self.task_done("pad", version, delphescard, item, analyses)
+        ]
+        if len(pending) > 0:
+            # The working folder of the PAD is prepared by its own job, as the
+            # events of all datasets may have been simulated previously
+            self.pad_setup = "fastsim:setup"
+            graph.add(
+                self.pad_setup,
+                lambda: self.fastsim_dataset(
+                    pending[0], delphescard, self.rundir, simulate=False
+                ),
+            )
+        if self.main.recasting.delphes_in_memory:
+            # Delphes being run by the PAD
+            return True
         for item in self.main.datasets:
-            if self.detector == "delphesMA5tune":
-                evtfile = (
-                    self.dirname
-                    + "/Output/SAF/"
-                    + item.name
-                    + "/RecoEvents/RecoEvents_v1x1_"
-                    + delphescard.replace(".tcl", "")
-                    + ".root"
-                )
-            elif self.detector == "delphes":
-                evtfile = (
-                    self.dirname
-                    + "/Output/SAF/"
-                    + item.name
-                    + "/RecoEvents/RecoEvents_v1x2_"
-                    + delphescard.replace(".tcl", "")
-                    + ".root"
-                )
-            elif self.detector == "fastjet":
-                return True
+            evtfile = self.reco_events_file(item, version, delphescard)
+            if item not in pending:
+                self.logger.debug("- %s already processed by the PAD", item.name)
+                continue
 
             self.logger.debug("- applying fastsim and producing %s ...", evtfile)
-            if not os.path.isfile(os.path.normpath(evtfile)):
-                if not self.generate_events(item, delphescard):
-                    return False
+            if not os.path.isfile(os.path.normpath(evtfile)) or self.task_stale(
+                "fastsim", version, delphescard, item, [""]
+            ):
+                rundir = self.fastsim_rundir + "_" + item.name
+                graph.add(
+                    "fastsim:" + item.name,
+                    lambda item=item, rundir=rundir: self.run_task(
+                        "fastsim",
+                        version,
+                        delphescard,
+                        item,
+                        [""],
+                        lambda: self.fastsim_dataset(item, delphescard, rundir),
+                    ),
+                )
 
         # Exit
         return True
 
+    def reco_events_file(self, dataset, version, delphescard):
+        """
+        Name of the file containing the reconstructed events of a dataset.
+
+        Parameters
+        ----------
+        dataset : MA5 Dataset
+            one of the datasets from self.main.datasets
+        version : STR
+            PAD version (v1.1 or v1.2)
+        delphescard : STR
+            detector card
+
+        Returns
+        -------
+        STR
+            path to the ROOT file
+        """
+        return os.path.normpath(
+            self.dirname
+            + "/Output/SAF/"
+            + dataset.name
+            + "/RecoEvents/RecoEvents_"
+            + version.replace(".", "x")
+            + "_"
+            + delphescard.replace(".tcl", "")
+            + ".root"
+        )
+
+    def fastsim_dataset(self, dataset, card, rundir, simulate=True):
+        """
+        Run the detector simulation of a dataset in a given working folder.
+
+        Parameters
+        ----------
+        dataset : MA5 Dataset
+            one of the datasets from self.main.datasets
+        card : STR
+            detector card
+        rundir : STR
+            working folder of the simulation
+        simulate : bool
+            run the simulation (True) or only prepare the working folder (False)
+
+        Returns
+        -------
+        bool
+            the simulation has been run correctly (True) or not (False)
+        """
+        base_rundir = self.rundir
+        self.rundir = rundir
+        try:
+            status = self.generate_events(dataset, card, simulate)
+        finally:
+            self.rundir = base_rundir
+            self.main.fastsim.package = self.detector
+        if rundir != base_rundir and not self.main.developer_mode:
+            FolderWriter.RemoveDirectory(os.path.normpath(rundir))
+        return status
+
     def fastsim_header(self, version):
         ## Gettign the version dependent stuff
         to_print = False
@@ -267,19 +462,15 @@ class RunRecast:
                 "   **********************************************************"
             )
 
-    def run_delphes(self, dataset, card):
+    def run_delphes(self, dataset, card, simulate=True):
         # Initializing the JobWriter
-        if os.path.isdir(self.dirname + "_RecastRun"):
-            if not FolderWriter.RemoveDirectory(
-                os.path.normpath(self.dirname + "_RecastRun")
-            ):
+        if os.path.isdir(self.rundir):
+            if not FolderWriter.RemoveDirectory(os.path.normpath(self.rundir)):
                 return False
-        jobber = JobWriter(self.main, self.dirname + "_RecastRun")
+        jobber = JobWriter(self.main, self.rundir)
 
         # Writing process
-        self.logger.info(
-            "   Creating folder '" + self.dirname.split("/")[-1] + "_RecastRun'..."
-        )
+        self.logger.info("   Creating folder '" + self.rundir.split("/")[-1] + "'...")
         if not jobber.Open():
             return False
         self.logger.info("   Copying 'SampleAnalyzer' source files...")
@@ -298,7 +489,32 @@ class RunRecast:
         if not jobber.WriteMakefiles():
             return False
         self.logger.debug("   Fixing the pileup path...")
-        self.fix_pileup(self.dirname + "_RecastRun/Input/" + card)
+        self.fix_pileup(self.rundir + "/Input/" + card)
+        if not simulate:
+            return True
+
+        # Events already simulated with the same inputs
+        cache = RecoEventsCache(
+            self.main.archi_info.ma5dir, self.main.recasting.recoevents_cache
+        )
+        if self.detector == "delphesMA5tune":
+            output = "/RecoEvents0_0/DelphesMA5tuneEvents.root"
+        else:
+            output = "/RecoEvents0_0/DelphesEvents.root"
+        output = self.rundir + "/Output/SAF/_" + dataset.name + output
+        # The events are moved to the output folder and, unless they are kept,
+        # removed after the PAD run: only then are they linked to the cache
+        link = not self.main.recasting.store_root
+        key = None
+        if cache.enabled:
+            key = self.reco_events_key(cache, dataset, self.rundir + "/Input/" + card)
+            if cache.fetch(key, output, link):
+                self.logger.info(
+                    "   Reconstructed events of '"
+                    + dataset.name
+                    + "' recovered from the cache"
+                )
+                return True
 
         # Creating executable
         self.logger.info("   Compiling 'SampleAnalyzer'...")
@@ -315,11 +531,44 @@ class RunRecast:
         self.logger.info("    *******************************************************")
         if not jobber.RunJob(dataset):
             self.logger.error("run over '" + dataset.name + "' aborted.")
+            return False
         self.logger.info("    *******************************************************")
+        cache.store(key, output, link)
 
         # Exit
         return True
 
+    def reco_events_key(self, cache, dataset, card):
+        """
+        Key of the reconstructed events of a dataset in the RecoEvents cache.
+
+        Parameters
+        ----------
+        cache : RecoEventsCache
+            the cache
+        dataset : MA5 Dataset
+            one of the datasets from self.main.datasets
+        card : STR
+            detector card, with the pile-up paths fixed
+
+        Returns
+        -------
+        STR or None
+            key of the simulation
+        """
+        pileups = []
+        if os.path.isfile(card):
+            with open(card, "r") as mycard:
+                for line in mycard:
+                    words = line.split()
+                    if len(words) >= 3 and words[:2] == ["set", "PileUpFile"]:
+                        pileups.append(words[2])
+        if self.detector == "delphesMA5tune":
+            library = self.main.archi_info.delphesMA5tune_lib
+        else:
+            library = self.main.archi_info.delphes_lib
+        return cache.key(dataset.filenames, card, pileups, library, self.detector)
+
     def run_SimplifiedFastSim(self, dataset, card, analysislist):
         """
 
@@ -327,8 +576,9 @@ class RunRecast:
         ----------
         dataset : MA5 Dataset
             one of the datasets from self.main.dataset
-        card : SFS Run Card
-            SFS description for the detector simulation
+        card : SFS Run Card or LIST of (SFS Run Card, LIST of STR)
+            SFS description for the detector simulation, or list of SFS cards
+            with their analyses to process in a single pass over the events
         analysislist : LIST of STR
             list of analysis names
 
@@ -347,6 +597,8 @@ class RunRecast:
         # Load the analysis card
         from madanalysis.core.script_stack import ScriptStack
 
+        cards = card if isinstance(card, list) else [(card, analysislist)]
+        card = cards[0][0]
         ScriptStack.AddScript(card)
         self.main.recasting.status = "off"
         self.main.superfastsim.Reset()
@@ -366,7 +618,7 @@ class RunRecast:
             self.logger.debug("   Setting the output LHE file :" + output_name)
 
         # Initializing the JobWriter
-        jobber = JobWriter(self.main, self.dirname + "_SFSRun")
+        jobber = JobWriter(self.main, self.sfs_rundir)
 
         # Writing process
         self.logger.info("   Creating folder '" + self.dirname.split("/")[-1] + "'...")
@@ -379,10 +631,13 @@ class RunRecast:
             return False
         if not jobber.WriteSelectionHeader(self.main):
             return False
-        os.remove(self.dirname + "_SFSRun/Build/SampleAnalyzer/User/Analyzer/user.h")
+        os.remove(self.sfs_rundir + "/Build/SampleAnalyzer/User/Analyzer/user.h")
         if not jobber.WriteSelectionSource(self.main):
             return False
-        os.remove(self.dirname + "_SFSRun/Build/SampleAnalyzer/User/Analyzer/user.cpp")
+        os.remove(self.sfs_rundir + "/Build/SampleAnalyzer/User/Analyzer/user.cpp")
+        detectors = []
+        if len(cards) > 1:
+            detectors = self.write_sfs_detectors(jobber, cards)
         #######
         self.logger.info("   Writing the list of datasets...")
         jobber.WriteDatasetList(dataset)
@@ -391,11 +646,18 @@ class RunRecast:
             return False
         # Copying the analysis files
         analysisList = open(
-            self.dirname + "_SFSRun/Build/SampleAnalyzer/User/Analyzer/analysisList.h",
+            self.sfs_rundir + "/Build/SampleAnalyzer/User/Analyzer/analysisList.h",
             "w",
         )
         for ana in analysislist:
             analysisList.write('#include "SampleAnalyzer/User/Analyzer/' + ana + '.h"\n')
+        for header in ["new_smearer_reco.h", "new_tagger.h"]:
+            if detectors and os.path.isfile(
+                self.sfs_rundir + "/Build/SampleAnalyzer/User/Analyzer/" + header
+            ):
+                analysisList.write(
+                    '#include "SampleAnalyzer/User/Analyzer/' + header + '"\n'
+                )
         analysisList.write(
             '#include "SampleAnalyzer/Process/Analyzer/AnalyzerManager.h"\n'
         )
@@ -414,15 +676,15 @@ class RunRecast:
             for ana in analysislist:
                 shutil.copyfile(
                     self.pad + "/Build/SampleAnalyzer/User/Analyzer/" + ana + ".cpp",
-                    self.dirname
-                    + "_SFSRun/Build/SampleAnalyzer/User/Analyzer/"
+                    self.sfs_rundir
+                    + "/Build/SampleAnalyzer/User/Analyzer/"
                     + ana
                     + ".cpp",
                 )
                 shutil.copyfile(
                     self.pad + "/Build/SampleAnalyzer/User/Analyzer/" + ana + ".h",
-                    self.dirname
-                    + "_SFSRun/Build/SampleAnalyzer/User/Analyzer/"
+                    self.sfs_rundir
+                    + "/Build/SampleAnalyzer/User/Analyzer/"
                     + ana
                     + ".h",
                 )
@@ -440,11 +702,11 @@ class RunRecast:
         # Update Main
         self.logger.info("   Updating the main executable")
         shutil.move(
-            self.dirname + "_SFSRun/Build/Main/main.cpp",
-            self.dirname + "_SFSRun/Build/Main/main.bak",
+            self.sfs_rundir + "/Build/Main/main.cpp",
+            self.sfs_rundir + "/Build/Main/main.bak",
         )
-        mainfile = open(self.dirname + "_SFSRun/Build/Main/main.bak", "r")
-        newfile = open(self.dirname + "_SFSRun/Build/Main/main.cpp", "w")
+        mainfile = open(self.sfs_rundir + "/Build/Main/main.bak", "r")
+        newfile = open(self.sfs_rundir + "/Build/Main/main.cpp", "w")
         ignore = False
         for line in mainfile:
             if "// Getting pointer to the analyzer" in line:
@@ -484,9 +746,26 @@ class RunRecast:
                     + '");\n'
                 )
                 newfile.write("\n      manager.HeadSR(out);\n      out << std::endl;\n")
+            elif "//Getting pointer to the clusterer" in line and detectors:
+                ignore = True
+                for init_lines, _ in detectors:
+                    newfile.writelines(init_lines)
             elif "//Getting pointer to the clusterer" in line:
                 ignore = False
                 newfile.write(line)
+            elif (
+                "// Post initialization (creates the new output directory structure)"
+                in line
+                and detectors
+            ):
+                ignore = False
+                newfile.write(line)
+            elif detectors and ("cluster1->" in line or "tagger->" in line):
+                continue
+            elif "!analyzer1" in line and not ignore and detectors:
+                ignore = True
+                for _, exec_lines in detectors:
+                    newfile.writelines(exec_lines)
             elif "!analyzer1" in line and not ignore:
                 ignore = True
                 if self.main.recasting.store_events:
@@ -511,6 +790,8 @@ class RunRecast:
                 newfile.write(line)
         mainfile.close()
         newfile.close()
+        if self.main.recasting.early_stopping > 0:
+            add_early_stopping(self.sfs_rundir + "/Build/Main/main.cpp", analysislist)
         # restore
         self.main.recasting.status = "on"
         self.main.fastsim.package = old_fastsim
@@ -528,9 +809,14 @@ class RunRecast:
             "   Running 'SampleAnalyzer' over dataset '" + dataset.name + "'..."
         )
         self.logger.info("    *******************************************************")
-        if not jobber.RunJob(dataset):
-            self.logger.error("run over '" + dataset.name + "' aborted.")
-            return False
+        with EarlyStopMonitor(
+            self.sfs_rundir + "/Output",
+            self.early_stopping_target(len(dataset.filenames)),
+            self.expected_limits(analysislist),
+        ):
+            if not jobber.RunJob(dataset):
+                self.logger.error("run over '" + dataset.name + "' aborted.")
+                return False
         self.logger.info("    *******************************************************")
 
         if not os.path.isdir(self.dirname + "/Output/SAF/" + dataset.name):
@@ -592,16 +878,16 @@ class RunRecast:
                     + "/RecoEvents"
                 )
             cutflow_list = os.listdir(
-                self.dirname
-                + "_SFSRun/Output/SAF/_"
+                self.sfs_rundir
+                + "/Output/SAF/_"
                 + dataset.name
                 + "/"
                 + analysis
                 + "_0/Cutflows"
             )
             histogram_list = os.listdir(
-                self.dirname
-                + "_SFSRun/Output/SAF/_"
+                self.sfs_rundir
+                + "/Output/SAF/_"
                 + dataset.name
                 + "/"
                 + analysis
@@ -609,16 +895,16 @@ class RunRecast:
             )
             # Copy dataset info file
             if os.path.isfile(
-                self.dirname
-                + "_SFSRun/Output/SAF/_"
+                self.sfs_rundir
+                + "/Output/SAF/_"
                 + dataset.name
                 + "/_"
                 + dataset.name
                 + ".saf"
             ):
                 shutil.move(
-                    self.dirname
-                    + "_SFSRun/Output/SAF/_"
+                    self.sfs_rundir
+                    + "/Output/SAF/_"
                     + dataset.name
                     + "/_"
                     + dataset.name
@@ -632,8 +918,8 @@ class RunRecast:
                 )
             for cutflow in cutflow_list:
                 shutil.move(
-                    self.dirname
-                    + "_SFSRun/Output/SAF/_"
+                    self.sfs_rundir
+                    + "/Output/SAF/_"
                     + dataset.name
                     + "/"
                     + analysis
@@ -649,8 +935,8 @@ class RunRecast:
                 )
             for histos in histogram_list:
                 shutil.move(
-                    self.dirname
-                    + "_SFSRun/Output/SAF/_"
+                    self.sfs_rundir
+                    + "/Output/SAF/_"
                     + dataset.name
                     + "/"
                     + analysis
@@ -666,15 +952,12 @@ class RunRecast:
                 )
             if self.main.recasting.store_events:
                 event_list = os.listdir(
-                    self.dirname
-                    + "_SFSRun/Output/SAF/_"
-                    + dataset.name
-                    + "/lheEvents0_0/"
+                    self.sfs_rundir + "/Output/SAF/_" + dataset.name + "/lheEvents0_0/"
                 )
                 if len(event_list) > 0:
                     shutil.move(
-                        self.dirname
-                        + "_SFSRun/Output/SAF/_"
+                        self.sfs_rundir
+                        + "/Output/SAF/_"
                         + dataset.name
                         + "/lheEvents0_0/"
                         + event_list[0],
@@ -694,22 +977,199 @@ class RunRecast:
                     + self.TACO_output.split(".")[-1]
                 )
                 shutil.move(
-                    self.dirname + "_SFSRun/Output/" + self.TACO_output,
+                    self.sfs_rundir + "/Output/" + self.TACO_output,
                     self.dirname + "/Output/SAF/" + dataset.name + "/" + filename,
                 )
 
         if not self.main.developer_mode:
             # Remove the analysis folder
-            if not FolderWriter.RemoveDirectory(
-                os.path.normpath(self.dirname + "_SFSRun")
-            ):
-                self.logger.error("Cannot remove directory: " + self.dirname + "_SFSRun")
+            if not FolderWriter.RemoveDirectory(os.path.normpath(self.sfs_rundir)):
+                self.logger.error("Cannot remove directory: " + self.sfs_rundir)
         else:
-            self.logger.debug("Analysis kept in " + self.dirname + "_SFSRun folder.")
+            self.logger.debug("Analysis kept in " + self.sfs_rundir + " folder.")
 
         return True
 
-    def generate_events(self, dataset, card):
+    def sfs_cards_compatible(self, cards):
+        """
+        Check whether several SFS cards can be processed in a single pass over
+        the events: the analyses must be attached to a single card, the cards
+        must share the same multiparticle definitions, and neither the events
+        nor the TACO output can be stored.
+
+        Parameters
+        ----------
+        cards : LIST of STR
+            SFS card names
+
+        Returns
+        -------
+        bool
+            the cards can be processed together (True) or not (False)
+        """
+        if self.main.recasting.store_events or self.TACO_output != "":
+            return False
+        analyses = [x for card in cards for x in self.card_analyses("vSFS", card)]
+        if len(analyses) != len(set(analyses)):
+            return False
+        definitions = set()
+        for card in cards:
+            filename = self.main.archi_info.ma5dir + "/tools/PADForSFS/Input/Cards/"
+            try:
+                with open(filename + card, "r") as mycard:
+                    definitions.add(
+                        tuple(
+                            sorted(
+                                " ".join(line.split())
+                                for line in mycard
+                                if line.strip().lower().startswith("define")
+                            )
+                        )
+                    )
+            except OSError:
+                return False
+        return len(definitions) == 1
+
+    def write_sfs_detectors(self, jobber, cards):
+        """
+        Generate the detector configurations (clusterer, smearer and tagger) of
+        several SFS cards in a single SFS job. The sources generated for the
+        card number k get a '_k' suffix, and each event is successively
+        reconstructed with each configuration before being passed to the
+        analyses attached to the corresponding card.
+
+        Parameters
+        ----------
+        jobber : JobWriter
+            writer of the SFS job, in which the first card has been loaded
+        cards : LIST of (STR, LIST of STR)
+            SFS cards with the associated analyses
+
+        Returns
+        -------
+        LIST of (LIST of STR, LIST of STR)
+            for each card, the initialisation and execution lines of the main
+            program
+        """
+        from madanalysis.core.script_stack import ScriptStack
+        from madanalysis.interpreter.interpreter import Interpreter
+
+        folder = self.sfs_rundir + "/Build/SampleAnalyzer/User/Analyzer/"
+        detectors = []
+        for idx, (card, analyses) in enumerate(cards):
+            if idx > 0:
+                ScriptStack.AddScript(card)
+                self.main.superfastsim.Reset()
+                script_mode = self.main.script
+                self.main.script = True
+                Interpreter(self.main).load(verbose=self.main.developer_mode)
+                self.main.script = script_mode
+                self.main.fastsim.package = "fastjet"
+                jobber.WriteSelectionHeader(self.main)
+                jobber.WriteSelectionSource(self.main)
+                for name in ["user.h", "user.cpp"]:
+                    os.remove(folder + name)
+            self.suffix_sfs_sources(folder, str(idx))
+
+            # Initialisation of the clusterer, smearer and tagger
+            mymain = io.StringIO()
+            jobber.CreateMainFct(mymain, "SFSRun", "SFSRun.saf")
+            init_lines, ignore = [], True
+            for line in mymain.getvalue().splitlines(True):
+                if "//Getting pointer to the clusterer" in line:
+                    ignore = False
+                elif "// Post initialization" in line:
+                    break
+                if not ignore:
+                    init_lines.append(self.rename_sfs_objects(line, idx))
+            init_lines.insert(0, "  // Detector configuration of " + card + "\n")
+
+            # Reconstruction followed by the analyses
+            exec_lines = [
+                "      // Detector configuration of " + card + "\n",
+                f"      cluster{idx+1}->Execute(mySample,myEvent);\n",
+            ]
+            if self.main.superfastsim.isTaggerOn():
+                exec_lines.append(f"      tagger{idx+1}->Execute(mySample,myEvent);\n")
+            exec_lines.append(
+                "      "
+                + " &&\n        ".join(
+                    "analyzer_" + x + "->Execute(mySample,myEvent)" for x in analyses
+                )
+                + ";\n"
+            )
+            detectors.append((init_lines, exec_lines))
+
+        # Headers included by the analyses
+        for name in ["new_smearer_reco", "new_tagger"]:
+            headers = [
+                name + "_" + str(idx) + ".h"
+                for idx in range(len(cards))
+                if os.path.isfile(folder + name + "_" + str(idx) + ".h")
+            ]
+            if len(headers) > 0:
+                with open(folder + name + ".h", "w") as myheader:
+                    myheader.write("// Detector configurations of the SFS run\n")
+                    for header in headers:
+                        myheader.write(
+                            '#include "SampleAnalyzer/User/Analyzer/' + header + '"\n'
+                        )
+        return detectors
+
+    @staticmethod
+    def rename_sfs_objects(line, idx):
+        """Rename the clusterer, smearer and tagger of the SFS card number idx"""
+        for name, new_name in [
+            ("parametersC1", f"parametersC{idx+1}"),
+            ("cluster1", f"cluster{idx+1}"),
+            ("mySmearer", f"mySmearer{idx+1}"),
+            ("tagger", f"tagger{idx+1}"),
+            ("NewSmearer", f"NewSmearer_{idx}"),
+            ("NewTagger", f"NewTagger_{idx}"),
+        ]:
+            line = re.sub(r"\b" + name + r"\b", new_name, line)
+        return line
+
+    @staticmethod
+    def suffix_sfs_sources(folder, suffix):
+        """
+        Add a suffix to the sources generated for an SFS card (file names, class
+        names and include guards), so that several cards can be compiled in the
+        same job. The efficiency functions are made local to their source file.
+
+        Parameters
+        ----------
+        folder : STR
+            folder containing the generated sources
+        suffix : STR
+            suffix to add
+        """
+        for name in SFS_SOURCES:
+            if not os.path.isfile(folder + name):
+                continue
+            with open(folder + name, "r") as source:
+                content = source.read()
+            for header in [x for x in SFS_SOURCES if x.endswith(".h")]:
+                content = content.replace(
+                    "SampleAnalyzer/User/Analyzer/" + header,
+                    "SampleAnalyzer/User/Analyzer/"
+                    + header.replace(".h", "_" + suffix + ".h"),
+                )
+            for guard in SFS_GUARDS:
+                content = re.sub(r"\b" + guard + r"\b", guard + "_" + suffix, content)
+            for classname in ["NewSmearer", "NewTagger"]:
+                content = re.sub(
+                    r"\b" + classname + r"\b", classname + "_" + suffix, content
+                )
+            content = re.sub(
+                r"^(MAdouble64|MAbool) fct_", r"static \1 fct_", content, flags=re.M
+            )
+            base, ext = os.path.splitext(name)
+            with open(folder + base + "_" + suffix + ext, "w") as source:
+                source.write(content)
+            os.remove(folder + name)
+
+    def generate_events(self, dataset, card, simulate=True):
         # Preparing the run
         self.main.recasting.status = "off"
         self.main.fastsim.package = self.detector
@@ -727,7 +1187,7 @@ class RunRecast:
                 "../../../../tools/PAD/Input/Cards/" + card
             )
         # Execution
-        if not self.run_delphes(dataset, card):
+        if not self.run_delphes(dataset, card, simulate):
             self.logger.error(
                 "The " + self.detector + " problem with the running of the fastsim"
             )
@@ -735,6 +1195,8 @@ class RunRecast:
         # Restoring the run
         self.main.recasting.status = "on"
         self.main.fastsim.package = "none"
+        if not simulate:
+            return True
         ## Saving the output
         if not os.path.isdir(self.dirname + "/Output/SAF/" + dataset.name):
             os.mkdir(self.dirname + "/Output/SAF/" + dataset.name)
@@ -744,8 +1206,8 @@ class RunRecast:
             os.mkdir(self.dirname + "/Output/SAF/" + dataset.name + "/RecoEvents")
         if self.detector == "delphesMA5tune":
             shutil.move(
-                self.dirname
-                + "_RecastRun/Output/SAF/_"
+                self.rundir
+                + "/Output/SAF/_"
                 + dataset.name
                 + "/RecoEvents0_0/DelphesMA5tuneEvents.root",
                 self.dirname
@@ -757,8 +1219,8 @@ class RunRecast:
             )
         elif self.detector == "delphes":
             shutil.move(
-                self.dirname
-                + "_RecastRun/Output/SAF/_"
+                self.rundir
+                + "/Output/SAF/_"
                 + dataset.name
                 + "/RecoEvents0_0/DelphesEvents.root",
                 self.dirname
@@ -774,7 +1236,7 @@ class RunRecast:
     ################################################
     ### ANALYSIS EXECUTION
     ################################################
-    def analysis_single(self, version, card):
+    def analysis_single(self, version, card, graph):
         ## Init and header
         self.analysis_header(version, card)
 
@@ -785,6 +1247,92 @@ class RunRecast:
             return False
 
         ## Getting the analyses associated with the given card
+        analyses = self.card_analyses(version, card)
+
+        if self.main.recasting.stat_only_mode:
+            self.dirname = self.main.recasting.stat_only_dir
+
+        ## Datasets already processed by the PAD in a previous (interrupted) run
+        pending = [
+            myset
+            for myset in self.main.datasets
+            if not self.task_done("pad", version, card, myset, analyses)
+        ]
+
+        ## Preparing the PAD (a single executable is used for all datasets)
+        build = None
+        if (
+            not self.main.recasting.stat_only_mode
+            and version in ["v1.1", "v1.2"]
+            and len(pending) > 0
+        ):
+            build = "pad:build"
+            graph.add(
+                build,
+                lambda: self.prepare_pad(analyses, card),
+                depends_on=[self.pad_setup],
+            )
+
+        ## Running the PAD and the CLs calculation for each dataset
+        parallel = self.main.recasting.ncores > 1 and len(self.main.datasets) > 1
+        if parallel and not self.main.recasting.analysis_only_mode:
+            self.prewarm_info_files(analyses)
+        for myset in self.main.datasets:
+            pad = None
+            if not self.main.recasting.stat_only_mode and myset in pending:
+                if not self.rewind_pad_output(card, myset, analyses):
+                    return False
+                pad = "pad:" + myset.name
+                fastsim = "fastsim:" + myset.name
+                graph.add(
+                    pad,
+                    lambda myset=myset: self.run_task(
+                        "pad",
+                        version,
+                        card,
+                        myset,
+                        analyses,
+                        lambda: self.analysis_dataset(
+                            version, card, analyses, myset, parallel
+                        ),
+                    ),
+                    depends_on=[build, fastsim if fastsim in graph else None],
+                )
+            if self.main.recasting.analysis_only_mode:
+                continue
+            if pad is None and self.task_done("cls", version, card, myset, analyses):
+                self.logger.info(f"   CLs of {myset.name} already computed")
+                continue
+            self.rewind_cls_output(card, myset, analyses)
+            graph.add(
+                "cls:" + myset.name,
+                lambda myset=myset: self.run_task(
+                    "cls",
+                    version,
+                    card,
+                    myset,
+                    analyses,
+                    lambda: self.cls_dataset(analyses, myset),
+                ),
+                depends_on=[pad],
+            )
+
+        ## The references are written once, before the CLs jobs are started
+        if any(name.startswith("cls:") for name in graph.tasks):
+            self.write_bibliography(analyses)
+
+        # Exit
+        return True
+
+    def card_analyses(self, version, card):
+        """Names of the analyses associated with a given detector card"""
+        if "+" in card:
+            analyses = []
+            for item in card.split("+"):
+                analyses += [
+                    x for x in self.card_analyses(version, item) if x not in analyses
+                ]
+            return analyses
         analyses = [
             x.replace(version + "_", "") for x in self.analysis_runcard if version in x
         ]
@@ -792,70 +1340,360 @@ class RunRecast:
             if card == del_card:
                 analyses = [x for x in analyses if x in ana_list]
                 break
+        return analyses
 
-        # Executing the PAD
-        for myset in self.main.datasets:
-            if not self.main.recasting.stat_only_mode:
-                if version in ["v1.1", "v1.2"]:
-                    ## Preparing the PAD
-                    self.update_pad_main(analyses)
-                    if not self.make_pad():
-                        self.main.forced = self.forced
-                        return False
-                    ## Getting the file name corresponding to the events
-                    eventfile = os.path.normpath(
-                        self.dirname
-                        + "/Output/SAF/"
-                        + myset.name
-                        + "/RecoEvents/RecoEvents_"
-                        + version.replace(".", "x")
-                        + "_"
-                        + card.replace(".tcl", "")
-                        + ".root"
-                    )
-                    if not os.path.isfile(eventfile):
-                        self.logger.error(f"The file called {eventfile} is not found...")
-                        return False
-                    ## Running the PAD
-                    if not self.run_pad(eventfile):
-                        self.main.forced = self.forced
-                        return False
-                    ## Saving the output and cleaning
-                    if not self.save_output(
-                        '"' + eventfile + '"', myset.name, analyses, card
-                    ):
-                        self.main.forced = self.forced
-                        return False
-                    if not self.main.recasting.store_root:
-                        os.remove(eventfile)
-                    else:
-                        time.sleep(1.0)
-                else:
-                    # Run SFS
-                    if not self.run_SimplifiedFastSim(
-                        myset,
-                        self.main.archi_info.ma5dir
-                        + "/tools/PADForSFS/Input/Cards/"
-                        + card,
-                        analyses,
-                    ):
-                        return False
-                    if self.main.recasting.store_root:
-                        self.logger.warning(
-                            "Simplified-FastSim does not use root, hence file will not be stored."
-                        )
+    def task_inputs(self, stage, version, card, dataset, analyses):
+        """
+        Fingerprint of the inputs of a recasting task, for each analysis. It
+        depends on the event files of the dataset (path, modification time and
+        size), on the detector card and on the analysis sources. The CLs
+        calculation additionally depends on the info file of the analysis, on
+        the cross section and grid coordinates of the dataset and on the
+        statistical settings.
+
+        Parameters
+        ----------
+        stage : STR
+            fastsim, pad or cls
+        version : STR
+            PAD version (v1.1, v1.2 or vSFS)
+        card : STR
+            detector card
+        dataset : MA5 Dataset
+            one of the datasets from self.main.datasets
+        analyses : LIST of STR
+            list of analysis names
+
+        Returns
+        -------
+        DICT
+            hexadecimal digest of the inputs for each analysis
+        """
+        common = [stage, version, card, self.TACO_output]
+        if stage != "fastsim":
+            common.append(repr(self.main.recasting.early_stopping))
+        for filename in dataset.filenames:
+            try:
+                stat = os.stat(filename)
+                common.append(
+                    f"{os.path.abspath(filename)}:{stat.st_mtime_ns}:{stat.st_size}"
+                )
+            except OSError:
+                common.append(filename)
+        if stage == "cls":
+            recasting = self.main.recasting
+            common += [
+                repr(x)
+                for x in [
+                    dataset.xsection,
+                    dataset.scaleup,
+                    dataset.scaledn,
+                    dataset.pdfup,
+                    dataset.pdfdn,
+                    dataset.grid,
+                    recasting.extrapolated_luminosities,
+                    recasting.systematics,
+                    recasting.THerror_combination,
+                    recasting.error_extrapolation,
+                    recasting.global_likelihoods_switch,
+                    recasting.simplify_likelihoods,
+                    recasting.lazy_cls,
+                ]
+            ]
+        card_files = [self.pad + "/Input/Cards/" + x for x in card.split("+")]
+        card_files.append(self.pad + "/Build/Main/main.bak")
+        extensions = {"fastsim": [], "pad": [".h", ".cpp"]}
+        inputs = {}
+        for analysis in analyses:
+            files = card_files + [
+                self.pad + "/Build/SampleAnalyzer/User/Analyzer/" + analysis + ext
+                for ext in extensions.get(stage, [".h", ".cpp", ".info"])
+            ]
+            inputs[analysis] = hash_files(
+                [x for x in files if os.path.isfile(x)],
+                extra=common + ["analysis:" + analysis],
+            )
+        return inputs
+
+    def task_done(self, stage, version, card, dataset, analyses):
+        """
+        Check, when resuming a run, whether a task has already been completed
+        with the same inputs.
+        """
+        if not self.main.recasting.resume:
+            return False
+        inputs = self.task_inputs(stage, version, card, dataset, analyses)
+        return RecastManifest(self.dirname).is_done(
+            stage, dataset.name, card, analyses, inputs
+        )
+
+    def task_stale(self, stage, version, card, dataset, analyses):
+        """
+        Check, when resuming a run, whether a task has been recorded with inputs
+        different from the current ones (outputs produced by a run without any
+        manifest are assumed to be valid).
+        """
+        if not self.main.recasting.resume:
+            return False
+        manifest = RecastManifest(self.dirname)
+        inputs = self.task_inputs(stage, version, card, dataset, analyses)
+        for analysis in analyses:
+            record = manifest.record(stage, dataset.name, card, analysis)
+            if record is not None and record.get("inputs") != inputs[analysis]:
+                return True
+        return False
+
+    def run_task(self, stage, version, card, dataset, analyses, func):
+        """
+        Execute a recasting task and record its status in the manifest of the
+        output folder.
+
+        Parameters
+        ----------
+        stage : STR
+            fastsim, pad or cls
+        version : STR
+            PAD version (v1.1, v1.2 or vSFS)
+        card : STR
+            detector card
+        dataset : MA5 Dataset
+            one of the datasets from self.main.datasets
+        analyses : LIST of STR
+            list of analysis names
+        func : CALLABLE
+            task to execute, returning True in case of success
+
+        Returns
+        -------
+        bool
+            the task has been executed correctly (True) or not (False)
+        """
+        manifest = RecastManifest(self.dirname)
+        inputs = self.task_inputs(stage, version, card, dataset, analyses)
+        extra = {}
+        if stage == "pad":
+            extra["sample_entries"] = self.sample_entries(dataset)
+        if stage == "cls":
+            extra["outputs"] = self.cls_output_sizes(dataset)
+        manifest.update(stage, dataset.name, card, analyses, inputs, RUNNING, **extra)
+        status = func()
+        manifest.update(
+            stage,
+            dataset.name,
+            card,
+            analyses,
+            inputs,
+            DONE if status else FAILED,
+            **extra,
+        )
+        return status
+
+    def sample_file(self, dataset):
+        """Sample SAF file of a dataset, gathering the event files of all cards"""
+        return os.path.join(
+            self.dirname, "Output/SAF", dataset.name, dataset.name + ".saf"
+        )
+
+    def sample_entries(self, dataset):
+        """Number of event files recorded in the sample SAF file of a dataset"""
+        filename = self.sample_file(dataset)
+        if not os.path.isfile(filename):
+            return 0
+        try:
+            return len(SampleSAF(filename).details)
+        except (OSError, ValueError):
+            return 0
+
+    def rewind_pad_output(self, card, dataset, analyses):
+        """
+        Remove from the sample SAF file of a dataset the entries added by a
+        previous (interrupted or stale) run of the PAD for a given card,
+        together with the entries of the cards processed after it, which are
+        then processed again.
+
+        Returns
+        -------
+        bool
+            the sample file has been rewound correctly (True) or not (False)
+        """
+        if not self.main.recasting.resume or len(analyses) == 0:
+            return True
+        manifest = RecastManifest(self.dirname)
+        record = manifest.record("pad", dataset.name, card, analyses[0])
+        if record is None or "sample_entries" not in record:
+            return True
+        nentries = record["sample_entries"]
+        filename = self.sample_file(dataset)
+        if os.path.isfile(filename):
+            if nentries == 0:
+                os.remove(filename)
             else:
-                self.dirname = self.main.recasting.stat_only_dir
-            ## Running the CLs exclusion script (if available)
-            if not self.main.recasting.analysis_only_mode:
-                self.logger.debug(f"Compute CLs exclusion for {myset.name}")
-                if not self.compute_cls(analyses, myset):
-                    self.main.forced = self.forced
+                try:
+                    sample = SampleSAF(filename)
+                    if len(sample.details) > nentries:
+                        sample.truncate(nentries)
+                        sample.write()
+                except (OSError, ValueError) as err:
+                    self.logger.error("Cannot rewind " + filename + ": " + str(err))
                     return False
+        manifest.discard(
+            "pad",
+            dataset.name,
+            lambda rec: rec.get("sample_entries", -1) >= nentries,
+        )
+        return True
 
-        # Exit
+    def cls_output_sizes(self, dataset):
+        """Size of the CLs output files of a dataset (0 for missing files)"""
+        sizes = {}
+        for lumi in ["default"] + self.main.recasting.extrapolated_luminosities:
+            outext = "" if lumi == "default" else "_lumi_{:.3f}".format(lumi)
+            filename = os.path.join(
+                self.dirname, "Output/SAF", dataset.name, "CLs_output" + outext + ".dat"
+            )
+            sizes[filename] = (
+                os.path.getsize(filename) if os.path.isfile(filename) else 0
+            )
+        return sizes
+
+    def rewind_cls_output(self, card, dataset, analyses):
+        """
+        Remove from the CLs output files of a dataset the results written by a
+        previous (interrupted or stale) calculation for a given card, together
+        with the results of the cards processed after it, which are then
+        computed again.
+        """
+        if not self.main.recasting.resume or len(analyses) == 0:
+            return
+        manifest = RecastManifest(self.dirname)
+        record = manifest.record("cls", dataset.name, card, analyses[0])
+        if record is None or "outputs" not in record:
+            return
+        sizes = record["outputs"]
+        for filename, size in sizes.items():
+            if not os.path.isfile(filename):
+                continue
+            if size == 0:
+                os.remove(filename)
+            elif os.path.getsize(filename) > size:
+                with open(filename, "r+") as output:
+                    output.truncate(size)
+        manifest.discard(
+            "cls",
+            dataset.name,
+            lambda rec: any(
+                rec.get("outputs", {}).get(filename, -1) >= size
+                for filename, size in sizes.items()
+            ),
+        )
+
+    def analysis_dataset(self, version, card, analyses, myset, separate_rundir=False):
+        """
+        Run the PAD over a single dataset.
+
+        Parameters
+        ----------
+        version : STR
+            PAD version (v1.1, v1.2 or vSFS)
+        card : STR
+            detector card associated with the analyses
+        analyses : LIST of STR
+            list of analysis names
+        myset : MA5 Dataset
+            one of the datasets from self.main.datasets
+        separate_rundir : bool
+            run the PAD in a dataset-specific copy of the working folder, so that
+            several datasets can be processed simultaneously
+
+        Returns
+        -------
+        bool
+            the dataset has been processed correctly (True) or not (False)
+        """
+        base_rundir, base_sfs_rundir = self.rundir, self.sfs_rundir
+        if separate_rundir:
+            self.rundir = base_rundir + "_" + myset.name
+            self.sfs_rundir = base_sfs_rundir + "_" + myset.name
+            if os.path.isdir(self.rundir):
+                if not FolderWriter.RemoveDirectory(os.path.normpath(self.rundir)):
+                    return False
+            if os.path.isdir(base_rundir):
+                shutil.copytree(base_rundir, self.rundir, symlinks=True)
+        try:
+            status = self.run_pad_dataset(version, card, analyses, myset)
+        finally:
+            if separate_rundir:
+                if not self.main.developer_mode:
+                    FolderWriter.RemoveDirectory(os.path.normpath(self.rundir))
+                self.rundir, self.sfs_rundir = base_rundir, base_sfs_rundir
+        return status
+
+    def run_pad_dataset(self, version, card, analyses, myset):
+        """Run the PAD (or the SFS and the PAD) over a dataset in ``self.rundir``."""
+        if version in ["v1.1", "v1.2"] and self.in_memory_card(card) != "":
+            ## Running the PAD (and Delphes) directly over the generated events
+            os.makedirs(self.dirname + "/Output/SAF/" + myset.name, exist_ok=True)
+            if not self.run_pad("\n".join(myset.filenames), analyses):
+                return False
+            eventfiles = " ".join('"' + x + '"' for x in myset.filenames)
+            if not self.save_output(eventfiles, myset.name, analyses, card):
+                return False
+            if self.main.recasting.store_root:
+                self.logger.warning(
+                    "Delphes is run in memory, hence the reconstructed events are not stored."
+                )
+        elif version in ["v1.1", "v1.2"]:
+            ## Getting the file name corresponding to the events
+            eventfile = self.reco_events_file(myset, version, card)
+            if not os.path.isfile(eventfile):
+                self.logger.error(f"The file called {eventfile} is not found...")
+                return False
+            ## Running the PAD
+            if not self.run_pad(eventfile, analyses):
+                return False
+            ## Saving the output and cleaning
+            if not self.save_output('"' + eventfile + '"', myset.name, analyses, card):
+                return False
+            if not self.main.recasting.store_root:
+                os.remove(eventfile)
+        else:
+            # Run SFS (several cards being possibly processed in a single pass)
+            cards = [
+                (
+                    self.main.archi_info.ma5dir + "/tools/PADForSFS/Input/Cards/" + x,
+                    self.card_analyses(version, x),
+                )
+                for x in card.split("+")
+            ]
+            if not self.run_SimplifiedFastSim(
+                myset, cards if len(cards) > 1 else cards[0][0], analyses
+            ):
+                return False
+            if self.main.recasting.store_root:
+                self.logger.warning(
+                    "Simplified-FastSim does not use root, hence file will not be stored."
+                )
         return True
 
+    def cls_dataset(self, analyses, myset):
+        """
+        Run the CLs exclusion script over a single dataset.
+
+        Parameters
+        ----------
+        analyses : LIST of STR
+            list of analysis names
+        myset : MA5 Dataset
+            one of the datasets from self.main.datasets
+
+        Returns
+        -------
+        bool
+            the CLs have been computed correctly (True) or not (False)
+        """
+        self.logger.debug(f"Compute CLs exclusion for {myset.name}")
+        return self.compute_cls(analyses, myset)
+
     def analysis_header(self, version, card):
         ## Printing
         self.logger.info("   **********************************************************")
@@ -868,7 +1706,38 @@ class RunRecast:
         self.logger.info("   " + StringTools.Center(card, 57))
         self.logger.info("   **********************************************************")
 
-    def update_pad_main(self, analysislist):
+    def prepare_pad(self, analysislist, card=""):
+        """
+        Generate and compile the PAD executable for a given list of analyses. An
+        executable built from the same sources is recovered from the build
+        cache instead of being compiled again.
+
+        Parameters
+        ----------
+        analysislist : LIST of STR
+            list of analysis names
+        card : STR
+            detector card (run by the PAD in the in-memory Delphes mode)
+
+        Returns
+        -------
+        bool
+            the PAD executable is ready (True) or not (False)
+        """
+        if not os.path.isdir(self.rundir + "/Build"):
+            self.logger.error("The PAD working folder " + self.rundir + " is not found")
+            return False
+        if not self.update_pad_main(analysislist, self.in_memory_card(card)):
+            return False
+        return self.make_pad()
+
+    def in_memory_card(self, card):
+        """Detector card run by the PAD itself ("" if Delphes is run separately)"""
+        if self.main.recasting.delphes_in_memory and self.detector != "fastjet":
+            return card
+        return ""
+
+    def update_pad_main(self, analysislist, card=""):
         ## Migrating the necessary files to the working directory
         self.logger.info("   Writing the PAD analyses")
         ## Safety (for backwards compatibility)
@@ -877,22 +1746,16 @@ class RunRecast:
                 self.pad + "/Build/Main/main.cpp", self.pad + "/Build/Main/main.bak"
             )
         mainfile = open(self.pad + "/Build/Main/main.bak", "r")
-        newfile = open(self.dirname + "_RecastRun/Build/Main/main.cpp", "w")
+        newfile = open(self.rundir + "/Build/Main/main.cpp", "w")
         # Clean the analyzer folder
         if not FolderWriter.RemoveDirectory(
-            os.path.normpath(
-                self.dirname + "_RecastRun/Build/SampleAnalyzer/User/Analyzer"
-            )
+            os.path.normpath(self.rundir + "/Build/SampleAnalyzer/User/Analyzer")
         ):
             return False
-        os.mkdir(
-            os.path.normpath(
-                self.dirname + "_RecastRun/Build/SampleAnalyzer/User/Analyzer"
-            )
-        )
+        os.mkdir(os.path.normpath(self.rundir + "/Build/SampleAnalyzer/User/Analyzer"))
         # Including the necessary analyses
         analysisList = open(
-            self.dirname + "_RecastRun/Build/SampleAnalyzer/User/Analyzer/analysisList.h",
+            self.rundir + "/Build/SampleAnalyzer/User/Analyzer/analysisList.h",
             "w",
         )
         analysisList_header = (
@@ -914,17 +1777,14 @@ class RunRecast:
             )
             shutil.copy(
                 self.pad + "/Build/SampleAnalyzer/User/Analyzer/" + analysis + ".cpp",
-                self.dirname
-                + "_RecastRun/Build/SampleAnalyzer/User/Analyzer/"
+                self.rundir
+                + "/Build/SampleAnalyzer/User/Analyzer/"
                 + analysis
                 + ".cpp",
             )
             shutil.copy(
                 self.pad + "/Build/SampleAnalyzer/User/Analyzer/" + analysis + ".h",
-                self.dirname
-                + "_RecastRun/Build/SampleAnalyzer/User/Analyzer/"
-                + analysis
-                + ".h",
+                self.rundir + "/Build/SampleAnalyzer/User/Analyzer/" + analysis + ".h",
             )
         # Finalisation
         analysisList_body += "}\n"
@@ -959,6 +1819,21 @@ class RunRecast:
                 in line
             ):
                 ignore = False
+                if card != "":
+                    newfile.write("  //Getting pointer to fast-simulation package\n")
+                    newfile.write(
+                        "  std::map<std::string, std::string> parametersD1;\n"
+                    )
+                    newfile.write('  parametersD1["output"]="0";\n')
+                    newfile.write("  DetectorBase* fastsim1 = \n")
+                    newfile.write(
+                        '      manager.InitializeDetector("'
+                        + self.detector
+                        + '","../Input/'
+                        + card
+                        + '",parametersD1);\n'
+                    )
+                    newfile.write("  if (fastsim1==0) return 1;\n\n")
                 newfile.write(line)
                 if self.TACO_output != "":
                     newfile.write(
@@ -969,6 +1844,8 @@ class RunRecast:
                     newfile.write("      manager.HeadSR(out);\n      out << std::endl;\n")
             elif "!analyzer_" in line and not ignore:
                 ignore = True
+                if card != "":
+                    newfile.write("      fastsim1->Execute(mySample,myEvent);\n")
                 for analysis in analysislist:
                     newfile.write(
                         "      if (!analyzer_"
@@ -990,12 +1867,13 @@ class RunRecast:
         ## exit
         mainfile.close()
         newfile.close()
-        time.sleep(1.0)
+        if self.main.recasting.early_stopping > 0:
+            add_early_stopping(self.rundir + "/Build/Main/main.cpp", analysislist)
         return True
 
     def make_pad(self):
         # Initializing the compiler
-        self.logger.info("   Compiling the PAD located in " + self.dirname + "_RecastRun")
+        self.logger.info("   Compiling the PAD located in " + self.rundir)
         compiler = LibraryWriter("lib", self.main)
         ncores = compiler.get_ncores2()
         # compiling
@@ -1004,11 +1882,16 @@ class RunRecast:
         if ncores > 1:
             strcores = "-j" + str(ncores)
             command.append(strcores)
-        logfile = self.dirname + "_RecastRun/Build/Log/PADcompilation.log"
+        logfile = self.rundir + "/Build/Log/PADcompilation.log"
+        # Recovering the executable from the build cache, if available
+        cache = BuildCache(self.main.archi_info)
+        signature = cache.signature(self.rundir + "/Build")
+        if cache.fetch(signature, self.rundir + "/Build"):
+            self.logger.info("   PAD executable recovered from the build cache")
+            return True
         result, out = ShellCommand.ExecuteWithLog(
-            command, logfile, self.dirname + "_RecastRun/Build"
+            command, logfile, self.rundir + "/Build"
         )
-        time.sleep(1.0)
         # Checks and exit
         if not result:
             self.logger.error(
@@ -1016,83 +1899,132 @@ class RunRecast:
             )
             self.logger.error(logfile)
             return False
+        cache.store(signature, self.rundir + "/Build")
         return True
 
-    def run_pad(self, eventfile):
+    def run_pad(self, eventfile, analyses):
         ## input file
-        if os.path.isfile(self.dirname + "_RecastRun/Input/PADevents.list"):
-            os.remove(self.dirname + "_RecastRun/Input/PADevents.list")
-        infile = open(self.dirname + "_RecastRun/Input/PADevents.list", "w")
+        if os.path.isfile(self.rundir + "/Input/PADevents.list"):
+            os.remove(self.rundir + "/Input/PADevents.list")
+        infile = open(self.rundir + "/Input/PADevents.list", "w")
         infile.write(eventfile)
         infile.close()
         ## cleaning the output directory
-        if os.path.isdir(
-            os.path.normpath(self.dirname + "_RecastRun/Output/SAF/PADevents")
-        ):
+        if os.path.isdir(os.path.normpath(self.rundir + "/Output/SAF/PADevents")):
             if not FolderWriter.RemoveDirectory(
-                os.path.normpath(self.dirname + "_RecastRun/Output/SAF/PADevents")
+                os.path.normpath(self.rundir + "/Output/SAF/PADevents")
             ):
                 return False
         ## running
         command = ["./MadAnalysis5job", "../Input/PADevents.list"]
-        ok = ShellCommand.Execute(command, self.dirname + "_RecastRun/Build")
+        with EarlyStopMonitor(
+            self.rundir + "/Output",
+            self.early_stopping_target(len(eventfile.splitlines())),
+            self.expected_limits(analyses),
+        ):
+            ok = ShellCommand.Execute(command, self.rundir + "/Build")
         ## checks
         if not ok:
             self.logger.error("Problem with the run of the PAD on the file: " + eventfile)
             return False
-        os.remove(self.dirname + "_RecastRun/Input/PADevents.list")
+        os.remove(self.rundir + "/Input/PADevents.list")
         ## exit
-        time.sleep(1.0)
         return True
 
+    def early_stopping_target(self, nfiles):
+        """
+        Target precision of the early stopping of a job. The efficiencies are
+        only unbiased if the events processed before the stop are representative
+        of the whole sample, which is not guaranteed when the sample is split
+        into several files (e.g. by subprocess or generator slice). The early
+        stopping is then disabled.
+
+        Parameters
+        ----------
+        nfiles : INT
+            number of event files read by the job
+
+        Returns
+        -------
+        FLOAT
+            target relative uncertainty (0 if the early stopping is disabled)
+        """
+        target = self.main.recasting.early_stopping
+        if target > 0 and nfiles > 1:
+            self.logger.warning(
+                f"   The events are split into {nfiles} files: "
+                + "the early stopping is disabled"
+            )
+            return 0.0
+        return target
+
+    def expected_limits(self, analyses):
+        """
+        Expected upper limits on the number of signal events of the signal
+        regions of a list of analyses, as available in the upper limit caches.
+        They are used by the early stopping of the event loop to identify the
+        most sensitive region of each analysis.
+
+        Parameters
+        ----------
+        analyses : LIST of STR
+            list of analysis names
+
+        Returns
+        -------
+        DICT
+            upper limits per analysis and region (regions without a cached
+            limit are omitted)
+        """
+        if self.main.recasting.early_stopping <= 0:
+            return {}
+        try:
+            from .statistical_models import APOSTERIORI
+        except ImportError:
+            return {}
+        ET = self.check_xml_scipy_methods()
+        if not ET:
+            return {}
+        # parse_info_file sets the likelihood configurations of the CLs module
+        cov_config, pyhf_config = self.cov_config, self.pyhf_config
+        limits = {}
+        try:
+            for analysis in analyses:
+                lumi, regions, regiondata = self.parse_info_file(
+                    ET, analysis, "default"
+                )
+                if lumi == -1 or regions == -1 or regiondata == -1:
+                    continue
+                cache = self.upper_limit_cache(analysis)
+                limits[analysis] = {}
+                for reg in regions:
+                    n95 = cache.lookup(
+                        cache.key(reg, lumi, regiondata[reg], APOSTERIORI)
+                    )
+                    if n95 is not None:
+                        limits[analysis][reg] = n95
+        finally:
+            self.cov_config, self.pyhf_config = cov_config, pyhf_config
+        return limits
+
     def save_output(self, eventfile, setname, analyses, card):
         outfile = self.dirname + "/Output/SAF/" + setname + "/" + setname + ".saf"
         if not os.path.isfile(outfile):
-            shutil.move(
-                self.dirname + "_RecastRun/Output/SAF/PADevents/PADevents.saf", outfile
-            )
-        else:
-            inp = open(outfile, "r")
-            out = open(outfile + ".2", "w")
-            intag = False
-            stack = []
-            maxl = len(eventfile)
-            for line in inp:
-                if "<FileInfo>" in line:
-                    out.write(line)
-                    intag = True
-                elif "</FileInfo>" in line:
-                    for i in range(len(stack)):
-                        out.write(
-                            stack[i].ljust(maxl)
-                            + " # file "
-                            + str(i + 1)
-                            + "/"
-                            + str(len(stack) + 1)
-                            + "\n"
-                        )
-                    out.write(
-                        eventfile.ljust(maxl)
-                        + " # file "
-                        + str(len(stack) + 1)
-                        + "/"
-                        + str(len(stack) + 1)
-                        + "\n"
-                    )
-                    out.write(line)
-                    intag = False
-                elif intag:
-                    stack.append(line.strip().split("#")[0])
-                    maxl = max(maxl, len(line.strip().split("#")[0]))
-                else:
-                    out.write(line)
-            inp.close()
-            out.close()
-            shutil.move(outfile + ".2", outfile)
+            shutil.move(self.rundir + "/Output/SAF/PADevents/PADevents.saf", outfile)
+        elif not merge_sample_files(
+            outfile,
+            self.rundir + "/Output/SAF/PADevents/PADevents.saf",
+            shlex.split(eventfile),
+        ):
+            return False
         for analysis in analyses:
+            destination = self.dirname + "/Output/SAF/" + setname + "/" + analysis
+            # Outputs of a previous (interrupted) run
+            if os.path.isdir(destination):
+                if not FolderWriter.RemoveDirectory(os.path.normpath(destination)):
+                    return False
             shutil.move(
-                self.dirname + "_RecastRun/Output/SAF/PADevents/" + analysis + "_0",
-                self.dirname + "/Output/SAF/" + setname + "/" + analysis,
+                self.rundir + "/Output/SAF/PADevents/" + analysis + "_0", destination
             )
         if self.TACO_output != "":
             filename = (
@@ -1102,7 +2034,7 @@ class RunRecast:
                 + self.TACO_output.split(".")[-1]
             )
             shutil.move(
-                self.dirname + "_RecastRun/Output/" + self.TACO_output,
+                self.rundir + "/Output/" + self.TACO_output,
                 self.dirname + "/Output/SAF/" + setname + "/" + filename,
             )
         return True
@@ -1111,35 +2043,50 @@ class RunRecast:
     ### CLS CALCULATIONS AND OUTPUT
     ################################################
 
-    def compute_cls(self, analyses, dataset):
-        import spey
-        from spey.system.webutils import get_bibtex
-
-        from .statistical_models import (
-            compute_poi_upper_limits,
-            initialise_statistical_models,
-        )
+    def write_bibliography(self, analyses):
+        """
+        Write the references of the CLs calculation in bibliography.bib. This is
+        done by the main process before the jobs are started, as the CLs
+        calculations of the different datasets run concurrently.
 
-        ## Checking whether the CLs module can be used
+        Parameters
+        ----------
+        analyses : LIST of STR
+            list of analysis names
+        """
+        if self.bibliography:
+            return
+        try:
+            import spey
+            from spey.system.webutils import get_bibtex
+        except ImportError as err:
+            self.logger.debug(str(err))
+            return
         ET = self.check_xml_scipy_methods()
         if not ET:
-            return False
+            return
 
-        self.logger.info(
-            "\033[1m   * Exclusion limit computation uses Spey package\033[0m"
-        )
-        self.logger.info("\033[1m     Please cite arXiv:2307.06996 [hep-ph]\033[0m")
+        ## Is any of the analyses using a HistFactory likelihood?
+        cov_config, pyhf_config = self.cov_config, self.pyhf_config
+        use_pyhf = False
+        try:
+            for analysis in analyses:
+                self.parse_info_file(ET, analysis, "default")
+                use_pyhf = use_pyhf or bool(self.pyhf_config)
+        finally:
+            self.cov_config, self.pyhf_config = cov_config, pyhf_config
+        if self.bibliography is not None and not use_pyhf:
+            return
+        self.bibliography = use_pyhf
 
-        # Bibliography
         bibfile = os.path.join(self.dirname, "bibliography.bib")
-        print_gl_citation = self.main.recasting.global_likelihoods_switch
         with open(bibfile, "w") as bib:
             try:
                 bib.write(spey.cite() + "\n")
             except Exception as err:
                 self.logger.debug(err)
                 pass
-            if self.pyhf_config:
+            if use_pyhf:
                 pyhfbib = spey.get_backend_bibtex("pyhf")
                 for _, item in pyhfbib.items():
                     for it in item:
@@ -1155,6 +2102,27 @@ class RunRecast:
                     bib.write(get_bibtex("inspire/arxiv", arxiv) + "\n")
             except Exception:
                 pass
+
+    def compute_cls(self, analyses, dataset):
+        from .statistical_models import (
+            apply_upper_limit_cache,
+            compute_poi_upper_limits,
+            initialise_statistical_models,
+            prefetch_statistics,
+            rescale_statistical_models,
+        )
+
+        ## Checking whether the CLs module can be used
+        ET = self.check_xml_scipy_methods()
+        if not ET:
+            return False
+
+        self.logger.info(
+            "\033[1m   * Exclusion limit computation uses Spey package\033[0m"
+        )
+        self.logger.info("\033[1m     Please cite arXiv:2307.06996 [hep-ph]\033[0m")
+
+        print_gl_citation = self.main.recasting.global_likelihoods_switch
         if (
             len(self.main.recasting.extrapolated_luminosities) > 0
             or any(
@@ -1173,6 +2141,9 @@ class RunRecast:
             )
             self.logger.info("\033[1m     Please cite arXiv:1910.11418 [hep-ph]\033[0m")
 
+        ## Results of the signal point, in the grid mode
+        grid_results = {}
+
         ## Running over all luminosities to extrapolate
         for extrapolated_lumi in [
             "default"
@@ -1276,6 +2247,24 @@ class RunRecast:
                     if self.pyhf_config
                     else None,
                 )
+                statistical_models = apply_upper_limit_cache(
+                    statistical_models,
+                    self.upper_limit_cache(analysis),
+                    regiondata,
+                    dataset.xsection,
+                    lumi,
+                )
+                # In the lazy mode, only the expected limits are needed to rank
+                # the regions, subsets and profiles
+                lazy = self.main.recasting.lazy_cls
+                limits = ("exp",) if lazy else ("exp", "obs")
+                statistical_models = prefetch_statistics(
+                    statistical_models,
+                    is_extrapolated=extrapolated_lumi != "default",
+                    ncores=self.stat_ncores,
+                    confidence_levels=not lazy,
+                    limits=limits,
+                )
 
                 ## Performing the CLS calculation
                 model_types = [
@@ -1292,7 +2281,15 @@ class RunRecast:
                             dataset.xsection,
                             is_extrapolated=extrapolated_lumi != "default",
                             record_to=record,
+                            limits=limits,
                         )
+                if lazy:
+                    statistical_models = self.lazy_statistics(
+                        regiondata,
+                        statistical_models,
+                        dataset.xsection,
+                        is_extrapolated=extrapolated_lumi != "default",
+                    )
 
                 xsflag = True
                 if dataset.xsection > 0:
@@ -1321,20 +2318,26 @@ class RunRecast:
                         )
                         if varied_xsec > 0:
                             xsflag = False
-                            varied_statistical_models = initialise_statistical_models(
-                                regiondata=regiondata,
-                                regions=regions,
-                                xsection=varied_xsec,
-                                lumi=lumi,
-                                simplified_model_config=self.cov_config
-                                if self.cov_config
-                                else None,
-                                full_statistical_model_config=self.pyhf_config
-                                if self.pyhf_config
-                                else None,
+                            varied_statistical_models = rescale_statistical_models(
+                                statistical_models, varied_xsec / dataset.xsection
                             )
                             regiondata_errors[error_key] = copy.deepcopy(regiondata)
                             if error_value != 0.0:
+                                if lazy:
+                                    varied_statistical_models = self.lazy_statistics(
+                                        regiondata,
+                                        varied_statistical_models,
+                                        varied_xsec,
+                                        is_extrapolated=extrapolated_lumi != "default",
+                                        upper_limits=False,
+                                    )
+                                else:
+                                    varied_statistical_models = prefetch_statistics(
+                                        varied_statistical_models,
+                                        is_extrapolated=extrapolated_lumi != "default",
+                                        ncores=self.stat_ncores,
+                                        upper_limits=False,
+                                    )
                                 regiondata_errors[error_key] = self.extract_cls(
                                     regiondata_errors[error_key],
                                     varied_statistical_models,
@@ -1343,6 +2346,11 @@ class RunRecast:
                                     is_extrapolated=extrapolated_lumi != "default",
                                 )
 
+                if len(dataset.grid) != 0 and not xsflag:
+                    grid_results.setdefault(outext, {})[analysis] = best_results(
+                        regions, regiondata
+                    )
+
                 ## writing the output file
                 self.write_cls_output(
                     analysis,
@@ -1354,11 +2362,38 @@ class RunRecast:
                     lumi,
                 )
                 mysummary.write("\n")
+                self.upper_limit_cache(analysis).flush()
 
             ## Closing the output file
             mysummary.close()
+
+        if grid_results:
+            store_grid_results(self.dirname, dataset, grid_results)
         return True
 
+    def upper_limit_cache(self, analysis):
+        """
+        Upper limit cache of an analysis, shared by all the datasets (e.g. the
+        points of a signal grid) processed in the session.
+
+        Parameters
+        ----------
+        analysis : STR
+            analysis name
+
+        Returns
+        -------
+        UpperLimitCache
+            cache of the upper limits of the analysis
+        """
+        from .statistical_models import UpperLimitCache
+
+        if analysis not in self.upper_limit_caches:
+            self.upper_limit_caches[analysis] = UpperLimitCache(
+                self.main.archi_info.ma5dir, analysis
+            )
+        return self.upper_limit_caches[analysis]
+
     def check_xml_scipy_methods(self):
         ## Checking XML parsers
         try:
@@ -1384,22 +2419,68 @@ class RunRecast:
         if not os.path.isfile(filename):
             self.logger.warning("Info " + filename + " does not exist...")
             return -1, -1, -1
+        ## Has the file already been parsed with the same settings?
+        stat = os.stat(filename)
+        file_key = (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+        settings = (
+            self.pad,
+            self.main.recasting.global_likelihoods_switch,
+            self.main.session_info.has_pyhf,
+            self.main.recasting.simplify_likelihoods,
+            self.main.session_info.has_simplify,
+            repr(self.main.recasting.error_extrapolation),
+        )
+        results_key = ("results", file_key, settings, extrapolated_lumi)
+        if results_key in _INFO_FILE_CACHE:
+            self.logger.debug("Info file of " + analysis + " read from the cache")
+            lumi, regions, regiondata, self.cov_config, self.pyhf_config = (
+                copy.deepcopy(_INFO_FILE_CACHE[results_key])
+            )
+            return lumi, regions, regiondata
+
         ## Getting the XML information
-        try:
-            with open(filename, "r") as info_input:
-                info_tree = etree.parse(info_input)
-        except Exception as err:
-            self.logger.warning("Error during XML parsing: " + str(err))
-            self.logger.warning("Cannot parse the info file")
-            return -1, -1, -1
+        info_tree = _INFO_FILE_CACHE.get(("tree", file_key))
+        if info_tree is None:
+            try:
+                with open(filename, "r") as info_input:
+                    info_tree = etree.parse(info_input)
+            except Exception as err:
+                self.logger.warning("Error during XML parsing: " + str(err))
+                self.logger.warning("Cannot parse the info file")
+                return -1, -1, -1
+            _INFO_FILE_CACHE[("tree", file_key)] = info_tree
 
         try:
-            results = self.header_info_file(info_tree, analysis, extrapolated_lumi)
-            return results
+            results = self.header_info_file(
+                info_tree, analysis, extrapolated_lumi, cache_key=(file_key, settings)
+            )
         except Exception as err:
             self.logger.warning("Error during extracting header info file: " + str(err))
             self.logger.warning("Cannot parse the info file")
             return -1, -1, -1
+        if -1 not in results:
+            _INFO_FILE_CACHE[results_key] = copy.deepcopy(
+                results + (self.cov_config, self.pyhf_config)
+            )
+        return results
+
+    def prewarm_info_files(self, analyses):
+        """
+        Parse the info files of a list of analyses for all luminosities, so that
+        the parsed content is inherited by the worker processes instead of being
+        computed again by each of them.
+
+        Parameters
+        ----------
+        analyses : LIST of STR
+            list of analysis names
+        """
+        etree = self.check_xml_scipy_methods()
+        if not etree:
+            return
+        for lumi in ["default"] + self.main.recasting.extrapolated_luminosities:
+            for analysis in analyses:
+                self.parse_info_file(etree, analysis, lumi)
 
     def fix_pileup(self, filename):
         # x
@@ -1454,7 +2535,7 @@ class RunRecast:
 
         return True
 
-    def header_info_file(self, etree, analysis, extrapolated_lumi):
+    def header_info_file(self, etree, analysis, extrapolated_lumi, cache_key=None):
         self.logger.debug("Reading info from the file related to " + analysis + "...")
         ## checking the header of the file
         info_root = etree.getroot()
@@ -1488,12 +2569,20 @@ class RunRecast:
             and self.main.session_info.has_pyhf
             and self.cov_config == {}
         ):
-            try:
-                self.pyhf_config = self.pyhf_info_file(info_root)
-                self.logger.debug(str(self.pyhf_config))
-            except Exception as err:
-                self.logger.debug("Check pyhf_info_file function!\n" + str(err))
-                self.pyhf_config = {}
+            # The HistFactory configuration does not depend on the luminosity
+            if cache_key is not None and ("pyhf", cache_key) in _INFO_FILE_CACHE:
+                self.pyhf_config = copy.deepcopy(_INFO_FILE_CACHE[("pyhf", cache_key)])
+            else:
+                try:
+                    self.pyhf_config = self.pyhf_info_file(info_root)
+                    self.logger.debug(str(self.pyhf_config))
+                except Exception as err:
+                    self.logger.debug("Check pyhf_info_file function!\n" + str(err))
+                    self.pyhf_config = {}
+                if cache_key is not None:
+                    _INFO_FILE_CACHE[("pyhf", cache_key)] = copy.deepcopy(
+                        self.pyhf_config
+                    )
 
         ## first we need to get the number of regions
         for child in info_root:
@@ -1787,20 +2876,17 @@ class RunRecast:
             out.write("\n")
 
     def read_cutflows(self, path, regions, regiondata):
-        self.logger.debug("Read the cutflow from the files:")
+        self.logger.debug("Read the cutflow from the files in " + path)
+        cutflows = self.cutflow_reader.load(path)
         for reg in regions:
             regname = clean_region_name(reg)
             ## getting the initial and final number of events
-            IsInitial = False
-            IsCounter = False
             N0 = 0.0
             Nf = 0.0
             ## checking if regions must be combined
             theregs = regname.split(";")
             for regiontocombine in theregs:
-                filename = path + "/" + regiontocombine + ".saf"
-                self.logger.debug("+ " + filename)
-                if not os.path.isfile(filename):
+                if regiontocombine not in cutflows:
                     self.logger.warning(
                         "Cannot find a cutflow for the region "
                         + regiontocombine
@@ -1809,28 +2895,8 @@ class RunRecast:
                     )
                     self.logger.warning("Skipping the CLs calculation.")
                     return -1
-                mysaffile = open(filename)
-                myN0 = -1
-                myNf = -1
-                for line in mysaffile:
-                    if "<InitialCounter>" in line:
-                        IsInitial = True
-                        continue
-                    elif "</InitialCounter>" in line:
-                        IsInitial = False
-                        continue
-                    elif "<Counter>" in line:
-                        IsCounter = True
-                        continue
-                    elif "</Counter>" in line:
-                        IsCounter = False
-                        continue
-                    if IsInitial and "sum of weights" in line and not "^2" in line:
-                        myN0 = float(line.split()[0]) + float(line.split()[1])
-                    if IsCounter and "sum of weights" in line and not "^2" in line:
-                        myNf = float(line.split()[0]) + float(line.split()[1])
-                mysaffile.close()
-                if myNf == -1 or myN0 == -1:
+                counters = cutflows[regiontocombine]
+                if counters is None:
                     self.logger.warning(
                         "Invalid cutflow for the region "
                         + reg
@@ -1841,8 +2907,8 @@ class RunRecast:
                     )
                     self.logger.warning("Skipping the CLs calculation.")
                     return -1
-                Nf += myNf
-                N0 += myN0
+                Nf += counters["Nf"]
+                N0 += counters["N0"]
             if Nf == 0 and N0 == 0:
                 self.logger.warning(
                     "Invalid cutflow for the region "
@@ -1869,6 +2935,8 @@ class RunRecast:
         from .statistical_models import APRIORI, OBSERVED
 
         self.logger.debug("Compute CLs...")
+        ## In the lazy mode, the CLs are only computed for the best regions
+        lazy = self.main.recasting.lazy_cls
         ## computing fi a region belongs to the best expected ones, and derive the CLs in all cases
         idx = 2 if is_extrapolated else 0
         expected = APRIORI if is_extrapolated else OBSERVED
@@ -1890,7 +2958,12 @@ class RunRecast:
                     / regiondata[reg]["N0"]
                 )
                 rSR = nsignal / n95
-                myCLs = stat_model.exclusion_confidence_level(expected=expected)[idx]
+                if lazy:
+                    myCLs = None
+                else:
+                    myCLs = stat_model.exclusion_confidence_level(expected=expected)[
+                        idx
+                    ]
             regiondata[reg]["rSR"] = rSR
             regiondata[reg]["CLs"] = myCLs
             if rSR > rMax:
@@ -1901,15 +2974,29 @@ class RunRecast:
                 rMax = rSR
             else:
                 regiondata[reg]["best"] = 0
+        if lazy:
+            for reg in self.lazy_models(regiondata, stat_models)[
+                "uncorrelated_background"
+            ]:
+                stat_model = stat_models["uncorrelated_background"][reg]
+                regiondata[reg]["CLs"] = stat_model.exclusion_confidence_level(
+                    expected=expected
+                )[idx]
 
         if self.cov_config:
             minsig95, bestreg = 1e99, []
+            selected = self.lazy_selection(
+                regiondata["cov_subset"], stat_models["simplified_likelihoods"]
+            )
             for cov_subset, stat_model in stat_models["simplified_likelihoods"].items():
-                CLs = stat_model.exclusion_confidence_level(expected=expected)
                 s95 = float(regiondata["cov_subset"][cov_subset]["s95exp"])
-                regiondata["cov_subset"][cov_subset]["CLs"] = CLs[idx]
-                if expected != OBSERVED:
-                    regiondata["cov_subset"][cov_subset]["full_CLs_output"] = CLs
+                if cov_subset in selected:
+                    CLs = stat_model.exclusion_confidence_level(expected=expected)
+                    regiondata["cov_subset"][cov_subset]["CLs"] = CLs[idx]
+                    if expected != OBSERVED:
+                        regiondata["cov_subset"][cov_subset]["full_CLs_output"] = CLs
+                else:
+                    regiondata["cov_subset"][cov_subset]["CLs"] = None
                 if 0.0 < s95 < minsig95:
                     regiondata["cov_subset"][cov_subset]["best"] = 1
                     for mybr in bestreg:
@@ -1921,11 +3008,17 @@ class RunRecast:
 
         if self.pyhf_config:
             minsig95, bestreg = 1e99, []
+            selected = self.lazy_selection(
+                regiondata["pyhf"], stat_models["full_likelihoods"]
+            )
             for llhd_profile, stat_model in stat_models["full_likelihoods"].items():
-                CLs = stat_model.exclusion_confidence_level(expected=expected)
-                regiondata["pyhf"][llhd_profile]["CLs"] = CLs[idx]
-                if expected != OBSERVED:
-                    regiondata["pyhf"][llhd_profile]["full_CLs_output"] = CLs
+                if llhd_profile in selected:
+                    CLs = stat_model.exclusion_confidence_level(expected=expected)
+                    regiondata["pyhf"][llhd_profile]["CLs"] = CLs[idx]
+                    if expected != OBSERVED:
+                        regiondata["pyhf"][llhd_profile]["full_CLs_output"] = CLs
+                else:
+                    regiondata["pyhf"][llhd_profile]["CLs"] = None
                 s95 = float(regiondata["pyhf"][llhd_profile]["s95exp"])
                 if 0.0 < s95 < minsig95:
                     regiondata["pyhf"][llhd_profile]["best"] = 1
@@ -1938,6 +3031,137 @@ class RunRecast:
 
         return regiondata
 
+    def lazy_selection(self, data, stat_models):
+        """
+        Names of the covariance subsets or likelihood profiles for which the CLs
+        must be computed. In the lazy mode, only the ``k`` ones with the smallest
+        (positive) expected upper limits are retained.
+
+        Parameters
+        ----------
+        data : DICT
+            results per subset or profile (containing the expected limit s95exp)
+        stat_models : DICT
+            statistical model per subset or profile
+
+        Returns
+        -------
+        LIST of STR
+            names of the selected subsets or profiles
+        """
+        lazy = self.main.recasting.lazy_cls
+        if not lazy:
+            return list(stat_models.keys())
+        limits = {name: float(data[name]["s95exp"]) for name in stat_models}
+        ranking = sorted(
+            [name for name, s95 in limits.items() if s95 > 0.0],
+            key=lambda name: limits[name],
+        )
+        return ranking[:lazy]
+
+    def lazy_models(self, regiondata, stat_models):
+        """
+        Statistical models retained in the lazy CLs mode: the ``k`` signal
+        regions (with a non-vanishing signal), covariance subsets and likelihood
+        profiles with the smallest expected upper limits.
+
+        Parameters
+        ----------
+        regiondata : DICT
+            results of the upper limit calculation
+        stat_models : DICT
+            statistical models per model type
+
+        Returns
+        -------
+        DICT
+            selected statistical models per model type
+        """
+        data = {
+            "uncorrelated_background": regiondata,
+            "simplified_likelihoods": regiondata.get("cov_subset", {}),
+            "full_likelihoods": regiondata.get("pyhf", {}),
+        }
+        selected = {}
+        for model_type, models in stat_models.items():
+            if model_type == "uncorrelated_background":
+                models = {
+                    reg: model
+                    for reg, model in models.items()
+                    if regiondata[reg]["Nf"] / regiondata[reg]["N0"] > 0.0
+                }
+            selected[model_type] = {
+                name: models[name]
+                for name in self.lazy_selection(data[model_type], models)
+            }
+        return selected
+
+    def lazy_statistics(
+        self, regiondata, stat_models, xsection, is_extrapolated, upper_limits=True
+    ):
+        """
+        Compute, in the lazy CLs mode, the observed upper limits and the
+        exclusion confidence levels of the selected regions, subsets and
+        profiles only. The observed limits of the other ones are reported as
+        skipped.
+
+        Parameters
+        ----------
+        regiondata : DICT
+            results of the upper limit calculation (with the expected limits)
+        stat_models : DICT
+            statistical models per model type
+        xsection : FLOAT
+            signal cross section
+        is_extrapolated : bool
+            extrapolated luminosity
+        upper_limits : bool
+            compute the observed upper limits (False for the variations of
+            the cross section)
+
+        Returns
+        -------
+        DICT
+            statistical models per model type, including the precomputed ones
+        """
+        from .statistical_models import compute_poi_upper_limits, prefetch_statistics
+
+        selected = prefetch_statistics(
+            self.lazy_models(regiondata, stat_models),
+            is_extrapolated=is_extrapolated,
+            ncores=self.stat_ncores,
+            upper_limits=upper_limits,
+            limits=("obs",),
+        )
+        if upper_limits and not is_extrapolated:
+            for model_type, record in [
+                ("uncorrelated_background", None),
+                ("simplified_likelihoods", "cov_subset"),
+                ("full_likelihoods", "pyhf"),
+            ]:
+                data = regiondata if record is None else regiondata.get(record, {})
+                for name in stat_models[model_type]:
+                    if name in data and name not in selected[model_type]:
+                        data[name]["s95obs"] = "skipped"
+                if selected[model_type]:
+                    compute_poi_upper_limits(
+                        regiondata,
+                        selected[model_type],
+                        xsection,
+                        is_extrapolated=is_extrapolated,
+                        record_to=record,
+                        limits=("obs",),
+                    )
+        return {
+            model_type: dict(models, **selected[model_type])
+            for model_type, models in stat_models.items()
+        }
+
+    @staticmethod
+    def format_cls(value, fmt):
+        """CLs value as written in the output files (``skipped`` if not computed)"""
+        return "skipped" if value is None else fmt % value
+
     def write_cls_output(
         self, analysis, regions, regiondata, errordata, summary, xsflag, lumi
     ):
@@ -1996,7 +3220,7 @@ class RunRecast:
             else:
                 myxsobs = "-1"
             if not xsflag:
-                mycls = "%.10f" % regiondata[reg]["CLs"]
+                mycls = self.format_cls(regiondata[reg]["CLs"], "%.10f")
                 summary.write(
                     analysis.ljust(30, " ")
                     + reg.ljust(60, " ")
@@ -2019,7 +3243,7 @@ class RunRecast:
                             errordata[error_set[1]][reg]["CLs"],
                             regiondata[reg]["CLs"],
                         ]
-                        if len(set(band)) == 1:
+                        if len(set(band)) == 1 or None in band:
                             continue
                         summary.write(
                             "".ljust(90, " ")
@@ -2038,7 +3262,7 @@ class RunRecast:
                             errordata[error_set[1]][reg]["CLs"],
                             regiondata[reg]["CLs"],
                         ]
-                        if len(set(band)) == 1:
+                        if len(set(band)) == 1 or None in band:
                             continue
                         up, dn = sys
                         summary.write(
@@ -2072,7 +3296,9 @@ class RunRecast:
                 myxsexp = regiondata["cov_subset"][cov_subset].get("s95exp", "-1")
                 myxsobs = regiondata["cov_subset"][cov_subset].get("s95obs", "-1")
                 best = str(regiondata["cov_subset"][cov_subset].get("best", 0))
-                myglobalcls = "%.4f" % regiondata["cov_subset"][cov_subset]["CLs"]
+                myglobalcls = self.format_cls(
+                    regiondata["cov_subset"][cov_subset]["CLs"], "%.4f"
+                )
                 description = "[SL]-" + cov_subset
                 summary.write(
                     analysis.ljust(30, " ")
@@ -2091,7 +3317,7 @@ class RunRecast:
                             errordata[error_set[1]]["cov_subset"][cov_subset]["CLs"],
                             regiondata["cov_subset"][cov_subset]["CLs"],
                         ]
-                        if len(set(band)) == 1:
+                        if len(set(band)) == 1 or None in band:
                             continue
                         summary.write(
                             "".ljust(90, " ")
@@ -2110,7 +3336,7 @@ class RunRecast:
                             errordata[error_set[1]]["cov_subset"][cov_subset]["CLs"],
                             regiondata["cov_subset"][cov_subset]["CLs"],
                         ]
-                        if len(set(band)) == 1:
+                        if len(set(band)) == 1 or None in band:
                             continue
                         up, dn = sys
                         summary.write(
@@ -2126,7 +3352,7 @@ class RunRecast:
                         )
             else:
                 myxsexp = regiondata["cov_subset"][cov_subset]["s95exp"]
-                myxsobs = regiondata["cov_subset"][cov_subset]["s95obs"]
+                myxsobs = regiondata["cov_subset"][cov_subset].get("s95obs", "-1")
                 description = "[SL]-" + cov_subset
                 summary.write(
                     analysis.ljust(30, " ")
@@ -2145,8 +3371,8 @@ class RunRecast:
             myxsobs = pyhf_data.get(likelihood_profile, {}).get("s95obs", "-1")
             if not xsflag:
                 self.logger.debug(str(pyhf_data))
-                mycls = "{:.4f}".format(
-                    pyhf_data.get(likelihood_profile, {}).get("CLs", 0.0)
+                mycls = self.format_cls(
+                    pyhf_data.get(likelihood_profile, {}).get("CLs", 0.0), "%.4f"
                 )
                 best = str(pyhf_data.get(likelihood_profile, {}).get("best", 0))
                 summary.write(
@@ -2175,7 +3401,7 @@ class RunRecast:
                             .get("CLs", 0.0),
                             pyhf_data.get(likelihood_profile, {}).get("CLs", 0.0),
                         ]
-                        if len(set(band)) == 1:
+                        if len(set(band)) == 1 or None in band:
                             continue
                         summary.write(
                             "".ljust(90, " ")
@@ -2200,7 +3426,7 @@ class RunRecast:
                             .get("CLs", 0.0),
                             pyhf_data.get(likelihood_profile, {}).get("CLs", 0.0),
                         ]
-                        if len(set(band)) == 1:
+                        if len(set(band)) == 1 or None in band:
                             continue
                         up, dn = sys
                         summary.write(
@@ -0,0 +1,305 @@
+################################################################################
+#
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+
+"""
+Signal-grid mode of the recasting: the exclusion results of a scan of signal
+datasets, each of them located on a grid through its ``grid`` attribute, are
+gathered in one table per analysis together with the exclusion contour.
+"""
+
+import json
+import logging
+import os
+from typing import Optional
+
+from madanalysis.misc.cache_service import atomic_write, file_lock
+
+logger = logging.getLogger("MA5")
+
+# Exclusion results of a dataset, stored in Output/SAF/<dataset>
+GRID_RESULTS = "Grid_results.json"
+
+# Folder of the grid tables and contours, in Output/SAF
+GRID_FOLDER = "Grid"
+
+
+def _as_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def best_results(regions: list, regiondata: dict) -> dict:
+    """
+    Summary of the exclusion of one signal point by an analysis: best signal
+    region, best covariance subset and best likelihood profile.
+
+    Args:
+        regions (``list``): signal regions of the analysis
+        regiondata (``dict``): results of the CLs calculation
+
+    Returns:
+        ``dict``:
+        results indexed by ``SR``, ``SL`` and ``pyhf``
+    """
+    results = {}
+    for reg in regions:
+        if regiondata[reg].get("best", 0) == 1:
+            results["SR"] = {
+                "name": reg,
+                "rSR": _as_float(regiondata[reg].get("rSR")),
+                "CLs": _as_float(regiondata[reg].get("CLs")),
+                "s95exp": _as_float(regiondata[reg].get("s95exp")),
+                "s95obs": _as_float(regiondata[reg].get("s95obs")),
+            }
+            break
+    for record, label in [("cov_subset", "SL"), ("pyhf", "pyhf")]:
+        for name, data in regiondata.get(record, {}).items():
+            if data.get("best", 0) == 1:
+                results[label] = {
+                    "name": name,
+                    "CLs": _as_float(data.get("CLs")),
+                    "s95exp": _as_float(data.get("s95exp")),
+                    "s95obs": _as_float(data.get("s95obs")),
+                }
+                break
+    return results
+
+
+def exclusion_cls(results: dict) -> Optional[float]:
+    """
+    CLs used to draw the exclusion contour: the one of the best likelihood
+    profile if available, then the one of the best covariance subset and
+    finally the one of the best signal region. For the points skipped by an
+    adaptive scan, the interpolated CLs is returned.
+
+    Args:
+        results (``dict``): output of ``best_results``
+
+    Returns:
+        ``Optional[float]``:
+        exclusion confidence level (``None`` if not computed)
+    """
+    for label in ["pyhf", "SL", "SR", "interpolated"]:
+        value = results.get(label, {}).get("CLs")
+        if value is not None:
+            return value
+    return None
+
+
+def store_grid_results(
+    dirname: str, dataset, results: dict, interpolated: bool = False
+) -> None:
+    """
+    Save the exclusion results of a signal point. Results already stored for
+    other analyses (e.g. obtained with another detector card) are kept.
+
+    Args:
+        dirname (``str``): output folder of the recast run
+        dataset (``Dataset``): signal dataset
+        results (``dict``): ``best_results`` per luminosity tag and analysis
+        interpolated (``bool``, default ``False``): the results have been
+            interpolated from the neighbouring points instead of being computed
+    """
+    filename = os.path.join(dirname, "Output/SAF", dataset.name, GRID_RESULTS)
+    try:
+        with file_lock(filename + ".lock"):
+            content = load_grid_results(dirname, dataset.name)
+            content["grid"] = list(dataset.grid)
+            content["xsection"] = dataset.xsection
+            content["interpolated"] = interpolated
+            for lumi, analyses in results.items():
+                content.setdefault("results", {}).setdefault(lumi, {}).update(analyses)
+            atomic_write(filename, json.dumps(content, indent=1, sort_keys=True))
+    except OSError as err:
+        logger.warning(
+            "Cannot save the grid results of " + dataset.name + ": " + str(err)
+        )
+
+
+def load_grid_results(dirname: str, name: str) -> dict:
+    """
+    Args:
+        dirname (``str``): output folder of the recast run
+        name (``str``): name of the dataset
+
+    Returns:
+        ``dict``:
+        stored results of the dataset (empty if not available)
+    """
+    filename = os.path.join(dirname, "Output/SAF", name, GRID_RESULTS)
+    if not os.path.isfile(filename):
+        return {}
+    try:
+        with open(filename, "r") as stream:
+            return json.load(stream)
+    except (OSError, ValueError) as err:
+        logger.warning("Cannot read " + filename + ": " + str(err))
+        return {}
+
+
+def _crossing(p1: tuple, p2: tuple, level: float) -> Optional[tuple]:
+    (x1, c1), (x2, c2) = p1, p2
+    if c1 == c2 or (c1 - level) * (c2 - level) > 0.0:
+        return None
+    frac = (level - c1) / (c2 - c1)
+    return tuple(a + frac * (b - a) for a, b in zip(x1, x2))
+
+
+def exclusion_contour(points: list, level: float = 0.95) -> list:
+    """
+    Points of a one- or two-dimensional grid where the CLs crosses a given
+    level, obtained by linear interpolation between neighbouring grid points
+    along each grid line.
+
+    Args:
+        points (``list``): ``(coordinates, CLs)`` pairs
+        level (``float``, default ``0.95``): confidence level of the contour
+
+    Returns:
+        ``list``:
+        coordinates of the contour points
+    """
+    points = [(tuple(x), c) for x, c in points if c is not None]
+    if len(points) == 0:
+        return []
+    dim = len(points[0][0])
+    if dim not in [1, 2]:
+        logger.warning("Exclusion contours are only derived for 1D and 2D grids")
+        return []
+
+    # grid lines: points sharing all coordinates but one
+    lines = {}
+    for axis in range(dim):
+        for coords, cls in points:
+            other = coords[:axis] + coords[axis + 1 :]
+            lines.setdefault((axis, other), []).append((coords, cls))
+
+    contour = []
+    for (axis, _), line in sorted(lines.items()):
+        line.sort(key=lambda x: x[0][axis])
+        for p1, p2 in zip(line[:-1], line[1:]):
+            point = _crossing(p1, p2, level)
+            if point is not None and point not in contour:
+                contour.append(point)
+    return sorted(contour)
+
+
+def _format(value, fmt: str = "%.6g") -> str:
+    return "-" if value is None else fmt % value
+
+
+def write_grid_outputs(dirname: str, datasets, level: float = 0.95) -> list:
+    """
+    Write one table per analysis (and luminosity) with the results of all the
+    signal points, and the associated exclusion contours, in
+    ``Output/SAF/Grid``.
+
+    Args:
+        dirname (``str``): output folder of the recast run
+        datasets (``DatasetCollection``): datasets of the run
+        level (``float``, default ``0.95``): confidence level of the contours
+
+    Returns:
+        ``list``:
+        names of the files written
+    """
+    dim = None
+    rows = {}
+    for dataset in datasets:
+        if len(dataset.grid) == 0:
+            continue
+        if dim is None:
+            dim = len(dataset.grid)
+        elif len(dataset.grid) != dim:
+            logger.warning(
+                "The grid coordinates of "
+                + dataset.name
+                + " do not have the dimension of the other points: skipping it."
+            )
+            continue
+        content = load_grid_results(dirname, dataset.name)
+        if not content:
+            logger.warning("No grid results for the dataset " + dataset.name + ".")
+            continue
+        for lumi, analyses in content.get("results", {}).items():
+            for analysis, results in analyses.items():
+                rows.setdefault((analysis, lumi), []).append(
+                    (dataset, content.get("xsection"), results)
+                )
+
+    folder = os.path.join(dirname, "Output/SAF", GRID_FOLDER)
+    written = []
+    for (analysis, lumi), points in sorted(rows.items()):
+        points.sort(key=lambda x: x[0].grid)
+        table = [
+            "# "
+            + "".join(("x" + str(i + 1)).ljust(15) for i in range(dim))
+            + "dataset".ljust(30)
+            + "xsection [pb]".ljust(15)
+            + "best SR".ljust(60)
+            + "rSR".ljust(15)
+            + "CLs(SR)".ljust(15)
+            + "s95exp(SR)".ljust(15)
+            + "s95obs(SR)".ljust(15)
+            + "CLs(SL)".ljust(15)
+            + "CLs(pyhf)".ljust(15)
+            + "CLs"
+        ]
+        cls_points = []
+        for dataset, xsection, results in points:
+            region = results.get("SR", {})
+            if "interpolated" in results:
+                region = {"name": "(interpolated)"}
+            cls = exclusion_cls(results)
+            cls_points.append((dataset.grid, cls))
+            table.append(
+                "  "
+                + "".join(_format(x).ljust(15) for x in dataset.grid)
+                + dataset.name.ljust(30)
+                + _format(xsection).ljust(15)
+                + region.get("name", "-").ljust(60)
+                + _format(region.get("rSR")).ljust(15)
+                + _format(region.get("CLs"), "%.4f").ljust(15)
+                + _format(region.get("s95exp")).ljust(15)
+                + _format(region.get("s95obs")).ljust(15)
+                + _format(results.get("SL", {}).get("CLs"), "%.4f").ljust(15)
+                + _format(results.get("pyhf", {}).get("CLs"), "%.4f").ljust(15)
+                + _format(cls, "%.4f")
+            )
+        tablefile = os.path.join(folder, analysis + lumi + ".dat")
+        atomic_write(tablefile, "\n".join(table) + "\n")
+        written.append(tablefile)
+
+        contour = [
+            "# Exclusion contour (CLs = " + str(level) + ") of " + analysis,
+            "# " + "".join(("x" + str(i + 1)).ljust(15) for i in range(dim)).rstrip(),
+        ]
+        for point in exclusion_contour(cls_points, level):
+            contour.append("  " + "".join(_format(x).ljust(15) for x in point).rstrip())
+        contourfile = os.path.join(folder, analysis + lumi + "_contour.dat")
+        atomic_write(contourfile, "\n".join(contour) + "\n")
+        written.append(contourfile)
+    return written
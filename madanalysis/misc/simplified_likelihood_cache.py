@@ -0,0 +1,299 @@
+################################################################################
+#
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+"""
+Persistent cache of the simplified likelihoods obtained with ``simplify``
+from the full HistFactory workspaces of the PAD analyses.
+"""
+
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import xml.etree.ElementTree as ET
+from typing import List, Optional, Tuple
+
+from madanalysis.misc.cache_service import (
+    atomic_copy,
+    atomic_write,
+    file_lock,
+    hash_files,
+)
+
+logger = logging.getLogger("MA5")
+
+# Version of the cache format, to be increased if the simplification changes
+CACHE_VERSION = "1"
+
+PAD_FOLDERS = ["PAD", "PADForMA5tune", "PADForSFS"]
+
+
+def import_simplify(ma5dir: str):
+    """
+    Import the ``simplify`` package, possibly installed within MadAnalysis 5.
+
+    Args:
+        ma5dir (``str``): MadAnalysis 5 installation folder
+
+    Returns:
+        ``module``:
+        the ``simplify`` module (``ImportError`` is raised if not available)
+    """
+    simplify_path = os.path.join(ma5dir, "tools/simplify/simplify-master/src")
+    if os.path.isdir(simplify_path) and simplify_path not in sys.path:
+        sys.path.insert(0, simplify_path)
+    import simplify  # pylint: disable=import-outside-toplevel
+
+    logger.debug("simplify has been imported from " + " ".join(simplify.__path__))
+    return simplify
+
+
+def simplify_workspace(spec: dict, simplify) -> dict:
+    """
+    Fit a background-only HistFactory workspace and build its simplified version.
+
+    Args:
+        spec (``dict``): full workspace
+        simplify (``module``): the ``simplify`` module
+
+    Returns:
+        ``dict``:
+        simplified workspace
+    """
+    poi_name = "lumi"
+    try:
+        original_poi = spec["measurements"][0]["config"]["poi"]
+        spec["measurements"][0]["config"]["poi"] = poi_name
+    except IndexError as err:
+        raise simplify.exceptions.InvalidMeasurement(
+            "The measurement index 0 is out of bounds."
+        ) from err
+    model, data = simplify.model_tools.model_and_data(spec)
+
+    fixed_params = model.config.suggested_fixed()
+    init_pars = model.config.suggested_init()
+    # Fit the model to data
+    fit_result = simplify.fitter.fit(
+        model, data, init_pars=init_pars, fixed_pars=fixed_params
+    )
+    # Get yields
+    ylds = simplify.yields.get_yields(spec, fit_result, [])
+    newspec = simplify.simplified.get_simplified_spec(
+        spec, ylds, allowed_modifiers=[], prune_channels=[], include_signal=False
+    )
+    newspec["measurements"][0]["config"]["poi"] = original_poi
+    return newspec
+
+
+class SimplifiedLikelihoodCache:
+    """
+    Content-addressed cache of simplified likelihoods.
+
+    The simplified version of a workspace is stored in
+    ``tools/Cache/SimplifiedLikelihoods/<hash>.json``, where the hash is computed
+    from the content of the original workspace. A modified workspace is then
+    automatically simplified again. Files are written atomically and the
+    simplification of a given workspace is protected by a lock, so that
+    concurrent sessions never perform the same fit twice nor read a partially
+    written file. A simplified workspace shipped with the analysis
+    (``<name>_simplified.json`` next to ``<name>.json``) is used to seed the
+    cache instead of performing the fit.
+
+    Args:
+        ma5dir (``str``): MadAnalysis 5 installation folder
+    """
+
+    def __init__(self, ma5dir: str):
+        self.ma5dir = ma5dir
+        self.path = os.path.join(ma5dir, "tools/Cache/SimplifiedLikelihoods")
+
+    def key(self, workspace: str) -> str:
+        """Hash of the content of a workspace file"""
+        return hash_files(
+            [workspace],
+            root=os.path.dirname(workspace),
+            extra=["version:" + CACHE_VERSION],
+        )
+
+    def filename(self, workspace: str) -> str:
+        """Location of the simplified version of a workspace in the cache"""
+        return os.path.join(self.path, self.key(workspace) + ".json")
+
+    @staticmethod
+    def shipped(workspace: str) -> Optional[str]:
+        """
+        Args:
+            workspace (``str``): path to the full workspace
+
+        Returns:
+            ``Optional[str]``:
+            path to the simplified workspace shipped next to the full one,
+            ``None`` if not available
+        """
+        filename = workspace.split(".json")[0] + "_simplified.json"
+        return filename if os.path.isfile(filename) else None
+
+    def lookup(self, workspace: str) -> Optional[str]:
+        """
+        Args:
+            workspace (``str``): path to the full workspace
+
+        Returns:
+            ``Optional[str]``:
+            path to the cached simplified workspace, ``None`` if not available
+        """
+        filename = self.filename(workspace)
+        return filename if os.path.isfile(filename) else None
+
+    def get(self, workspace: str, force: bool = False) -> str:
+        """
+        Get the simplified version of a workspace, performing the simplification
+        if it is not available in the cache.
+
+        Args:
+            workspace (``str``): path to the full workspace
+            force (``bool``, default ``False``): redo the simplification
+
+        Returns:
+            ``str``:
+            path to the simplified workspace
+        """
+        filename = self.filename(workspace)
+        if os.path.isfile(filename) and not force:
+            return filename
+        with file_lock(filename + ".lock"):
+            # Another process may have done the job while we were waiting
+            if os.path.isfile(filename) and not force:
+                return filename
+            shipped = self.shipped(workspace)
+            if shipped is not None and not force:
+                logger.debug("using the simplified workspace " + shipped)
+                atomic_copy(shipped, filename)
+                return filename
+            simplify = import_simplify(self.ma5dir)
+            logger.debug("simplifying " + workspace)
+            with open(workspace, "r") as stream:
+                spec = json.load(stream)
+            newspec = simplify_workspace(spec, simplify)
+            atomic_write(filename, json.dumps(newspec, indent=4, sort_keys=True))
+        return filename
+
+
+def pad_workspaces(pad_folder: str) -> List[str]:
+    """
+    List the HistFactory workspaces declared in the info files of a PAD.
+
+    Args:
+        pad_folder (``str``): PAD installation folder
+
+    Returns:
+        ``List[str]``:
+        paths to the workspaces
+    """
+    workspaces = []
+    analyzer_folder = os.path.join(pad_folder, "Build/SampleAnalyzer/User/Analyzer")
+    for info in sorted(glob.glob(os.path.join(analyzer_folder, "*.info"))):
+        try:
+            info_root = ET.parse(info).getroot()
+        except ET.ParseError as err:
+            logger.warning("Cannot parse " + info + ": " + str(err))
+            continue
+        for profile in info_root.findall("pyhf"):
+            for name in profile.findall("name"):
+                workspace = os.path.join(analyzer_folder, str(name.text).strip())
+                if os.path.isfile(workspace) and workspace not in workspaces:
+                    workspaces.append(workspace)
+    return workspaces
+
+
+def _prebuild_workspace(job: tuple) -> Tuple[str, bool]:
+    ma5dir, workspace, force = job
+    try:
+        SimplifiedLikelihoodCache(ma5dir).get(workspace, force=force)
+        return workspace, True
+    except Exception as err:  # pylint: disable=broad-except
+        logger.error("Cannot simplify " + workspace + ": " + str(err))
+        return workspace, False
+
+
+def main(ma5dir: str, argv: Optional[List[str]] = None) -> int:
+    """Command-line interface prebuilding the simplified likelihoods"""
+    parser = argparse.ArgumentParser(
+        description="Prebuild the simplified likelihoods of the PAD analyses "
+        "equipped with HistFactory workspaces."
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        help="PAD folders or workspace files (default: all installed PADs)",
+    )
+    parser.add_argument(
+        "-j", "--ncores", type=int, default=1, help="number of parallel fits"
+    )
+    parser.add_argument(
+        "-f", "--force", action="store_true", help="redo existing simplifications"
+    )
+    parser.add_argument(
+        "-l", "--list", action="store_true", help="only list the workspaces"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(format="%(message)s", level=logging.INFO)
+
+    inputs = args.inputs or [os.path.join(ma5dir, "tools", pad) for pad in PAD_FOLDERS]
+    workspaces = []
+    for item in inputs:
+        if os.path.isdir(item):
+            workspaces += pad_workspaces(item)
+        elif os.path.isfile(item):
+            workspaces.append(os.path.abspath(item))
+        elif args.inputs:
+            logger.error("Input not found: " + item)
+            return 1
+
+    cache = SimplifiedLikelihoodCache(ma5dir)
+    if args.list:
+        for workspace in workspaces:
+            status = "cached" if cache.lookup(workspace) else "missing"
+            logger.info(f"{status:8s} {workspace}")
+        return 0
+
+    try:
+        import_simplify(ma5dir)
+    except ImportError:
+        logger.error("To use simplified likelihoods, please install simplify")
+        return 1
+
+    jobs = [(ma5dir, workspace, args.force) for workspace in workspaces]
+    if args.ncores > 1 and len(jobs) > 1:
+        with multiprocessing.get_context("fork").Pool(args.ncores) as pool:
+            results = pool.map(_prebuild_workspace, jobs, chunksize=1)
+    else:
+        results = [_prebuild_workspace(job) for job in jobs]
+    nfailed = sum(not ok for _, ok in results)
+    logger.info(
+        f"{len(results) - nfailed} simplified likelihoods available, {nfailed} failures"
+    )
+    return 1 if nfailed > 0 else 0
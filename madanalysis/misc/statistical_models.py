@@ -1,8 +1,13 @@
+import json
 import logging
+import multiprocessing
+import os
 
 import spey
 from numpy import isinf, isnan
 
+from madanalysis.misc.cache_service import atomic_write, file_lock
+
 from .histfactory_reader import HF_Background, HF_Signal
 
 APRIORI = spey.ExpectationType.apriori
@@ -11,6 +16,9 @@ OBSERVED = spey.ExpectationType.observed
 
 logger = logging.getLogger("MA5")
 
+# Statistical models shared with the worker processes of ``prefetch_statistics``
+_SHARED_MODELS = {}
+
 
 def initialise_statistical_models(
     regiondata: dict,
@@ -96,12 +104,70 @@ def initialise_statistical_models(
     }
 
 
+class RescaledModel:
+    """
+    Statistical model whose signal yields are rescaled by a constant factor.
+
+    The signal of all statistical models is multiplied by the parameter of
+    interest, so that a model with signal yields rescaled by a factor ``k`` is
+    equivalent to the original model evaluated at ``poi_test = k``. Upper limits
+    on the parameter of interest are divided by ``k``. The background model is
+    then shared with the original one and does not need to be rebuilt.
+
+    Args:
+        model (``spey.StatisticalModel``): original statistical model
+        factor (``float``): rescaling factor of the signal yields
+    """
+
+    def __init__(self, model: spey.StatisticalModel, factor: float):
+        self.model = model
+        self.factor = factor
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def poi_upper_limit(self, expected=OBSERVED, **kwargs):
+        """Upper limit on the parameter of interest"""
+        return self.model.poi_upper_limit(expected=expected, **kwargs) / self.factor
+
+    def exclusion_confidence_level(
+        self, poi_test: float = 1.0, expected=OBSERVED, **kwargs
+    ):
+        """Exclusion confidence level"""
+        return self.model.exclusion_confidence_level(
+            poi_test=poi_test * self.factor, expected=expected, **kwargs
+        )
+
+
+def rescale_statistical_models(stat_models: dict, factor: float) -> dict:
+    """
+    Reuse statistical models for a signal rescaled by a constant factor, e.g.
+    for a variation of the signal cross section.
+
+    Args:
+        stat_models (``dict``): statistical models from
+            ``initialise_statistical_models``
+        factor (``float``): rescaling factor of the signal yields
+
+    Returns:
+        ``dict``:
+        statistical models with the same structure as ``stat_models``
+    """
+    return {
+        model_type: {
+            name: RescaledModel(model, factor) for name, model in models.items()
+        }
+        for model_type, models in stat_models.items()
+    }
+
+
 def compute_poi_upper_limits(
     regiondata: dict,
     stat_models: dict,
     xsection: float,
     is_extrapolated: bool,
     record_to: str = None,
+    limits: tuple = ("exp", "obs"),
 ) -> dict:  # pylint: disable=too-many-arguments
     """
     Compute upper limit on cross section.
@@ -113,6 +179,7 @@ def compute_poi_upper_limits(
         lumi (``float``): luminosity
         is_extrapolated (``bool``): extrapolated luminosity
         record_to (``str``): record to a specific section in regiondata
+        limits (``tuple``, default ``("exp", "obs")``): upper limits to compute
 
     Returns:
         ``dict``:
@@ -129,6 +196,8 @@ def compute_poi_upper_limits(
     )
 
     for tag, label in zip(*tags):
+        if label not in limits:
+            continue
         for reg, stat_model in stat_models.items():
             logger.debug("running %s for %s", reg, record_to)
             s95 = stat_model.poi_upper_limit(expected=tag) * xsection
@@ -142,3 +211,302 @@ def compute_poi_upper_limits(
                 logger.debug("%s:: region %s s95%s = %.5f pb", record_to, reg, label, s95)
                 regiondata[record_to][reg][f"s95{label}"] = f"{s95:20.7f}"
     return regiondata
+
+
+class PrecomputedModel:
+    """
+    Statistical model whose upper limits and exclusion confidence levels have
+    already been computed. Any other request is forwarded to the original
+    model.
+
+    Args:
+        model (``spey.StatisticalModel``): original statistical model
+        results (``dict``): results indexed by ``(method, expectation type)``
+    """
+
+    def __init__(self, model: spey.StatisticalModel, results: dict):
+        self.model = model
+        self.results = results
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def poi_upper_limit(self, expected=OBSERVED, **kwargs):
+        """Upper limit on the parameter of interest"""
+        key = ("poi_upper_limit", expected)
+        if not kwargs and key in self.results:
+            return self.results[key]
+        return self.model.poi_upper_limit(expected=expected, **kwargs)
+
+    def exclusion_confidence_level(self, expected=OBSERVED, **kwargs):
+        """Exclusion confidence level"""
+        key = ("exclusion_confidence_level", expected)
+        if not kwargs and key in self.results:
+            return self.results[key]
+        return self.model.exclusion_confidence_level(expected=expected, **kwargs)
+
+
+class UpperLimitCache:
+    """
+    Persistent cache of the upper limits on the number of signal events of
+    single-bin signal regions.
+
+    For a single region with uncorrelated background, the upper limit on the
+    number of signal events only depends on the number of observed events, the
+    expected background and its uncertainty, and not on the signal. It is
+    stored in ``tools/Cache/UpperLimits/<analysis>.json``, indexed by region,
+    luminosity, background tuple and expectation type, so that the limit of a
+    region is computed only once for all the signals (e.g. the points of a
+    parameter scan). Entries computed with another version of spey are ignored.
+    New entries are kept in memory and written to the cache file by ``flush``.
+
+    Args:
+        ma5dir (``str``): MadAnalysis 5 installation folder
+        analysis (``str``): analysis name
+    """
+
+    def __init__(self, ma5dir: str, analysis: str):
+        self.filename = os.path.join(
+            ma5dir, "tools/Cache/UpperLimits", analysis + ".json"
+        )
+        self.version = str(spey.__version__)
+        self.limits = self.read()
+        self.pending = {}
+
+    def read(self) -> dict:
+        """Content of the cache file"""
+        try:
+            with open(self.filename, "r") as stream:
+                content = json.load(stream)
+        except (OSError, ValueError):
+            return {}
+        if content.get("spey") != self.version:
+            return {}
+        return content.get("limits", {})
+
+    @staticmethod
+    def key(region: str, lumi: float, data: dict, expected) -> str:
+        """Index of a region in the cache"""
+        return "|".join(
+            [
+                region,
+                repr(float(lumi)),
+                repr(float(data["nobs"])),
+                repr(float(data["nb"])),
+                repr(float(data["deltanb"])),
+                str(expected),
+            ]
+        )
+
+    def lookup(self, key: str):
+        """Upper limit on the number of signal events (``None`` if not cached)"""
+        return self.limits.get(key)
+
+    def store(self, key: str, n95: float) -> None:
+        """Add an upper limit on the number of signal events to the cache"""
+        self.limits[key] = n95
+        self.pending[key] = n95
+
+    def flush(self) -> None:
+        """Write the new upper limits to the cache file"""
+        if not self.pending:
+            return
+        try:
+            with file_lock(self.filename + ".lock"):
+                limits = self.read()
+                limits.update(self.pending)
+                atomic_write(
+                    self.filename,
+                    json.dumps({"spey": self.version, "limits": limits}, indent=1),
+                )
+                self.limits.update(limits)
+        except OSError as err:
+            logger.debug("Cannot update the upper limit cache: %s", str(err))
+        self.pending = {}
+
+    def reload(self) -> None:
+        """Read the upper limits written to the cache file by other processes"""
+        self.limits.update(self.read())
+
+
+class CachedLimitModel(PrecomputedModel):
+    """
+    Single-region statistical model whose upper limits are read from, and
+    written to, an ``UpperLimitCache``.
+
+    Args:
+        model (``spey.StatisticalModel``): original statistical model
+        cache (``UpperLimitCache``): upper limit cache
+        keys (``dict``): cache index for each expectation type
+        nsignal (``float``): number of signal events
+    """
+
+    def __init__(self, model, cache: UpperLimitCache, keys: dict, nsignal: float):
+        results = {}
+        for expected, key in keys.items():
+            n95 = cache.lookup(key)
+            if n95 is not None:
+                results[("poi_upper_limit", expected)] = n95 / nsignal
+        super().__init__(model, results)
+        self.cache = cache
+        self.keys = keys
+        self.nsignal = nsignal
+
+    def poi_upper_limit(self, expected=OBSERVED, **kwargs):
+        """Upper limit on the parameter of interest"""
+        if kwargs or ("poi_upper_limit", expected) in self.results:
+            return super().poi_upper_limit(expected=expected, **kwargs)
+        poi_ul = self.model.poi_upper_limit(expected=expected)
+        if not (isinf(poi_ul) or isnan(poi_ul)):
+            self.cache.store(self.keys[expected], poi_ul * self.nsignal)
+        self.results[("poi_upper_limit", expected)] = poi_ul
+        return poi_ul
+
+    def update(self, results: dict) -> None:
+        """
+        Add results computed by another process, the upper limits being
+        recorded in the cache.
+
+        Args:
+            results (``dict``): results indexed by ``(method, expectation type)``
+        """
+        for (method, expected), value in results.items():
+            if (
+                method == "poi_upper_limit"
+                and (method, expected) not in self.results
+                and not (isinf(value) or isnan(value))
+            ):
+                self.cache.store(self.keys[expected], value * self.nsignal)
+            self.results[(method, expected)] = value
+
+
+def apply_upper_limit_cache(
+    stat_models: dict,
+    cache: UpperLimitCache,
+    regiondata: dict,
+    xsection: float,
+    lumi: float,
+) -> dict:
+    """
+    Use an upper limit cache for the single-region models.
+
+    Args:
+        stat_models (``dict``): statistical models from
+            ``initialise_statistical_models``
+        cache (``UpperLimitCache``): upper limit cache of the analysis
+        regiondata (``dict``): data per region
+        xsection (``float``): cross section
+        lumi (``float``): luminosity
+
+    Returns:
+        ``dict``:
+        statistical models
+    """
+    models = {}
+    for reg, model in stat_models["uncorrelated_background"].items():
+        nsignal = (
+            xsection * lumi * 1000.0 * regiondata[reg]["Nf"] / regiondata[reg]["N0"]
+        )
+        if nsignal <= 0.0:
+            models[reg] = model
+            continue
+        keys = {
+            expected: cache.key(reg, lumi, regiondata[reg], expected)
+            for expected in [APRIORI, APOSTERIORI, OBSERVED]
+        }
+        models[reg] = CachedLimitModel(model, cache, keys, nsignal)
+    return dict(stat_models, uncorrelated_background=models)
+
+
+def _evaluate_model(job: tuple) -> tuple:
+    """Worker of ``prefetch_statistics``: ``(success, value)`` for a single job"""
+    model_type, name, method, expected = job
+    try:
+        model = _SHARED_MODELS[model_type][name]
+        return True, getattr(model, method)(expected=expected)
+    except Exception as err:  # pylint: disable=broad-except
+        # The calculation is redone in the main process to report the error
+        logger.debug("%s failed for %s: %s", method, name, str(err))
+        return False, None
+
+
+def prefetch_statistics(
+    stat_models: dict,
+    is_extrapolated: bool,
+    ncores: int = 1,
+    upper_limits: bool = True,
+    confidence_levels: bool = True,
+    limits: tuple = ("exp", "obs"),
+) -> dict:
+    """
+    Compute in parallel the upper limits and exclusion confidence levels of all
+    the statistical models (regions, covariance subsets and likelihood profiles)
+    of an analysis. Each calculation, for each expectation type, is a separate
+    job dispatched to a pool of forked processes.
+
+    Args:
+        stat_models (``dict``): statistical models from
+            ``initialise_statistical_models``
+        is_extrapolated (``bool``): extrapolated luminosity
+        ncores (``int``, default ``1``): number of processes
+        upper_limits (``bool``, default ``True``): compute the upper limits
+        confidence_levels (``bool``, default ``True``): compute the exclusion
+            confidence levels
+        limits (``tuple``, default ``("exp", "obs")``): upper limits to compute
+            (in the lazy CLs mode, the observed limits and the confidence
+            levels are only computed for the best regions)
+
+    Returns:
+        ``dict``:
+        statistical models, wrapped into ``PrecomputedModel`` objects if the
+        calculations have been performed
+    """
+    global _SHARED_MODELS  # pylint: disable=global-statement
+    if is_extrapolated:
+        tags, cls_tag = [(APRIORI, "exp")], APRIORI
+    else:
+        tags, cls_tag = [(APOSTERIORI, "exp"), (OBSERVED, "obs")], OBSERVED
+    jobs = []
+    for model_type, models in stat_models.items():
+        for name, model in models.items():
+            known = model.results if isinstance(model, PrecomputedModel) else {}
+            if upper_limits:
+                jobs += [
+                    (model_type, name, "poi_upper_limit", tag)
+                    for tag, label in tags
+                    if label in limits and ("poi_upper_limit", tag) not in known
+                ]
+            if confidence_levels:
+                jobs.append((model_type, name, "exclusion_confidence_level", cls_tag))
+    if ncores <= 1 or len(jobs) < 2:
+        return stat_models
+
+    logger.debug(
+        "Computing %d statistical quantities with %d processes", len(jobs), ncores
+    )
+    _SHARED_MODELS = stat_models
+    try:
+        context = multiprocessing.get_context("fork")
+        with context.Pool(min(ncores, len(jobs))) as pool:
+            outputs = pool.map(_evaluate_model, jobs, chunksize=1)
+    except (OSError, AssertionError) as err:
+        logger.debug("Parallel computation not available: %s", str(err))
+        return stat_models
+    finally:
+        _SHARED_MODELS = {}
+
+    results = {}
+    for (model_type, name, method, expected), (success, value) in zip(jobs, outputs):
+        if success:
+            results.setdefault((model_type, name), {})[(method, expected)] = value
+    precomputed = {}
+    for model_type, models in stat_models.items():
+        precomputed[model_type] = {}
+        for name, model in models.items():
+            if isinstance(model, CachedLimitModel):
+                # the limits computed by the workers are added to the cache
+                model.update(results.get((model_type, name), {}))
+            else:
+                model = PrecomputedModel(model, results.get((model_type, name), {}))
+            precomputed[model_type][name] = model
+    return precomputed
@@ -0,0 +1,297 @@
+################################################################################
+#
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+
+"""Tests of the merging of the SAF files written by SampleAnalyzer"""
+
+import math
+
+import pytest
+
+from madanalysis.IOinterface.saf_merger import (
+    CountsSAF,
+    SampleSAF,
+    merge_saf_outputs,
+)
+
+
+def sample_content(files, details):
+    """Sample SAF file with one entry per event file"""
+    lines = ["<SAFheader>\n", "</SAFheader>\n", "\n", "<SampleGlobalInfo>\n"]
+    lines += ["# xsection\n", "0.0 0.0 0 0.0 0.0\n", "</SampleGlobalInfo>\n", "\n"]
+    lines += ["<FileInfo>\n"] + ['"' + x + '"\n' for x in files]
+    lines += ["</FileInfo>\n", "\n", "<SampleDetailedInfo>\n", "# xsection\n"]
+    lines += [" ".join(str(x) for x in entry) + "\n" for entry in details]
+    lines += ["</SampleDetailedInfo>\n"]
+    return "".join(lines)
+
+
+def histos_content(nevents, bins, labels):
+    """Histogram file with a regular and a frequency histogram"""
+    return (
+        "<SAFheader>\n</SAFheader>\n\n"
+        "<Histo>\n"
+        "  <Description>\n"
+        '    "1_PT"\n'
+        "    # nbins   xmin           xmax\n"
+        "      2       0.000000e+00   1.000000e+02\n"
+        "  </Description>\n"
+        "  <Statistics>\n"
+        f"      {nevents}           0               # nevents\n"
+        f"      {nevents / 2:e}   0.000000e+00    # sum of event-weights over events\n"
+        "  </Statistics>\n"
+        "  <Data>\n"
+        + "".join(f"      {x:e}   0.000000e+00\n" for x in bins)
+        + "  </Data>\n"
+        "</Histo>\n\n"
+        "<HistoFrequency>\n"
+        "  <Description>\n"
+        '    "2_PDGID"\n'
+        "  </Description>\n"
+        "  <Data>\n"
+        + "".join(
+            f"      {label}   {value:e}   0.000000e+00\n"
+            for label, value in labels.items()
+        )
+        + "  </Data>\n"
+        "</HistoFrequency>\n"
+    )
+
+
+def cutflow_content(initial, counters):
+    """Cutflow file with an initial counter and one counter per cut"""
+    content = (
+        "<InitialCounter>\n"
+        '"Initial number of events"      #\n'
+        f"{initial:e}   0.000000e+00    # nentries\n"
+        "</InitialCounter>\n\n"
+    )
+    for i, value in enumerate(counters):
+        content += (
+            "<Counter>\n"
+            f'"cut{i + 1}"                          # {i + 1}st cut\n'
+            f"{value:e}   0.000000e+00    # nentries\n"
+            "</Counter>\n\n"
+        )
+    return content
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return str(path)
+
+
+def make_dataset(folder, name, files, nevents, bins):
+    """Output folder of a dataset, as written by a SampleAnalyzer run"""
+    details = [[1.0, 0.1, nevents, float(nevents), 0.0] for _ in files]
+    write(folder / name / (name + ".saf"), sample_content(files, details))
+    analysis = folder / name / "MadAnalysis5job_0"
+    write(
+        analysis / "Histograms" / "histos.saf",
+        histos_content(nevents, bins, {"11": 1.0, "ee": 2.0}),
+    )
+    write(analysis / "Cutflows" / "SR.saf", cutflow_content(nevents, bins))
+    return str(folder / name)
+
+
+def histogram_numbers(filename):
+    """Numbers of the <Data> block of the regular histogram (no comment)"""
+    return [
+        payload[1]
+        for kind, payload in CountsSAF(filename).items
+        if kind == "numbers" and payload[2] == ""
+    ]
+
+
+def test_sample_global_info_weights_the_cross_sections(tmp_path):
+    filename = write(
+        tmp_path / "sample.saf",
+        sample_content(
+            ["a.root", "b.root"],
+            [[2.0, 0.1, 100, 10.0, 0.0], [4.0, 0.2, 300, 30.0, 1.0]],
+        ),
+    )
+    sample = SampleSAF(filename)
+    assert sample.files == ["a.root", "b.root"]
+    xsection, error, nevents, sumw_pos, sumw_neg = sample.global_info()
+    assert xsection == pytest.approx((2.0 * 100 + 4.0 * 300) / 400)
+    assert error == pytest.approx(math.sqrt((0.1 * 100) ** 2 + (0.2 * 300) ** 2) / 400)
+    assert (nevents, sumw_pos, sumw_neg) == (400, 40.0, 1.0)
+
+    # the global information is recomputed from the file entries when written
+    sample.write()
+    assert SampleSAF(filename).global_info() == pytest.approx(sample.global_info())
+
+
+def test_counts_add_statistics_and_counters(tmp_path):
+    histos = write(tmp_path / "a" / "histos.saf", histos_content(10, [1.0, 2.0], {}))
+    other = write(tmp_path / "b" / "histos.saf", histos_content(30, [3.0, 5.0], {}))
+    counts = CountsSAF(histos)
+    counts.add(other)
+    counts.write()
+    merged = CountsSAF(histos)
+    numbers = [payload[1] for kind, payload in merged.items if kind == "numbers"]
+    assert numbers[0] == [40, 0]
+    assert numbers[1] == pytest.approx([20.0, 0.0])
+    assert numbers[2:] == [[4.0, 0.0], [7.0, 0.0]]
+
+    cutflow = write(tmp_path / "a" / "SR.saf", cutflow_content(10, [8.0, 4.0]))
+    other = write(tmp_path / "b" / "SR.saf", cutflow_content(20, [15.0, 1.0]))
+    counts = CountsSAF(cutflow)
+    counts.add(other)
+    counts.write()
+    merged = CountsSAF(cutflow)
+    numbers = [payload[1] for kind, payload in merged.items if kind == "numbers"]
+    assert numbers == [[30.0, 0.0], [23.0, 0.0], [5.0, 0.0]]
+    # the names of the cuts are kept
+    text = "".join(merged.lines())
+    assert '"cut1"' in text and '"cut2"' in text
+
+
+def test_histo_frequency_takes_the_union_of_the_labels(tmp_path):
+    first = write(
+        tmp_path / "a.saf",
+        histos_content(1, [0.0, 0.0], {"-11": 1.0, "2": 2.0, "ee": 3.0}),
+    )
+    second = write(
+        tmp_path / "b.saf",
+        histos_content(1, [0.0, 0.0], {"2": 4.0, "mumu": 5.0, "10": 6.0}),
+    )
+    counts = CountsSAF(first)
+    counts.add(second)
+    frequency = [payload for kind, payload in counts.items if kind == "frequency"]
+    assert frequency == [
+        {
+            "-11": [1.0, 0.0],
+            "2": [6.0, 0.0],
+            "ee": [3.0, 0.0],
+            "mumu": [5.0, 0.0],
+            "10": [6.0, 0.0],
+        }
+    ]
+    # numeric labels first, in numerical order, then the other ones
+    labels = [
+        line.split()[0]
+        for line in counts.lines()
+        if line.startswith("      ") and "e+" in line and '"' not in line
+    ][-5:]
+    assert labels == ["-11", "2", "10", "ee", "mumu"]
+
+    # the merged file can be read and merged again
+    counts.write()
+    again = CountsSAF(first)
+    again.add(second)
+    frequency = [payload for kind, payload in again.items if kind == "frequency"]
+    assert frequency[0]["2"] == [10.0, 0.0]
+    assert frequency[0]["mumu"] == [10.0, 0.0]
+
+
+def test_counts_with_a_different_structure_are_rejected(tmp_path):
+    reference = write(tmp_path / "ref.saf", cutflow_content(10, [8.0, 4.0]))
+
+    # different cut names
+    renamed = write(
+        tmp_path / "renamed.saf",
+        cutflow_content(10, [8.0, 4.0]).replace('"cut2"', '"other"'),
+    )
+    with pytest.raises(ValueError):
+        CountsSAF(reference).add(renamed)
+
+    # different number of cuts
+    shorter = write(tmp_path / "shorter.saf", cutflow_content(10, [8.0]))
+    with pytest.raises(ValueError):
+        CountsSAF(reference).add(shorter)
+
+    # different number of columns
+    columns = write(
+        tmp_path / "columns.saf",
+        cutflow_content(10, [8.0, 4.0]).replace(
+            "0.000000e+00    # nentries", "0.000000e+00   1.0  # nentries"
+        ),
+    )
+    with pytest.raises(ValueError):
+        CountsSAF(reference).add(columns)
+
+
+def test_merge_job_folders(tmp_path):
+    make_dataset(
+        tmp_path / "job1" / "Output" / "SAF", "ttbar", ["t1.root"], 10, [1.0, 2.0]
+    )
+    make_dataset(
+        tmp_path / "job1" / "Output" / "SAF", "wjets", ["w1.root"], 5, [1.0, 0.0]
+    )
+    make_dataset(
+        tmp_path / "job2" / "Output" / "SAF",
+        "ttbar",
+        ["t2.root", "t3.root"],
+        20,
+        [3.0, 4.0],
+    )
+    target = tmp_path / "merged"
+    assert merge_saf_outputs(
+        str(target), [str(tmp_path / "job1"), str(tmp_path / "job2")]
+    )
+
+    # the datasets with the same name are merged
+    sample = SampleSAF(str(target / "ttbar" / "ttbar.saf"))
+    assert sample.files == ["t1.root", "t2.root", "t3.root"]
+    assert sample.global_info()[2] == 50
+    histos = str(target / "ttbar" / "MadAnalysis5job_0" / "Histograms" / "histos.saf")
+    assert histogram_numbers(histos) == [[4.0, 0.0], [6.0, 0.0]]
+    cutflow = CountsSAF(
+        str(target / "ttbar" / "MadAnalysis5job_0" / "Cutflows" / "SR.saf")
+    )
+    numbers = [payload[1] for kind, payload in cutflow.items if kind == "numbers"]
+    assert numbers == [[30.0, 0.0], [4.0, 0.0], [6.0, 0.0]]
+
+    # the other datasets are copied
+    sample = SampleSAF(str(target / "wjets" / "wjets.saf"))
+    assert sample.files == ["w1.root"]
+    assert (
+        target / "wjets" / "MadAnalysis5job_0" / "Histograms" / "histos.saf"
+    ).is_file()
+
+
+def test_merge_dataset_folders(tmp_path):
+    first = make_dataset(tmp_path / "run1", "ttbar", ["t1.root"], 10, [1.0, 2.0])
+    second = make_dataset(tmp_path / "run2", "ttbar", ["t2.root"], 30, [3.0, 4.0])
+    # only the latest output of an analysis is merged
+    (tmp_path / "run2" / "ttbar" / "MadAnalysis5job_0").rename(
+        tmp_path / "run2" / "ttbar" / "MadAnalysis5job_1"
+    )
+    make_dataset(tmp_path / "run2", "ttbar", ["t2.root"], 30, [100.0, 100.0])
+
+    target = tmp_path / "merged"
+    assert merge_saf_outputs(str(target), [first, second])
+
+    # the dataset folders are merged into the output folder itself
+    sample = SampleSAF(str(target / "merged.saf"))
+    assert sample.files == ["t1.root", "t2.root"]
+    histos = str(target / "MadAnalysis5job_0" / "Histograms" / "histos.saf")
+    assert histogram_numbers(histos) == [[4.0, 0.0], [6.0, 0.0]]
+
+
+def test_merge_rejects_an_output_folder_among_the_inputs(tmp_path):
+    first = make_dataset(tmp_path, "ttbar", ["t1.root"], 10, [1.0, 2.0])
+    assert not merge_saf_outputs(first, [first])
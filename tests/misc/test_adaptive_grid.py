@@ -0,0 +1,186 @@
+################################################################################
+#
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+
+"""Tests of the adaptive scan of signal grids and of the exclusion contours"""
+
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+from madanalysis.dataset.dataset_collection import DatasetCollection
+from madanalysis.misc.adaptive_grid import AdaptiveGridScan
+from madanalysis.misc.signal_grid import (
+    exclusion_cls,
+    exclusion_contour,
+    load_grid_results,
+    store_grid_results,
+)
+
+
+class FakeRecaster:
+    """
+    Recasting machinery storing, for each dataset, the CLs given by a function
+    of its grid coordinates. The datasets recast by each call are recorded.
+    """
+
+    def __init__(self, dirname, grid, cls):
+        self.dirname = str(dirname)
+        self.cls = cls
+        self.batches = []
+        datasets = DatasetCollection()
+        for coords in grid:
+            name = "p_" + "_".join(str(x) for x in coords)
+            dataset = SimpleNamespace(name=name, grid=list(coords), xsection=1.0)
+            datasets.table.append([name, dataset])
+        self.main = SimpleNamespace(
+            datasets=datasets, recasting=SimpleNamespace(stat_only_mode=False)
+        )
+
+    def execute_runs(self):
+        batch = []
+        for dataset in self.main.datasets:
+            value = self.cls(*dataset.grid)
+            store_grid_results(
+                self.dirname, dataset, {"": {"ana": {"SR": {"CLs": value}}}}
+            )
+            batch.append(tuple(dataset.grid))
+        self.batches.append(sorted(batch))
+        return True
+
+    def results(self):
+        """Stored grid coordinates, CLs and interpolation flag of each dataset"""
+        results = {}
+        for dataset in self.main.datasets:
+            content = load_grid_results(self.dirname, dataset.name)
+            cls = exclusion_cls(content["results"][""]["ana"])
+            results[tuple(dataset.grid)] = (cls, content["interpolated"])
+        return results
+
+
+def test_coarse_lattice_keeps_the_last_index(tmp_path):
+    recaster = FakeRecaster(tmp_path, [(x,) for x in range(6)], lambda x: 0.0)
+    scan = AdaptiveGridScan(recaster)
+    assert scan.setup()
+    assert scan.initial_step() == 2
+    assert [i for i in range(6) if scan.on_lattice((i,), 2)] == [0, 2, 4, 5]
+
+    recaster = FakeRecaster(tmp_path, [(x,) for x in range(9)], lambda x: 0.0)
+    scan = AdaptiveGridScan(recaster)
+    assert scan.setup()
+    assert scan.initial_step() == 4
+    assert [i for i in range(9) if scan.on_lattice((i,), 4)] == [0, 4, 8]
+
+    # coarse lattice of a 2D grid with axes of different lengths
+    grid = list(itertools.product(range(3), range(6)))
+    recaster = FakeRecaster(tmp_path, grid, lambda x, y: 0.0)
+    scan = AdaptiveGridScan(recaster)
+    assert scan.setup()
+    assert scan.initial_step() == 2
+    assert [idx for idx in sorted(scan.points) if scan.on_lattice(idx, 2)] == [
+        (i, j) for i in [0, 2] for j in [0, 2, 4, 5]
+    ]
+
+
+def test_neighbours_skip_the_missing_points(tmp_path):
+    # the point (2, 1) has no dataset and (1, 1), (3, 1) have not been recast
+    grid = [x for x in itertools.product(range(5), range(3)) if x != (2, 1)]
+    recaster = FakeRecaster(tmp_path, grid, lambda x, y: 0.0)
+    scan = AdaptiveGridScan(recaster)
+    assert scan.setup()
+    key = ("", "ana")
+    known = {(0, 1): {key: (0.2, 0.0)}, (4, 1): {key: (0.6, 0.1)}}
+    assert scan.neighbours((1, 1), 0, key, known) == [(0, 0.2, 0.0), (4, 0.6, 0.1)]
+    assert scan.neighbours((3, 1), 0, key, known) == [(0, 0.2, 0.0), (4, 0.6, 0.1)]
+    # no neighbour on one side
+    assert scan.neighbours((1, 1), 1, key, known) == [None, None]
+    assert scan.neighbours((4, 0), 0, key, known) == [None, None]
+
+    scan.cls = {(0, 1): {key: 0.2}, (4, 1): {key: 0.6}}
+    estimates = scan.interpolate(1)
+    value, uncertainty, across = estimates[(1, 1)][key]
+    assert value == pytest.approx(0.3)
+    assert uncertainty == pytest.approx(0.2)
+    assert not across
+    # points without any pair of neighbours cannot be interpolated
+    assert estimates[(1, 0)][key] == (None, None, True)
+    assert scan.needs_recast(estimates[(1, 0)])
+
+
+def test_adaptive_scan_of_a_1d_grid(tmp_path):
+    recaster = FakeRecaster(tmp_path, [(x,) for x in range(9)], lambda x: x / 8.0)
+    assert AdaptiveGridScan(recaster).run()
+
+    # coarse lattice, then the points whose neighbours straddle the boundary
+    assert recaster.batches == [[(0,), (4,), (8,)], [(6,)], [(7,)]]
+    results = recaster.results()
+    for x in range(9):
+        value, interpolated = results[(x,)]
+        assert value == pytest.approx(x / 8.0)
+        assert interpolated == (x in [1, 2, 3, 5])
+
+    points = [(coords, cls) for coords, (cls, _) in results.items()]
+    assert exclusion_contour(points) == [pytest.approx((7.6,))]
+
+
+def test_adaptive_scan_of_a_2d_grid(tmp_path):
+    grid = list(itertools.product(range(5), range(5)))
+    recaster = FakeRecaster(tmp_path, grid, lambda x, y: (x + y) / 8.0)
+    assert AdaptiveGridScan(recaster).run()
+
+    recast = [idx for batch in recaster.batches for idx in batch]
+    assert len(recast) == len(set(recast))
+    assert recaster.batches[0] == [(i, j) for i in [0, 2, 4] for j in [0, 2, 4]]
+    # the points next to the boundary are recast, the far ones interpolated
+    assert (3, 4) in recast and (4, 3) in recast
+    assert (1, 1) not in recast
+    results = recaster.results()
+    for (x, y), (value, interpolated) in results.items():
+        assert value == pytest.approx((x + y) / 8.0)
+        assert interpolated == ((x, y) not in recast)
+
+    points = [(coords, cls) for coords, (cls, _) in results.items()]
+    contour = exclusion_contour(points)
+    assert contour == [pytest.approx((3.6, 4.0)), pytest.approx((4.0, 3.6))]
+
+
+def test_exclusion_contour():
+    # 1D: one crossing per interval straddling the level, points without CLs
+    # being ignored
+    points = [((0.0,), 0.5), ((1.0,), 1.0), ((2.0,), None), ((3.0,), 0.9)]
+    assert exclusion_contour(points, 0.95) == [
+        pytest.approx((0.9,)),
+        pytest.approx((2.0,)),
+    ]
+    # 2D: crossings along both grid lines
+    points = [
+        ((0.0, 0.0), 0.0),
+        ((1.0, 0.0), 1.0),
+        ((0.0, 1.0), 1.0),
+        ((1.0, 1.0), 1.0),
+    ]
+    assert exclusion_contour(points, 0.5) == [(0.0, 0.5), (0.5, 0.0)]
+    # no contour for higher dimensions
+    assert exclusion_contour([((0.0, 0.0, 0.0), 0.0), ((1.0, 0.0, 0.0), 1.0)]) == []
+    assert exclusion_contour([]) == []
@@ -0,0 +1,70 @@
+################################################################################
+#
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+
+"""Tests of the machine-wide cache of reconstructed events"""
+
+import os
+
+from madanalysis.misc.reco_events_cache import RecoEventsCache
+
+
+def make_events(path, size):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_events_kept_by_the_user_are_copied(tmp_path):
+    cache = RecoEventsCache(str(tmp_path), 1.0)
+    source = make_events(tmp_path / "run" / "events.root", 10)
+    assert cache.store("key", source)
+    assert os.stat(source).st_nlink == 1
+    target = str(tmp_path / "output" / "events.root")
+    assert cache.fetch("key", target)
+    assert os.stat(target).st_nlink == 1
+
+    # transient files are linked
+    target = str(tmp_path / "run" / "linked.root")
+    assert cache.fetch("key", target, link=True)
+    assert os.stat(target).st_nlink == 2
+
+
+def test_eviction_keeps_the_entries_linked_elsewhere(tmp_path):
+    cache = RecoEventsCache(str(tmp_path), 1.0)
+    cache.budget = 25
+    linked = make_events(tmp_path / "run" / "linked.root", 10)
+    assert cache.store("linked", linked, link=True)
+    assert cache.store("copied", make_events(tmp_path / "run" / "copied.root", 10))
+    os.utime(os.path.join(cache.path, "linked"), (1, 1))
+    os.utime(os.path.join(cache.path, "copied"), (2, 2))
+
+    # the oldest entry shares its file with a run: removing it frees no space
+    assert cache.store("new", make_events(tmp_path / "run" / "new.root", 10))
+    assert sorted(os.listdir(cache.path)) == [".lock", "linked", "new"]
+
+    # once the run has removed its file, the entry can be evicted
+    os.remove(linked)
+    cache.budget = 15
+    cache.evict()
+    assert sorted(os.listdir(cache.path)) == [".lock", "new"]
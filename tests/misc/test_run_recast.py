@@ -0,0 +1,203 @@
+################################################################################
+#
+#  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+#  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+#
+#  This file is part of MadAnalysis 5.
+#  Official website: <https://github.com/MadAnalysis/madanalysis5>
+#
+#  MadAnalysis 5 is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MadAnalysis 5 is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+#
+################################################################################
+
+
+"""Tests of the resumption of an interrupted recast run"""
+
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+import madanalysis.misc.run_recast as run_recast
+from madanalysis.IOinterface.saf_merger import SampleSAF
+from madanalysis.misc.recast_manifest import DONE, RUNNING, RecastManifest
+from madanalysis.misc.run_recast import RunRecast
+
+ANALYSES = ["atlas_susy_2018_31"]
+
+
+def make_recast(dirname, runcard):
+    """RunRecast instance restricted to what the resume machinery needs"""
+    recast = RunRecast.__new__(RunRecast)
+    recast.dirname = str(dirname)
+    recast.rundir = str(dirname) + "_RecastRun"
+    recast.logger = logging.getLogger("MA5")
+    recast.delphes_runcard = list(runcard)
+    recast.analysis_runcard = ["v1.2_" + x for x in ANALYSES]
+    recast.forced = True
+    recast.pad = ""
+    recast.TACO_output = ""
+    recast.upper_limit_caches = {}
+    recast.main = SimpleNamespace(
+        forced=True,
+        archi_info=SimpleNamespace(ma5dir=str(dirname)),
+        fastsim=SimpleNamespace(package=None),
+        datasets=[],
+        recasting=SimpleNamespace(
+            resume=True,
+            sfs_single_pass=False,
+            extrapolated_luminosities=[],
+            stat_only_mode=True,
+            stat_only_dir=str(dirname),
+            analysis_only_mode=False,
+            ncores=1,
+            early_stopping=0,
+            delphes=True,
+            DelphesDic={},
+            systematics=[],
+            THerror_combination="linear",
+            error_extrapolation="linear",
+            global_likelihoods_switch=False,
+            simplify_likelihoods=False,
+            lazy_cls=False,
+        ),
+    )
+    return recast
+
+
+class Interrupted(Exception):
+    """Interruption of a recast run"""
+
+
+def run_cls(monkeypatch, recast, dataset, interrupt=None):
+    """
+    Run the CLs tasks of execute_runs with a CLs calculation appending the
+    name of the current card to the CLs output of the dataset. The
+    calculation of the card ``interrupt`` is stopped half way through.
+    """
+    monkeypatch.setattr(
+        run_recast,
+        "DetectorManager",
+        lambda main: SimpleNamespace(manage=lambda detector: True),
+    )
+    cards = []
+
+    def compute_cls(analyses, myset):
+        filename = list(recast.cls_output_sizes(myset))[0]
+        with open(filename, "a") as stream:
+            stream.write(cards[-1] + " partial\n")
+            if cards[-1] == interrupt:
+                raise Interrupted()
+            stream.write(cards[-1] + " complete\n")
+        return True
+
+    recast.main.datasets = [dataset]
+    recast.fastsim_single = lambda version, card, graph: True
+    recast.analysis_header = lambda version, card: cards.append(card)
+    recast.write_bibliography = lambda analyses: None
+    recast.compute_cls = compute_cls
+    if interrupt is None:
+        assert recast.execute_runs()
+    else:
+        with pytest.raises(Interrupted):
+            recast.execute_runs()
+    return cards
+
+
+def make_dataset():
+    """Dataset without event files"""
+    return SimpleNamespace(
+        name="defaultset",
+        filenames=[],
+        xsection=1.0,
+        scaleup=None,
+        scaledn=None,
+        pdfup=None,
+        pdfdn=None,
+        grid=None,
+    )
+
+
+def test_detector_runs_order_independent_of_the_card(tmp_path):
+    first = make_recast(
+        tmp_path, ["v1.2_b.tcl", "v1.2_a.tcl", "v1.1_c.tcl", "v1.2_a.tcl"]
+    )
+    second = make_recast(tmp_path, ["v1.2_a.tcl", "v1.1_c.tcl", "v1.2_b.tcl"])
+    assert first.detector_runs() == second.detector_runs()
+    assert first.detector_runs() == ["v1.1_c.tcl", "v1.2_a.tcl", "v1.2_b.tcl"]
+
+
+def test_resume_with_a_different_card_order(tmp_path, monkeypatch):
+    (tmp_path / "Output" / "SAF" / "defaultset").mkdir(parents=True)
+    dataset = make_dataset()
+
+    # interrupted run, the cards being listed in a given order
+    recast = make_recast(tmp_path, ["v1.2_b.tcl", "v1.2_a.tcl"])
+    assert run_cls(monkeypatch, recast, dataset, interrupt="b.tcl") == [
+        "a.tcl",
+        "b.tcl",
+    ]
+    manifest = RecastManifest(recast.dirname)
+    assert manifest.record("cls", dataset.name, "a.tcl", ANALYSES[0])["status"] == DONE
+    assert (
+        manifest.record("cls", dataset.name, "b.tcl", ANALYSES[0])["status"] == RUNNING
+    )
+
+    # resumed run with the cards listed in the reverse order
+    recast = make_recast(tmp_path, ["v1.2_a.tcl", "v1.2_b.tcl"])
+    assert run_cls(monkeypatch, recast, dataset) == ["a.tcl", "b.tcl"]
+
+    filename = list(recast.cls_output_sizes(dataset))[0]
+    with open(filename, "r") as stream:
+        assert stream.read().splitlines() == [
+            "a.tcl partial",
+            "a.tcl complete",
+            "b.tcl partial",
+            "b.tcl complete",
+        ]
+    manifest = RecastManifest(recast.dirname)
+    for card in ["a.tcl", "b.tcl"]:
+        record = manifest.record("cls", dataset.name, card, ANALYSES[0])
+        assert record["status"] == DONE
+
+
+def test_resume_rewinds_the_sample_file(tmp_path):
+    (tmp_path / "Output" / "SAF" / "defaultset").mkdir(parents=True)
+    dataset = SimpleNamespace(name="defaultset")
+    recast = make_recast(tmp_path, ["v1.2_a.tcl", "v1.2_b.tcl"])
+    manifest = RecastManifest(recast.dirname)
+    filename = recast.sample_file(dataset)
+    with open(filename, "w") as stream:
+        stream.write("<SampleGlobalInfo>\n</SampleGlobalInfo>\n")
+        stream.write('<FileInfo>\n"a.root"\n</FileInfo>\n')
+        stream.write("<SampleDetailedInfo>\n1.0 0.1 100 100.0 0.0\n")
+        stream.write("</SampleDetailedInfo>\n")
+    inputs = {x: "" for x in ANALYSES}
+    manifest.update(
+        "pad", dataset.name, "a.tcl", ANALYSES, inputs, DONE, sample_entries=0
+    )
+
+    # the PAD run of the second card is interrupted after updating the sample
+    manifest.update(
+        "pad", dataset.name, "b.tcl", ANALYSES, inputs, RUNNING, sample_entries=1
+    )
+    sample = SampleSAF(filename)
+    sample.append(sample, ["b.root"])
+    sample.write()
+    assert recast.sample_entries(dataset) == 2
+
+    assert recast.rewind_pad_output("b.tcl", dataset, ANALYSES)
+    assert SampleSAF(filename).files == ["a.root"]
+    assert manifest.record("pad", dataset.name, "a.tcl", ANALYSES[0]) is not None
+    assert manifest.record("pad", dataset.name, "b.tcl", ANALYSES[0]) is None
@@ -40,7 +40,7 @@
 // ullong  = 8 bytes
 // float   = 4 bytes
 // double  = 8 bytes
-// ldouble = 8 bytes
+// ldouble = 16 bytes
 
 #define INT_4BYTES  1
 #define LONG_8BYTES 1
@@ -0,0 +1,148 @@
+////////////////////////////////////////////////////////////////////////////////
+//  
+//  Copyright (C) 2012-2026 Jack Araz, Eric Conte & Benjamin Fuks
+//  The MadAnalysis development team, email: <ma5team@iphc.cnrs.fr>
+//  
+//  This file is part of MadAnalysis 5.
+//  Official website: <https://github.com/MadAnalysis/madanalysis5>
+//  
+//  MadAnalysis 5 is free software: you can redistribute it and/or modify
+//  it under the terms of the GNU General Public License as published by
+//  the Free Software Foundation, either version 3 of the License, or
+//  (at your option) any later version.
+//  
+//  MadAnalysis 5 is distributed in the hope that it will be useful,
+//  but WITHOUT ANY WARRANTY; without even the implied warranty of
+//  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+//  GNU General Public License for more details.
+//  
+//  You should have received a copy of the GNU General Public License
+//  along with MadAnalysis 5. If not, see <http://www.gnu.org/licenses/>
+//  
+////////////////////////////////////////////////////////////////////////////////
+
+
+#ifndef EARLYSTOPPING_h
+#define EARLYSTOPPING_h
+
+
+// SampleAnalyzer headers
+#include "SampleAnalyzer/Process/Analyzer/AnalyzerBase.h"
+#include "SampleAnalyzer/Commons/Base/PortableDatatypes.h"
+
+// STL headers
+#include <cstdio>
+#include <fstream>
+#include <string>
+#include <vector>
+
+
+namespace MA5
+{
+
+/// Periodic report of the region counters of a set of analyzers, and
+/// detection of a stop request issued by the Python side (existence of
+/// a stop file). The event loop is then interrupted and the analyzers
+/// finalized as usual.
+class EarlyStopping
+{
+  // -------------------------------------------------------------
+  //                        data members
+  // -------------------------------------------------------------
+ private :
+
+  /// Analyzers whose counters are reported
+  std::vector<AnalyzerBase*> analyzers_;
+
+  /// File receiving the counters
+  std::string progress_;
+
+  /// File whose existence requests the end of the event loop
+  std::string stop_;
+
+  /// Number of events between two reports
+  MAuint64 frequency_;
+
+  /// Number of events seen so far
+  MAuint64 nevents_;
+
+  /// A stop has been requested
+  MAbool stopped_;
+
+  // -------------------------------------------------------------
+  //                       method members
+  // -------------------------------------------------------------
+ public :
+
+  /// Constructor
+  EarlyStopping(const std::string& progress, const std::string& stop,
+                MAuint64 frequency)
+  {
+    progress_  = progress;
+    stop_      = stop;
+    frequency_ = (frequency==0) ? 1 : frequency;
+    nevents_   = 0;
+    stopped_   = false;
+  }
+
+  /// Destructor
+  ~EarlyStopping()
+  { }
+
+  /// Adding an analyzer
+  void Add(AnalyzerBase* analyzer)
+  { analyzers_.push_back(analyzer); }
+
+  /// A stop has been requested
+  MAbool Stopped() const
+  { return stopped_; }
+
+  /// To be called for each event: reports the counters every 'frequency'
+  /// events and returns true if the event loop must be stopped
+  MAbool Update()
+  {
+    nevents_++;
+    if (nevents_ % frequency_ != 0) return false;
+    Write();
+    std::ifstream stop(stop_.c_str());
+    stopped_ = stop.good();
+    return stopped_;
+  }
+
+  /// Writing the counters (one tab-separated line per region: analysis,
+  /// region, sum of weights and of squared weights, initially and after
+  /// the last cut of the region)
+  void Write() const
+  {
+    std::string tmpname = progress_ + ".tmp";
+    std::ofstream output(tmpname.c_str());
+    if (!output.good()) return;
+    output.precision(12);
+    output << "# nevents " << nevents_ << std::endl;
+    for (MAuint32 i=0;i<analyzers_.size();i++)
+    {
+      std::vector<RegionSelection*> regions = analyzers_[i]->Manager()->Regions();
+      for (MAuint32 j=0;j<regions.size();j++)
+      {
+        const CounterManager& cutflow = regions[j]->GetCutflow();
+        const Counter& initial = cutflow.GetInitial();
+        const Counter& last    = (cutflow.GetNCuts()==0) ?
+                               initial : cutflow[cutflow.GetNCuts()-1];
+        output << analyzers_[i]->name() << "\t"
+               << regions[j]->GetName() << "\t"
+               << initial.sumweight_.first  + initial.sumweight_.second  << "\t"
+               << initial.sumweight2_.first + initial.sumweight2_.second << "\t"
+               << last.sumweight_.first     + last.sumweight_.second     << "\t"
+               << last.sumweight2_.first    + last.sumweight2_.second
+               << std::endl;
+      }
+    }
+    output.close();
+    std::rename(tmpname.c_str(), progress_.c_str());
+  }
+
+};
+
+}
+
+#endif
@@ -82,6 +82,10 @@ class CounterManager
   void Reset()
   { counters_.clear(); }
 
+  /// Number of cuts
+  MAuint32 GetNCuts() const
+  { return counters_.size(); }
+
   /// Overloading operator []
   const Counter& operator[] (const MAuint32& index) const
   { return counters_[index];}
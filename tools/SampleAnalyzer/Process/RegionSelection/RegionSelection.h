@@ -74,6 +74,10 @@ class RegionSelection
   MAuint32 GetNumberOfCutsAppliedSoFar()
     { return NumberOfCutsAppliedSoFar_; }
 
+  /// Accessor to the cutflow
+  const CounterManager& GetCutflow() const
+    { return cutflow_; }
+
   /// Printing the list of histograms
   void WriteDefinition(SAFWriter &output);
 